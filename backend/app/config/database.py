@@ -1,19 +1,52 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import SecondaryPreferred
 from app.config.settings import settings
+from app.services.mongo_monitoring import CommandMetricsListener, PoolMetricsListener
 
 class Database:
     client: AsyncIOMotorClient = None
     database = None
+    read_database = None
 
 db = Database()
 
 async def get_database():
     return db.database
 
+async def get_read_database():
+    """
+    Database for reads that tolerate replication lag (catalog browsing,
+    vendor listings): secondary preferred, bounded staleness. Falls back to
+    the primary on a standalone server or when no secondary is fresh enough.
+    """
+    return db.read_database
+
+def client_options() -> dict:
+    options = {
+        "maxPoolSize": settings.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": settings.MONGO_MIN_POOL_SIZE,
+        "serverSelectionTimeoutMS": settings.MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "event_listeners": [CommandMetricsListener(), PoolMetricsListener()],
+    }
+    if settings.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = settings.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if settings.MONGO_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = settings.MONGO_MAX_IDLE_TIME_MS
+    return options
+
+def read_database_for(client):
+    if not settings.MONGO_SECONDARY_READS:
+        return client[settings.DATABASE_NAME]
+    return client.get_database(
+        settings.DATABASE_NAME,
+        read_preference=SecondaryPreferred(max_staleness=settings.MONGO_MAX_STALENESS_SECONDS)
+    )
+
 async def connect_to_mongo():
     """Create database connection"""
-    db.client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db.client = AsyncIOMotorClient(settings.MONGODB_URL, **client_options())
     db.database = db.client[settings.DATABASE_NAME]
+    db.read_database = read_database_for(db.client)
     
     # Test connection
     try:
@@ -25,4 +58,4 @@ async def connect_to_mongo():
 async def close_mongo_connection():
     """Close database connection"""
     if db.client:
-        db.client.close()
\ No newline at end of file
+        db.client.close()
@@ -5,6 +5,19 @@ class Settings(BaseSettings):
     # Database
     MONGODB_URL: str = "mongodb://localhost:27017"
     DATABASE_NAME: str = "aislemarts"
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 10
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = 2000  # None waits forever for a connection
+    MONGO_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = 300000
+    # Catalog and vendor listing reads; staleness is capped (90s minimum)
+    MONGO_SECONDARY_READS: bool = True
+    MONGO_MAX_STALENESS_SECONDS: int = 90
+    MONGO_SLOW_COMMAND_MS: int = 100
+    # Per-request query budget (N+1 detection); strict mode raises instead of logging
+    DB_QUERY_BUDGET: int = 25
+    DB_REPEATED_QUERY_THRESHOLD: int = 5
+    DB_QUERY_GUARD_STRICT: bool = False  # always on when ENVIRONMENT is "test"
     
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -15,9 +28,54 @@ class Settings(BaseSettings):
     STRIPE_SECRET_KEY: Optional[str] = None
     STRIPE_PUBLISHABLE_KEY: Optional[str] = None
     STRIPE_WEBHOOK_SECRET: Optional[str] = None
+    STRIPE_API_BASE: Optional[str] = None  # e.g. http://localhost:9200 for fakes/stripe_server.py
+    PAYMENT_EVENT_BATCH_SIZE: int = 100
+    PAYMENT_EVENT_BATCH_WINDOW_MS: int = 200
+    PAYMENT_EVENT_RECOVERY_SECONDS: int = 60
     
     # OpenAI
     OPENAI_API_KEY: Optional[str] = None
+    OPENAI_BASE_URL: Optional[str] = None  # e.g. http://localhost:9100/v1 for fakes/openai_server.py
+    OPENAI_MODEL: str = "gpt-3.5-turbo"
+    LLM_MAX_CONCURRENCY: int = 16
+    LLM_TIMEOUT_SECONDS: float = 20.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BACKOFF_SECONDS: float = 0.5
+    LLM_CHAT_PROMPT_TOKENS: int = 3000  # prompt budget, excluding the reply
+    LLM_RECOMMENDATION_PROMPT_TOKENS: int = 1500
+    AI_CACHE_TTL_SECONDS: int = 900
+    AI_CACHE_MAX_ENTRIES: int = 2048
+    CATALOG_VERSION_REFRESH_SECONDS: float = 5.0
+    CATALOG_CACHE_TTL_SECONDS: float = 30.0  # bounds stock staleness on cached pages
+    CATALOG_CACHE_MAX_ENTRIES: int = 1000
+    SIMILARITY_DIMENSIONS: int = 512
+    SIMILARITY_REFRESH_SECONDS: float = 30.0
+    CHAT_HISTORY_MAX_MESSAGES: int = 50  # kept on the session document
+    CHAT_PROMPT_MESSAGES: int = 10  # recent messages sent verbatim
+    CHAT_SUMMARY_MAX_CHARS: int = 2000
+    CHAT_RETRIEVAL_PRODUCTS: int = 5  # catalog matches injected into chat prompts
+    
+    # "Frequently bought together" model
+    COOCCURRENCE_MAX_PRODUCTS: int = 50000
+    COOCCURRENCE_MAX_NEIGHBORS: int = 50
+    COOCCURRENCE_REBUILD_SECONDS: int = 3600  # 0 builds only when none is stored
+    COOCCURRENCE_LOOKBACK_DAYS: int = 180
+    
+    # Order number generator: each process leases a distinct worker id,
+    # trying WORKER_ID first when set
+    WORKER_ID: Optional[int] = None
+    LEASE_TTL_SECONDS: int = 30
+    
+    # Background jobs
+    VENDOR_STATS_RECONCILE_INTERVAL_SECONDS: int = 3600  # 0 disables
+    
+    # Startup: open the pool, prime caches and serve the WARM_UP_PATHS list routes once before taking traffic
+    STARTUP_WARM_UP: bool = True
+    
+    # Response compression
+    COMPRESSION_MIN_BYTES: int = 1024
+    GZIP_LEVEL: int = 6
+    BROTLI_QUALITY: int = 5  # 0-11; higher levels cost far more CPU for little gain
     
     # Environment
     ENVIRONMENT: str = "development"
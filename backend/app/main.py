@@ -1,10 +1,27 @@
+import time
+# Start of the import, for the startup profile
+IMPORT_STARTED = time.monotonic()
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.security import HTTPBearer
+import asyncio
 import uvicorn
 from app.config.settings import settings
-from app.config.database import connect_to_mongo, close_mongo_connection
-from app.routes import auth, vendors, products, cart, orders, ai_concierge
+from app.config.database import connect_to_mongo, close_mongo_connection, get_database
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.query_guard import QueryGuardMiddleware
+from app.routes import auth, vendors, products, cart, orders, ai_concierge, webhooks
+from app.services.cooccurrence import cooccurrence
+from app.services.leases import leader, worker_id_lease
+from app.services.metrics import registry
+from app.services.payment_events import payment_events
+from app.services import startup
+from app.services.similarity import similarity_index
+from app.services.vendor_stats import run_reconciliation_loop
+from app.services.warmup import warm_up
+from app.services.worker_stats import update_metrics, worker_stats
 
 app = FastAPI(
     title="AisleMarts API",
@@ -21,16 +38,73 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(QueryGuardMiddleware)
+# Added last so it wraps everything, CORS included
+app.add_middleware(MetricsMiddleware)
+
 # Security
 security = HTTPBearer()
 
 # Startup and shutdown events
+background_tasks = []
+
 @app.on_event("startup")
 async def startup_event():
-    await connect_to_mongo()
+    with startup.phase("mongo"):
+        await connect_to_mongo()
+    with startup.phase("worker_id"):
+        try:
+            worker_id = await worker_id_lease.acquire(await get_database(), settings.WORKER_ID)
+            print(f"Leased order number worker id {worker_id}")
+        except Exception as e:
+            print(f"Failed to lease a worker id, using a random one until the lease is renewed: {e}")
+    background_tasks.append(asyncio.create_task(worker_id_lease.run(get_database)))
+    # One process across all workers and hosts runs the singleton jobs
+    try:
+        if await leader.try_acquire(await get_database()):
+            print(f"Took the {leader.name} lease")
+    except Exception as e:
+        print(f"Failed to campaign for the {leader.name} lease: {e}")
+    background_tasks.append(asyncio.create_task(leader.run(get_database)))
+    background_tasks.append(asyncio.create_task(payment_events.run(get_database)))
+    background_tasks.append(asyncio.create_task(
+        payment_events.run_recovery_loop(get_database, settings.PAYMENT_EVENT_RECOVERY_SECONDS, leader)
+    ))
+    with startup.phase("similarity"):
+        try:
+            indexed = await similarity_index.rebuild(await get_database())
+            print(f"Indexed {indexed} products for similarity search")
+        except Exception as e:
+            print(f"Failed to build similarity index: {e}")
+    background_tasks.append(asyncio.create_task(
+        similarity_index.run_refresh_loop(get_database, settings.SIMILARITY_REFRESH_SECONDS)
+    ))
+    # Loads in the background: the leader's scan of the orders must not hold up readiness
+    background_tasks.append(asyncio.create_task(
+        cooccurrence.run_sync_loop(
+            get_database, settings.COOCCURRENCE_REBUILD_SECONDS, settings.COOCCURRENCE_LOOKBACK_DAYS, leader
+        )
+    ))
+    if settings.VENDOR_STATS_RECONCILE_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(
+            run_reconciliation_loop(get_database, settings.VENDOR_STATS_RECONCILE_INTERVAL_SECONDS, leader)
+        ))
+    if settings.STARTUP_WARM_UP:
+        await warm_up(app, await get_database())
+    startup.ready()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    for task in background_tasks:
+        task.cancel()
+    try:
+        # Frees the id and hands over the jobs now rather than after the leases expire
+        db = await get_database()
+        await worker_id_lease.release(db)
+        await leader.release(db)
+    except Exception as e:
+        print(f"Failed to release leases: {e}")
     await close_mongo_connection()
 
 # Include routers
@@ -40,6 +114,7 @@ app.include_router(products.router, prefix="/api/products", tags=["Products"])
 app.include_router(cart.router, prefix="/api/cart", tags=["Shopping Cart"])
 app.include_router(orders.router, prefix="/api/orders", tags=["Orders"])
 app.include_router(ai_concierge.router, prefix="/api/ai", tags=["AI Concierge"])
+app.include_router(webhooks.router, prefix="/api/webhooks", tags=["Webhooks"])
 
 @app.get("/")
 async def root():
@@ -49,6 +124,19 @@ async def root():
 async def health_check():
     return {"status": "healthy", "environment": settings.ENVIRONMENT}
 
+@app.get("/health/worker", include_in_schema=False)
+async def worker_health():
+    """Stats and startup profile of the worker process that answered"""
+    return {**worker_stats(), "startup": startup.startup_profile()}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus text exposition of the in-process registry"""
+    update_metrics()
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+startup.imported(IMPORT_STARTED)
+
 if __name__ == "__main__":
     uvicorn.run(
         "main:app",
@@ -0,0 +1,79 @@
+"""
+Response compression negotiation
+
+A pure ASGI middleware that compresses single-message responses
+(JSONResponse and friends) with the encoding `negotiate` picks for the
+request's Accept-Encoding. It leaves alone:
+
+- bodies under COMPRESSION_MIN_BYTES and non-text content types,
+- streamed responses (SSE chat replies must flush chunk by chunk),
+- responses that already carry a Content-Encoding, i.e. precompressed
+  bodies served from the catalog cache.
+
+Compressible responses get `Vary: Accept-Encoding` whether or not they
+were compressed. Bytes actually sent are counted per encoding in
+http_response_body_bytes_total.
+"""
+from starlette.datastructures import Headers, MutableHeaders
+from app.config.settings import settings
+from app.services.compression import compress, compressible, negotiate
+from app.services.metrics import registry
+
+RESPONSE_BYTES = registry.counter(
+    "http_response_body_bytes_total", "Response body bytes sent, by content encoding", ["encoding"]
+)
+
+class CompressionMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._bytes = {}
+
+    def _count(self, encoding: str, size: int):
+        counter = self._bytes.get(encoding)
+        if counter is None:
+            counter = self._bytes[encoding] = RESPONSE_BYTES.labels(encoding=encoding)
+        counter.inc(size)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        start_message = None
+        sent_encoding = "identity"
+
+        async def send_wrapper(message):
+            nonlocal start_message, sent_encoding
+            if message["type"] == "http.response.start":
+                # Held until the first body message says whether it is streamed
+                start_message = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if start_message is not None:
+                start, start_message = start_message, None
+                headers = MutableHeaders(raw=start["headers"])
+                if compressible(headers.get("content-type")):
+                    headers.add_vary_header("Accept-Encoding")
+                    existing = headers.get("content-encoding")
+                    if existing:
+                        sent_encoding = existing
+                    elif (encoding and not message.get("more_body", False)
+                            and len(body) >= settings.COMPRESSION_MIN_BYTES):
+                        body = compress(body, encoding)
+                        headers["Content-Encoding"] = encoding
+                        headers["Content-Length"] = str(len(body))
+                        message = dict(message, body=body)
+                        sent_encoding = encoding
+                await send(start)
+            self._count(sent_encoding, len(body))
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+        if start_message is not None:
+            # A response with no body message at all
+            await send(start_message)
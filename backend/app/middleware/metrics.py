@@ -0,0 +1,106 @@
+"""
+Per-route request metrics
+
+A pure ASGI middleware (no BaseHTTPMiddleware, so no extra task or body
+buffering per request) recording, labelled by method and route template
+(`/api/products/{product_id}`, never the raw path):
+
+- http_request_duration_seconds: latency histogram,
+- http_requests_total: requests by status code,
+- http_requests_in_flight: requests currently being handled.
+
+The route is resolved up front so the in-flight gauge can be labelled:
+an exact dict lookup for parameterless paths, otherwise a scan of the
+parameterised routes' compiled path regexes (no parameter conversion).
+Paths matching no route share the "unmatched" label, which keeps label
+cardinality bounded.
+"""
+import time
+from app.services.metrics import registry
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route", ["method", "route"]
+)
+REQUESTS = registry.counter(
+    "http_requests_total", "Requests by route and status code", ["method", "route", "status"]
+)
+IN_FLIGHT = registry.gauge(
+    "http_requests_in_flight", "Requests currently in progress by route", ["method", "route"]
+)
+
+UNMATCHED = "unmatched"
+
+class RouteResolver:
+    def __init__(self, routes):
+        self._static = {}
+        self._dynamic = []
+        for route in routes:
+            path = getattr(route, "path", None)
+            if path is None:
+                continue
+            if "{" in path:
+                self._dynamic.append((route.path_regex.match, path))
+            else:
+                self._static.setdefault(path, path)
+
+    def resolve(self, path: str) -> str:
+        # Method is ignored: a 405 is still reported under the route it hit
+        template = self._static.get(path)
+        if template is not None:
+            return template
+        for match, template in self._dynamic:
+            if match(path):
+                return template
+        return UNMATCHED
+
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._resolver = None
+        # Bound series per (method, route) and per (method, route, status)
+        self._series = {}
+        self._counters = {}
+
+    def _route(self, scope) -> str:
+        if self._resolver is None:
+            # Routes are all registered by the time the first request arrives
+            self._resolver = RouteResolver(scope["app"].routes)
+        return self._resolver.resolve(scope["path"])
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"] if scope["method"] in METHODS else "OTHER"
+        route = self._route(scope)
+        series = self._series.get((method, route))
+        if series is None:
+            series = self._series[(method, route)] = (
+                IN_FLIGHT.labels(method=method, route=route),
+                REQUEST_LATENCY.labels(method=method, route=route),
+            )
+        in_flight, latency = series
+        status_code = 500
+        start = time.perf_counter()
+        in_flight.inc()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            latency.observe(time.perf_counter() - start)
+            counter = self._counters.get((method, route, status_code))
+            if counter is None:
+                counter = self._counters[(method, route, status_code)] = REQUESTS.labels(
+                    method=method, route=route, status=status_code
+                )
+            counter.inc()
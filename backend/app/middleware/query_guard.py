@@ -0,0 +1,49 @@
+"""
+Per-request Mongo query budget
+
+Wraps each HTTP request in `track_queries()` and, when it finishes,
+checks the commands it issued: more than DB_QUERY_BUDGET commands, or
+one query shape repeated DB_REPEATED_QUERY_THRESHOLD times (a query in a
+loop), is printed with the offending shapes. In strict mode
+(DB_QUERY_GUARD_STRICT, or ENVIRONMENT=test) it raises
+QueryBudgetExceeded instead, so a new N+1 fails the test that hits it.
+
+Every request's command count is also observed in
+`http_request_db_commands`, which the load tests read back as DB
+operations per request.
+"""
+from app.config.settings import settings
+from app.services.metrics import registry
+from app.services.query_guard import QueryBudgetExceeded, check_query_budget, track_queries
+
+REQUEST_DB_COMMANDS = registry.histogram(
+    "http_request_db_commands", "Mongo commands (getMore included) issued per request", ["endpoint"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34)
+)
+QUERY_BUDGET_VIOLATIONS = registry.counter(
+    "db_query_budget_violations_total", "Requests over the per-request Mongo query budget", ["endpoint"]
+)
+
+class QueryGuardMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as log:
+            await self.app(scope, receive, send)
+
+        # The router leaves the matched endpoint in the scope
+        endpoint = getattr(scope.get("endpoint"), "__name__", "unmatched")
+        REQUEST_DB_COMMANDS.observe(log.commands, endpoint=endpoint)
+        problem = check_query_budget(log, settings.DB_QUERY_BUDGET, settings.DB_REPEATED_QUERY_THRESHOLD)
+        if problem is None:
+            return
+        QUERY_BUDGET_VIOLATIONS.inc(endpoint=endpoint)
+        message = f"{scope['method']} {scope['path']} exceeded the query budget: {problem}"
+        if settings.DB_QUERY_GUARD_STRICT or settings.ENVIRONMENT == "test":
+            raise QueryBudgetExceeded(message)
+        print(message)
@@ -179,6 +179,7 @@ class OrderStatus(str, Enum):
 
 class OrderItem(BaseModel):
     product_id: PyObjectId
+    vendor_id: Optional[PyObjectId] = None
     product_name: str
     quantity: int
     unit_price: float
@@ -233,6 +234,9 @@ class ChatSession(BaseModel):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     user_id: PyObjectId
     messages: List[ChatMessage] = []
+    summary: str = ""  # rolling summary of messages older than the prompt window
+    message_count: int = 0
+    last_message_preview: str = ""
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
@@ -1,18 +1,117 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-import openai
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
+import asyncio
+import json
 from app.config.database import get_database
 from app.config.settings import settings
 from app.models import ChatSession, ChatMessage, User, Product
 from app.services.auth import get_current_active_user
+from app.services.cache import ResponseCache, normalize_query
+from app.services.catalog import get_catalog_version, get_categories
+from app.services.chat_history import append_turn, session_projection
+from app.services.llm import LLMError, llm_client
+from app.services.product_loader import CARD_PROJECTION, load_products, product_card
+from app.services.prompt_builder import PromptBuilder
+from app.services.query_parser import extract_price, merge_model_interpretation, parse_query
+from app.services.similarity import similarity_index
 from bson import ObjectId
 
-# Configure OpenAI
-if settings.OPENAI_API_KEY:
-    openai.api_key = settings.OPENAI_API_KEY
-
 router = APIRouter()
 
+# Model answers keyed on normalized query, filters and catalog version
+recommendation_cache = ResponseCache(
+    "ai_recommendations", settings.AI_CACHE_MAX_ENTRIES, settings.AI_CACHE_TTL_SECONDS
+)
+search_assistant_cache = ResponseCache(
+    "ai_search_assistant", settings.AI_CACHE_MAX_ENTRIES, settings.AI_CACHE_TTL_SECONDS
+)
+
+SYSTEM_PROMPT = """
+You are an AI shopping concierge for AisleMarts, a mobile marketplace. 
+Help customers find products, answer questions about orders, and provide shopping assistance.
+Be helpful, friendly, and concise. Catalog products matching the customer's
+message are listed for you; only recommend products from that list and refer
+to them by name. If none of them fit, say so rather than inventing products.
+"""
+
+async def _get_or_create_session(db, user_id, session_id: Optional[str]) -> dict:
+    if session_id and ObjectId.is_valid(session_id):
+        chat_session = await db.chat_sessions.find_one(
+            {"_id": ObjectId(session_id), "user_id": user_id},
+            session_projection()
+        )
+        if not chat_session:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Chat session not found"
+            )
+        return chat_session
+    
+    # Create new session
+    now = datetime.utcnow()
+    chat_session = {
+        "_id": ObjectId(),
+        "user_id": user_id,
+        "messages": [],
+        "summary": "",
+        "message_count": 0,
+        "last_message_preview": "",
+        "created_at": now,
+        "updated_at": now
+    }
+    await db.chat_sessions.insert_one(chat_session)
+    return chat_session
+
+async def _retrieve_products(db, text: str) -> List[dict]:
+    """Best catalog matches for a chat message, best first"""
+    ranked = await asyncio.to_thread(
+        similarity_index.search, text, settings.CHAT_RETRIEVAL_PRODUCTS
+    )
+    if not ranked:
+        return []
+    return await load_products(
+        db,
+        [product_id for product_id, _ in ranked],
+        {"name": 1, "price": 1, "stock_quantity": 1}
+    )
+
+async def _load_chat_context(db, user_id, session_id: Optional[str], message: str):
+    """Session and grounding products, loaded concurrently"""
+    return await asyncio.gather(
+        _get_or_create_session(db, user_id, session_id),
+        _retrieve_products(db, message)
+    )
+
+def _prompt_messages(chat_session: dict, new_messages: List[dict],
+                     products: List[dict] = ()) -> List[dict]:
+    """System prompt, matching products, summary and recent messages within the token budget"""
+    recent = (chat_session["messages"] + new_messages)[-settings.CHAT_PROMPT_MESSAGES:]
+    builder = PromptBuilder("chat", settings.LLM_CHAT_PROMPT_TOKENS)
+    builder.add_text("system", "system", SYSTEM_PROMPT, priority=0, required=True)
+    builder.add_list(
+        "products", "system", "Matching catalog products (id | name | price | in stock):",
+        [
+            f"{product['_id']} | {product['name']} | ${product['price']} | "
+            f"{product.get('stock_quantity', 0)}"
+            for product in products
+        ],
+        priority=1
+    )
+    if chat_session.get("summary"):
+        builder.add_text(
+            "summary", "system",
+            f"Summary of the earlier conversation:\n{chat_session['summary']}",
+            priority=2, keep_end=True
+        )
+    builder.add_messages("history", recent[:-1], priority=1)
+    builder.add_text("query", "user", recent[-1]["content"], priority=0, required=True)
+    return builder.build()
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
 @router.post("/chat", response_model=dict)
 async def chat_with_ai(
     message: str,
@@ -20,71 +119,30 @@ async def chat_with_ai(
     current_user: User = Depends(get_current_active_user),
     db = Depends(get_database)
 ):
-    if not settings.OPENAI_API_KEY:
+    if not llm_client.configured:
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="AI service not configured"
         )
     
-    # Get or create chat session
-    if session_id and ObjectId.is_valid(session_id):
-        chat_session = await db.chat_sessions.find_one({
-            "_id": ObjectId(session_id),
-            "user_id": current_user.id
-        })
-        if not chat_session:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Chat session not found"
-            )
-    else:
-        # Create new session
-        chat_session = {
-            "_id": ObjectId(),
-            "user_id": current_user.id,
-            "messages": []
-        }
-        await db.chat_sessions.insert_one(chat_session)
-    
-    # Add user message to session
-    user_message = ChatMessage(role="user", content=message)
-    chat_session["messages"].append(user_message.dict())
-    
-    # Prepare context for AI
-    system_message = """
-    You are an AI shopping concierge for AisleMarts, a mobile marketplace. 
-    Help customers find products, answer questions about orders, and provide shopping assistance.
-    Be helpful, friendly, and concise. If you need specific product information, 
-    you can search the product catalog.
-    """
+    # Get or create chat session while retrieving matching products
+    chat_session, products = await _load_chat_context(db, current_user.id, session_id, message)
     
     # Prepare messages for OpenAI API
-    messages = [{"role": "system", "content": system_message}]
-    
-    # Add conversation history (last 10 messages to keep context manageable)
-    for msg in chat_session["messages"][-10:]:
-        messages.append({"role": msg["role"], "content": msg["content"]})
+    user_message = ChatMessage(role="user", content=message).dict()
+    messages = _prompt_messages(chat_session, [user_message], products)
     
     try:
         # Get AI response
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
+        ai_response = await llm_client.chat(
+            messages,
             max_tokens=500,
             temperature=0.7
         )
         
-        ai_response = response.choices[0].message.content
-        
-        # Add AI response to session
-        ai_message = ChatMessage(role="assistant", content=ai_response)
-        chat_session["messages"].append(ai_message.dict())
-        
-        # Update session in database
-        await db.chat_sessions.update_one(
-            {"_id": chat_session["_id"]},
-            {"$set": {"messages": chat_session["messages"]}}
-        )
+        # Append both messages to the session
+        ai_message = ChatMessage(role="assistant", content=ai_response).dict()
+        await append_turn(db, chat_session, [user_message, ai_message])
         
         return {
             "response": ai_response,
@@ -97,23 +155,69 @@ async def chat_with_ai(
             detail=f"AI service error: {str(e)}"
         )
 
+@router.post("/chat/stream")
+async def chat_with_ai_stream(
+    message: str,
+    session_id: str = None,
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_database)
+):
+    """
+    Same as /chat, but streams the reply as Server-Sent Events:
+    `session` first, then one `token` event per delta, then `done`
+    (or `error`). The assistant message is saved once the stream completes.
+    """
+    if not llm_client.configured:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="AI service not configured"
+        )
+    
+    chat_session, products = await _load_chat_context(db, current_user.id, session_id, message)
+    user_message = ChatMessage(role="user", content=message).dict()
+    messages = _prompt_messages(chat_session, [user_message], products)
+    session_ref = {"session_id": str(chat_session["_id"])}
+    
+    async def events():
+        yield _sse("session", session_ref)
+        parts = []
+        try:
+            async for delta in llm_client.stream_chat(messages, max_tokens=500, temperature=0.7):
+                parts.append(delta)
+                yield _sse("token", {"delta": delta})
+        except LLMError as e:
+            yield _sse("error", {"detail": f"AI service error: {str(e)}"})
+            return
+        
+        ai_message = ChatMessage(role="assistant", content="".join(parts)).dict()
+        await append_turn(db, chat_session, [user_message, ai_message])
+        yield _sse("done", session_ref)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/sessions", response_model=List[dict])
 async def get_chat_sessions(
     current_user: User = Depends(get_current_active_user),
     db = Depends(get_database)
 ):
+    # Summary fields are maintained on write; message bodies are never read
     sessions = await db.chat_sessions.find(
-        {"user_id": current_user.id}
-    ).sort("created_at", -1).to_list(length=20)
+        {"user_id": current_user.id},
+        {"created_at": 1, "updated_at": 1, "message_count": 1, "last_message_preview": 1}
+    ).sort("updated_at", -1).to_list(length=20)
     
-    # Return session summaries
     session_summaries = []
     for session in sessions:
         summary = {
             "id": str(session["_id"]),
             "created_at": session["created_at"],
-            "message_count": len(session["messages"]),
-            "last_message": session["messages"][-1]["content"][:100] + "..." if session["messages"] else ""
+            "updated_at": session.get("updated_at", session["created_at"]),
+            "message_count": session.get("message_count", 0),
+            "last_message": session.get("last_message_preview", "")
         }
         session_summaries.append(summary)
     
@@ -179,95 +283,90 @@ async def get_ai_recommendations(
 ):
     """Get AI-powered product recommendations"""
     
-    # Build product filter
-    filter_query = {"status": "active"}
-    if category:
-        filter_query["category"] = category
+    # "20-80", "under 50", ... read like the search assistant reads prices
+    price = extract_price((price_range or "").lower(), price_context=True)
+    min_price, max_price = price["min_price"], price["max_price"]
     
-    # Get products
-    products = await db.products.find(filter_query).limit(50).to_list(length=50)
+    # Rank the whole catalog locally; the model only re-ranks the best matches
+    ranked = await asyncio.to_thread(
+        similarity_index.search, query, 20, category, min_price, max_price
+    )
+    if ranked:
+        products = await load_products(
+            db, [product_id for product_id, _ in ranked], CARD_PROJECTION
+        )
+    else:
+        # Nothing in the index matches the query text
+        filter_query = {"status": "active"}
+        if category:
+            filter_query["category"] = category
+        if min_price is not None or max_price is not None:
+            filter_query["price"] = {}
+            if min_price is not None:
+                filter_query["price"]["$gte"] = min_price
+            if max_price is not None:
+                filter_query["price"]["$lte"] = max_price
+        products = await db.products.find(filter_query, CARD_PROJECTION).limit(20).to_list(length=20)
     
     if not products:
         return []
     
-    # Prepare product descriptions for AI
-    product_descriptions = []
-    for product in products:
-        desc = f"{product['name']}: {product['description']} - ${product['price']}"
-        product_descriptions.append({
-            "id": str(product["_id"]),
-            "description": desc,
-            "price": product["price"],
-            "category": product["category"]
-        })
+    if not llm_client.configured:
+        # Best local matches without AI
+        return [product_card(product) for product in products[:5]]
     
-    if settings.OPENAI_API_KEY:
-        try:
-            # Get AI recommendations
-            prompt = f"""
-            Based on the query "{query}" and the following products, recommend the 5 most relevant products.
-            Consider relevance, price, and user preference.
-            
-            Products: {product_descriptions[:20]}  # Limit to prevent token overflow
-            
-            Return only the product IDs as a comma-separated list.
-            """
-            
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=200,
-                temperature=0.3
-            )
-            
-            # Parse AI response
-            recommended_ids = response.choices[0].message.content.strip().split(',')
-            recommended_ids = [id.strip() for id in recommended_ids if ObjectId.is_valid(id.strip())]
-            
-            # Get recommended products
-            recommendations = []
-            for product_id in recommended_ids[:5]:
-                product = await db.products.find_one({"_id": ObjectId(product_id)})
-                if product:
-                    recommendations.append({
-                        "id": str(product["_id"]),
-                        "name": product["name"],
-                        "description": product["description"],
-                        "price": product["price"],
-                        "category": product["category"],
-                        "images": product.get("images", [])
-                    })
-            
-            return recommendations
-            
-        except Exception as e:
-            # Fallback to simple random selection
-            import random
-            random_products = random.sample(products, min(5, len(products)))
-            return [
-                {
-                    "id": str(product["_id"]),
-                    "name": product["name"],
-                    "description": product["description"],
-                    "price": product["price"],
-                    "category": product["category"],
-                    "images": product.get("images", [])
-                }
-                for product in random_products
-            ]
-    else:
-        # Simple fallback recommendations without AI
-        return [
-            {
-                "id": str(product["_id"]),
-                "name": product["name"],
-                "description": product["description"],
-                "price": product["price"],
-                "category": product["category"],
-                "images": product.get("images", [])
-            }
-            for product in products[:5]
+    async def ask_model():
+        # Best local matches first, so the budget drops the weakest ones
+        builder = PromptBuilder("recommendations", settings.LLM_RECOMMENDATION_PROMPT_TOKENS)
+        builder.add_text(
+            "instructions", "system",
+            "Recommend the 5 products most relevant to the shopper's query. "
+            "Consider relevance, price, and user preference. "
+            "Return only the product IDs as a comma-separated list.",
+            priority=0, required=True
+        )
+        builder.add_list(
+            "products", "user", "Products (id | name | price | category | description):",
+            [
+                f"{product['_id']} | {product['name']} | ${product['price']} | "
+                f"{product['category']} | {product['description'][:200]}"
+                for product in products
+            ],
+            priority=1
+        )
+        builder.add_text("query", "user", f'Query: "{query}"', priority=0, required=True)
+        
+        return await llm_client.chat(
+            builder.build(),
+            max_tokens=200,
+            temperature=0.3
+        )
+    
+    try:
+        # Repeated queries against the same catalog are answered from cache
+        cache_key = (
+            normalize_query(query),
+            category or "",
+            min_price,
+            max_price,
+            await get_catalog_version(db)
+        )
+        content = await recommendation_cache.get_or_load(cache_key, ask_model)
+        
+        # Parse AI response; only candidates we sent are accepted
+        candidates = {str(product["_id"]): product for product in products}
+        recommended_ids = [id.strip() for id in content.strip().split(',')]
+        recommendations = [
+            product_card(candidates[product_id])
+            for product_id in dict.fromkeys(recommended_ids)
+            if product_id in candidates
         ]
+        
+        return recommendations[:5]
+        
+    except Exception as e:
+        # Fall back to the local ranking
+        return [product_card(product) for product in products[:5]]
 
 @router.post("/search-assistant", response_model=dict)
 async def ai_search_assistant(
@@ -277,48 +376,41 @@ async def ai_search_assistant(
 ):
     """Convert natural language query to structured search"""
     
-    if not settings.OPENAI_API_KEY:
-        # Simple keyword extraction fallback
-        keywords = natural_query.lower().split()
-        return {
-            "search_query": natural_query,
-            "suggested_category": None,
-            "price_range": None,
-            "keywords": keywords
-        }
+    # Most queries are resolved locally into list_products filters
+    categories = await get_categories(db)
+    parsed = parse_query(natural_query, categories)
+    parsed["original_query"] = natural_query
+    parsed["source"] = "local"
+    if not parsed["ambiguous"] or not llm_client.configured:
+        return parsed
+    
+    prompt = f"""
+    Convert this natural language shopping query into structured search parameters:
+    "{natural_query}"
+    
+    Return only a JSON object with:
+    - search_query: a few concrete product search terms
+    - suggested_category: one of {", ".join(categories) or "none"}, or null
+    - price_range: low, medium or high if implied, else null
+    - min_price / max_price: numbers if a price is mentioned, else null
+    - keywords: array of important keywords
+    """
     
     try:
-        prompt = f"""
-        Convert this natural language shopping query into structured search parameters:
-        "{natural_query}"
-        
-        Return a JSON object with:
-        - search_query: cleaned search terms
-        - suggested_category: product category if mentioned
-        - price_range: if price mentioned (low/medium/high)
-        - keywords: array of important keywords
-        
-        Categories include: electronics, clothing, books, home, sports, beauty, toys
-        """
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[{"role": "user", "content": prompt}],
-            max_tokens=200,
-            temperature=0.3
+        cache_key = (normalize_query(natural_query), await get_catalog_version(db))
+        ai_response = await search_assistant_cache.get_or_load(
+            cache_key,
+            lambda: llm_client.chat(
+                [{"role": "user", "content": prompt}],
+                max_tokens=200,
+                temperature=0.3
+            )
         )
         
-        # Parse the response (simplified - in production, use proper JSON parsing)
-        ai_response = response.choices[0].message.content
-        
-        return {
-            "ai_interpretation": ai_response,
-            "original_query": natural_query
-        }
+        result = merge_model_interpretation(parsed, ai_response, categories)
+        result["source"] = "llm"
+        return result
         
     except Exception as e:
-        return {
-            "search_query": natural_query,
-            "error": "AI processing unavailable",
-            "keywords": natural_query.split()
-        }
\ No newline at end of file
+        parsed["error"] = "AI processing unavailable"
+        return parsed
@@ -3,10 +3,16 @@ from typing import List
 from app.config.database import get_database
 from app.models import Cart, CartItem, User, Product
 from app.services.auth import get_current_active_user
+from app.services.cooccurrence import cooccurrence
+from app.services.product_loader import CARD_PROJECTION, load_product_cards, load_products_by_id, product_card
 from bson import ObjectId
+import asyncio
 
 router = APIRouter()
 
+def cart_total(items) -> float:
+    return sum(item["quantity"] * item["price"] for item in items)
+
 @router.get("/", response_model=Cart)
 async def get_cart(
     current_user: User = Depends(get_current_active_user),
@@ -26,6 +32,42 @@ async def get_cart(
     
     return Cart(**cart)
 
+@router.get("/details", response_model=dict)
+async def get_cart_details(
+    current_user: User = Depends(get_current_active_user),
+    db = Depends(get_database)
+):
+    """Cart lines with product cards, plus products often bought with them"""
+    cart = await db.carts.find_one({"user_id": current_user.id})
+    items = cart["items"] if cart else []
+    product_ids = [item["product_id"] for item in items]
+    
+    recommended = cooccurrence.recommend_for_basket(product_ids, k=10)
+    products, suggestions = await asyncio.gather(
+        load_products_by_id(db, product_ids, {**CARD_PROJECTION, "stock_quantity": 1, "status": 1}),
+        load_product_cards(db, [other for other, _ in recommended], active_only=True)
+    )
+    
+    lines = []
+    for item in items:
+        product = products.get(item["product_id"])
+        lines.append({
+            "product_id": str(item["product_id"]),
+            "quantity": item["quantity"],
+            "price": item["price"],
+            "product": product_card(product) if product else None,
+            "available": bool(
+                product and product.get("status") == "active"
+                and product.get("stock_quantity", 0) >= item["quantity"]
+            )
+        })
+    
+    return {
+        "items": lines,
+        "total_amount": cart["total_amount"] if cart else 0.0,
+        "bought_together": suggestions[:5]
+    }
+
 @router.post("/items", response_model=dict)
 async def add_to_cart(
     product_id: str,
@@ -102,7 +144,7 @@ async def add_to_cart(
         cart["items"].append(cart_item)
     
     # Recalculate total
-    total_amount = sum(item["quantity"] * item["price"] for item in cart["items"])
+    total_amount = cart_total(cart["items"])
     
     # Update cart in database
     await db.carts.update_one(
@@ -173,7 +215,7 @@ async def update_cart_item(
         )
     
     # Recalculate total
-    total_amount = sum(item["quantity"] * item["price"] for item in updated_items)
+    total_amount = cart_total(updated_items)
     
     # Update cart
     await db.carts.update_one(
@@ -221,7 +263,7 @@ async def remove_from_cart(
         )
     
     # Recalculate total
-    total_amount = sum(item["quantity"] * item["price"] for item in updated_items)
+    total_amount = cart_total(updated_items)
     
     # Update cart
     await db.carts.update_one(
@@ -1,19 +1,28 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from typing import List, Optional
-import stripe
-import uuid
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
 from app.config.database import get_database
 from app.config.settings import settings
 from app.models import Order, OrderItem, OrderStatus, ShippingAddress, User
 from app.services.auth import get_current_active_user
+from app.services import vendor_stats
+from app.services.cooccurrence import cooccurrence
+from app.services.ids import new_order_number
+from app.services.integrations import get_stripe
+from app.services.metrics import external_call
+from app.services.order_state import transition_order
+from app.services.product_loader import load_products_by_id
 from bson import ObjectId
 
-# Configure Stripe
-if settings.STRIPE_SECRET_KEY:
-    stripe.api_key = settings.STRIPE_SECRET_KEY
-
 router = APIRouter()
 
+# An order number clash needs two processes on the same worker id (a lapsed
+# lease, or none at all) in the same millisecond, so a fresh number all but
+# always succeeds
+ORDER_NUMBER_ATTEMPTS = 3
+
 @router.post("/create", response_model=dict)
 async def create_order(
     shipping_address: ShippingAddress,
@@ -32,8 +41,10 @@ async def create_order(
     order_items = []
     total_amount = 0
     
+    # One query for every product in the cart
+    products = await load_products_by_id(db, [item["product_id"] for item in cart["items"]])
     for cart_item in cart["items"]:
-        product = await db.products.find_one({"_id": cart_item["product_id"]})
+        product = products.get(cart_item["product_id"])
         if not product:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -55,6 +66,7 @@ async def create_order(
         # Create order item
         order_item = OrderItem(
             product_id=cart_item["product_id"],
+            vendor_id=product["vendor_id"],
             product_name=product["name"],
             quantity=cart_item["quantity"],
             unit_price=product["price"],
@@ -63,21 +75,23 @@ async def create_order(
         order_items.append(order_item)
         total_amount += order_item.total_price
     
-    # Generate order number
-    order_number = f"ORD-{uuid.uuid4().hex[:8].upper()}"
+    # Time-ordered order number; unique while this process holds its worker id lease
+    order_number = new_order_number()
     
     # Create Stripe payment intent
     payment_intent = None
     if settings.STRIPE_SECRET_KEY:
+        stripe = get_stripe()
         try:
-            payment_intent = stripe.PaymentIntent.create(
-                amount=int(total_amount * 100),  # Amount in cents
-                currency='usd',
-                metadata={
-                    'order_number': order_number,
-                    'user_id': str(current_user.id)
-                }
-            )
+            with external_call("stripe", "payment_intents.create"):
+                payment_intent = stripe.PaymentIntent.create(
+                    amount=int(total_amount * 100),  # Amount in cents
+                    currency='usd',
+                    metadata={
+                        'order_number': order_number,
+                        'user_id': str(current_user.id)
+                    }
+                )
         except stripe.error.StripeError as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -85,25 +99,53 @@ async def create_order(
             )
     
     # Create order
+    now = datetime.utcnow()
     order_dict = {
         "_id": ObjectId(),
         "user_id": current_user.id,
         "order_number": order_number,
-        "items": [item.dict() for item in order_items],
+        # dict() serializes ObjectIds to str; keep them queryable by items.vendor_id
+        "items": [
+            {**item.dict(), "product_id": item.product_id, "vendor_id": item.vendor_id}
+            for item in order_items
+        ],
         "total_amount": total_amount,
         "status": OrderStatus.PENDING,
         "shipping_address": shipping_address.dict(),
-        "payment_intent_id": payment_intent.id if payment_intent else None
+        "payment_intent_id": payment_intent.id if payment_intent else None,
+        "created_at": now,
+        "updated_at": now
     }
     
-    result = await db.orders.insert_one(order_dict)
+    for attempt in range(ORDER_NUMBER_ATTEMPTS):
+        try:
+            result = await db.orders.insert_one(order_dict)
+            break
+        except DuplicateKeyError as e:
+            if "order_number" not in (e.details or {}).get("keyPattern", {}) or attempt == ORDER_NUMBER_ATTEMPTS - 1:
+                raise
+            order_dict["order_number"] = new_order_number()
+            if payment_intent:
+                # Webhooks match on the intent id; the metadata is for people reading the dashboard
+                stripe = get_stripe()
+                try:
+                    with external_call("stripe", "payment_intents.modify"):
+                        stripe.PaymentIntent.modify(
+                            payment_intent.id, metadata={"order_number": order_dict["order_number"]}
+                        )
+                except stripe.error.StripeError as stripe_error:
+                    print(f"Failed to update order number on {payment_intent.id}: {stripe_error}")
+    await vendor_stats.record_order_created(db, order_dict)
+    cooccurrence.add_basket(item.product_id for item in order_items)
     
-    # Update product stock quantities
-    for cart_item in cart["items"]:
-        await db.products.update_one(
+    # Update product stock quantities in one round trip
+    await db.products.bulk_write([
+        UpdateOne(
             {"_id": cart_item["product_id"]},
             {"$inc": {"stock_quantity": -cart_item["quantity"]}}
         )
+        for cart_item in cart["items"]
+    ], ordered=False)
     
     # Clear cart
     await db.carts.update_one(
@@ -114,7 +156,7 @@ async def create_order(
     response_data = {
         "message": "Order created successfully",
         "order_id": str(result.inserted_id),
-        "order_number": order_number,
+        "order_number": order_dict["order_number"],
         "total_amount": total_amount
     }
     
@@ -135,7 +177,9 @@ async def get_user_orders(
     if status:
         filter_query["status"] = status
     
-    orders = await db.orders.find(filter_query).sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
+    # ObjectIds are generated at checkout and lead with their creation
+    # time, so the (user_id, _id) index returns newest first without a sort
+    orders = await db.orders.find(filter_query).sort("_id", -1).skip(skip).limit(limit).to_list(length=limit)
     return [Order(**order) for order in orders]
 
 @router.get("/{order_id}", response_model=Order)
@@ -187,10 +231,16 @@ async def confirm_order_payment(
             detail="Order not found"
         )
     
+    # Already confirmed by the Stripe webhook, no need to ask Stripe again
+    if order["status"] == OrderStatus.CONFIRMED:
+        return {"message": "Order confirmed successfully"}
+    
     # Verify payment with Stripe
     if settings.STRIPE_SECRET_KEY:
+        stripe = get_stripe()
         try:
-            payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+            with external_call("stripe", "payment_intents.retrieve"):
+                payment_intent = stripe.PaymentIntent.retrieve(payment_intent_id)
             if payment_intent.status != "succeeded":
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
@@ -202,11 +252,17 @@ async def confirm_order_payment(
                 detail=f"Payment verification error: {str(e)}"
             )
     
-    # Update order status
-    await db.orders.update_one(
-        {"_id": ObjectId(order_id)},
-        {"$set": {"status": OrderStatus.CONFIRMED}}
+    # Update order status; a concurrent webhook may already have confirmed it
+    confirmed = await transition_order(
+        db, {"_id": order["_id"]}, OrderStatus.CONFIRMED
     )
+    if not confirmed:
+        current = await db.orders.find_one({"_id": order["_id"]}, {"status": 1})
+        if not current or current["status"] != OrderStatus.CONFIRMED:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Order cannot be confirmed"
+            )
     
     return {"message": "Order confirmed successfully"}
 
@@ -222,41 +278,44 @@ async def cancel_order(
             detail="Invalid order ID"
         )
     
-    order = await db.orders.find_one({
-        "_id": ObjectId(order_id),
-        "user_id": current_user.id
-    })
+    # Guarded transition: only one concurrent cancel can succeed and restock
+    order = await transition_order(
+        db,
+        {"_id": ObjectId(order_id), "user_id": current_user.id},
+        OrderStatus.CANCELLED
+    )
     
     if not order:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Order not found"
+        exists = await db.orders.find_one(
+            {"_id": ObjectId(order_id), "user_id": current_user.id},
+            {"_id": 1}
         )
-    
-    if order["status"] not in [OrderStatus.PENDING, OrderStatus.CONFIRMED]:
+        if not exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Order not found"
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Order cannot be cancelled"
         )
     
-    # Restore product stock
-    for item in order["items"]:
-        await db.products.update_one(
+    # Restore product stock in one round trip
+    restock = [
+        UpdateOne(
             {"_id": item["product_id"]},
             {"$inc": {"stock_quantity": item["quantity"]}}
         )
-    
-    # Update order status
-    await db.orders.update_one(
-        {"_id": ObjectId(order_id)},
-        {"$set": {"status": OrderStatus.CANCELLED}}
-    )
+        for item in order["items"]
+    ]
+    if restock:
+        await db.products.bulk_write(restock, ordered=False)
     
     return {"message": "Order cancelled successfully"}
 
 @router.get("/vendor/orders")
 async def get_vendor_orders(
-    status: Optional[OrderStatus] = None,
+    order_status: Optional[OrderStatus] = Query(None, alias="status"),
     skip: int = 0,
     limit: int = 10,
     current_user: User = Depends(get_current_active_user),
@@ -270,10 +329,11 @@ async def get_vendor_orders(
             detail="Vendor profile not found"
         )
     
-    # Find orders containing vendor's products
+    # Find orders containing vendor's products. Served by the
+    # (items.vendor_id, [status,] created_at) indexes from init_db.py.
     filter_query = {"items.vendor_id": vendor["_id"]}
-    if status:
-        filter_query["status"] = status
+    if order_status:
+        filter_query["status"] = order_status
     
     orders = await db.orders.find(filter_query).sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit)
     return [Order(**order) for order in orders]
\ No newline at end of file
@@ -1,12 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Query
+from pydantic import TypeAdapter
 from typing import List, Optional
-from app.config.database import get_database
+from app.config.database import get_database, get_read_database
+from app.config.settings import settings
 from app.models import Product, ProductCreate, ProductUpdate, ProductStatus, User
 from app.services.auth import get_current_active_user, get_current_vendor
+from app.services import vendor_stats
+from app.services.cache import ResponseCache
+from app.services.catalog import bump_catalog_version, get_catalog_version, read_catalog_version
+from app.services.compression import EncodedBody, encoded_response
+from app.services.cooccurrence import cooccurrence
+from app.services.product_loader import load_product_cards
+from app.services.similarity import similarity_index
 from bson import ObjectId
+from datetime import datetime
+import re
 
 router = APIRouter()
 
+# Rendered catalog pages keyed on their parameters and the catalog version,
+# with compressed variants stored alongside. The TTL bounds how stale stock
+# counts get, since checkouts change stock without bumping the version.
+catalog_cache = ResponseCache(
+    "catalog_pages", settings.CATALOG_CACHE_MAX_ENTRIES, settings.CATALOG_CACHE_TTL_SECONDS
+)
+PRODUCT_LIST = TypeAdapter(List[Product])
+
+async def render_at_version(read_db, version: int, render):
+    """
+    Render a catalog cache miss from the secondary-preferred read_db, no
+    older than `version` (read from the primary, so it is the cache key).
+    The node's own version is read first in a causally consistent session,
+    so the page read after it reflects at least that version; a secondary
+    still behind `version` is passed over for the primary.
+    """
+    async with await read_db.client.start_session(causal_consistency=True) as session:
+        if await read_catalog_version(read_db, session) >= version:
+            return await render(read_db, session)
+    return await render(await get_database(), None)
+
 @router.post("/", response_model=dict)
 async def create_product(
     product_data: ProductCreate,
@@ -31,8 +63,13 @@ async def create_product(
     product_dict = product_data.dict()
     product_dict["vendor_id"] = vendor["_id"]
     product_dict["_id"] = ObjectId()
+    product_dict["status"] = ProductStatus.ACTIVE
+    product_dict["created_at"] = product_dict["updated_at"] = datetime.utcnow()
     
     result = await db.products.insert_one(product_dict)
+    await vendor_stats.record_product_created(db, vendor["_id"], product_dict["status"])
+    similarity_index.upsert(product_dict)
+    similarity_index.note_local_write(await bump_catalog_version(db, result.inserted_id))
     
     return {
         "message": "Product created successfully",
@@ -41,13 +78,16 @@ async def create_product(
 
 @router.get("/", response_model=List[Product])
 async def list_products(
+    request: Request,
     category: Optional[str] = None,
     status: Optional[ProductStatus] = None,
     vendor_id: Optional[str] = None,
     search: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
     skip: int = 0,
     limit: int = 20,
-    db = Depends(get_database)
+    db = Depends(get_read_database)
 ):
     filter_query = {}
     
@@ -57,14 +97,30 @@ async def list_products(
         filter_query["status"] = status
     if vendor_id and ObjectId.is_valid(vendor_id):
         filter_query["vendor_id"] = ObjectId(vendor_id)
-    if search:
-        filter_query["$or"] = [
-            {"name": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}}
+    if min_price is not None or max_price is not None:
+        filter_query["price"] = {}
+        if min_price is not None:
+            filter_query["price"]["$gte"] = min_price
+        if max_price is not None:
+            filter_query["price"]["$lte"] = max_price
+    if search and search.split():
+        # Every term must appear in the name or description
+        filter_query["$and"] = [
+            {"$or": [
+                {"name": {"$regex": re.escape(term), "$options": "i"}},
+                {"description": {"$regex": re.escape(term), "$options": "i"}}
+            ]}
+            for term in search.split()
         ]
     
-    products = await db.products.find(filter_query).skip(skip).limit(limit).to_list(length=limit)
-    return [Product(**product) for product in products]
+    async def render(db, session):
+        products = await db.products.find(filter_query, session=session).skip(skip).limit(limit).to_list(length=limit)
+        return EncodedBody(PRODUCT_LIST.dump_json([Product(**product) for product in products], by_alias=True))
+    
+    version = await get_catalog_version(await get_database())
+    cache_key = ("list", category, status, vendor_id, search, min_price, max_price, skip, limit, version)
+    body = await catalog_cache.get_or_load(cache_key, lambda: render_at_version(db, version, render))
+    return encoded_response(body, request.headers.get("accept-encoding"))
 
 @router.get("/my-products", response_model=List[Product])
 async def get_my_products(
@@ -89,21 +145,45 @@ async def get_my_products(
     return [Product(**product) for product in products]
 
 @router.get("/{product_id}", response_model=Product)
-async def get_product(product_id: str, db = Depends(get_database)):
+async def get_product(product_id: str, request: Request, db = Depends(get_read_database)):
     if not ObjectId.is_valid(product_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid product ID"
         )
     
-    product = await db.products.find_one({"_id": ObjectId(product_id)})
-    if not product:
+    async def render(db, session):
+        product = await db.products.find_one({"_id": ObjectId(product_id)}, session=session)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
+            )
+        return EncodedBody(Product(**product).model_dump_json(by_alias=True).encode())
+    
+    version = await get_catalog_version(await get_database())
+    body = await catalog_cache.get_or_load(
+        ("product", product_id, version), lambda: render_at_version(db, version, render)
+    )
+    return encoded_response(body, request.headers.get("accept-encoding"))
+
+@router.get("/{product_id}/bought-together", response_model=List[dict])
+async def get_bought_together(
+    product_id: str,
+    limit: int = Query(5, ge=1, le=20),
+    db = Depends(get_read_database)
+):
+    """Products most often ordered together with this one"""
+    if not ObjectId.is_valid(product_id):
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Product not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid product ID"
         )
     
-    return Product(**product)
+    # Ask for a few extra to make up for inactive neighbours
+    neighbors = cooccurrence.neighbors(product_id, limit * 2)
+    cards = await load_product_cards(db, [other for other, _ in neighbors], active_only=True)
+    return cards[:limit]
 
 @router.put("/{product_id}", response_model=dict)
 async def update_product(
@@ -140,11 +220,22 @@ async def update_product(
     # Update product
     update_data = {k: v for k, v in product_update.dict().items() if v is not None}
     if update_data:
+        update_data["updated_at"] = datetime.utcnow()
         result = await db.products.update_one(
             {"_id": ObjectId(product_id)},
             {"$set": update_data}
         )
         
+        similarity_index.upsert({**product, **update_data})
+        similarity_index.note_local_write(await bump_catalog_version(db, product["_id"]))
+        if "status" in update_data:
+            await vendor_stats.record_product_status_changed(
+                db,
+                vendor["_id"],
+                product.get("status", ProductStatus.ACTIVE),
+                update_data["status"]
+            )
+        
         return {"message": "Product updated successfully"}
     
     return {"message": "No changes to update"}
@@ -169,21 +260,27 @@ async def delete_product(
             detail="Vendor profile not found"
         )
     
-    result = await db.products.delete_one({
-        "_id": ObjectId(product_id),
-        "vendor_id": vendor["_id"]
-    })
+    deleted = await db.products.find_one_and_delete(
+        {"_id": ObjectId(product_id), "vendor_id": vendor["_id"]},
+        projection={"status": 1}
+    )
     
-    if result.deleted_count == 0:
+    if not deleted:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found or not owned by vendor"
         )
     
+    await vendor_stats.record_product_deleted(
+        db, vendor["_id"], deleted.get("status", ProductStatus.ACTIVE)
+    )
+    similarity_index.remove(deleted["_id"])
+    similarity_index.note_local_write(await bump_catalog_version(db, deleted["_id"]))
+    
     return {"message": "Product deleted successfully"}
 
 @router.get("/categories/list", response_model=List[str])
-async def get_product_categories(db = Depends(get_database)):
+async def get_product_categories(db = Depends(get_read_database)):
     """Get list of all available product categories"""
     categories = await db.products.distinct("category")
     return categories
@@ -192,7 +289,7 @@ async def get_product_categories(db = Depends(get_database)):
 async def get_search_suggestions(
     q: str = Query(..., min_length=2),
     limit: int = 5,
-    db = Depends(get_database)
+    db = Depends(get_read_database)
 ):
     """Get search suggestions based on product names"""
     products = await db.products.find(
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
-from app.config.database import get_database
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from typing import List, Optional
+from datetime import datetime
+from app.config.database import get_database, get_read_database
 from app.models import Vendor, VendorCreate, VendorStatus, User
 from app.services.auth import get_current_active_user, get_current_vendor
+from app.services.vendor_stats import get_vendor_stats
+from app.services.exports import (
+    CURSOR_BATCH_SIZE,
+    ENCODERS,
+    gzip_stream,
+    sales_export_pipeline,
+)
 from bson import ObjectId
 
 router = APIRouter()
@@ -77,7 +86,7 @@ async def list_vendors(
     status: VendorStatus = None,
     skip: int = 0,
     limit: int = 10,
-    db = Depends(get_database)
+    db = Depends(get_read_database)
 ):
     filter_query = {}
     if status:
@@ -87,7 +96,7 @@ async def list_vendors(
     return [Vendor(**vendor) for vendor in vendors]
 
 @router.get("/{vendor_id}", response_model=Vendor)
-async def get_vendor(vendor_id: str, db = Depends(get_database)):
+async def get_vendor(vendor_id: str, db = Depends(get_read_database)):
     if not ObjectId.is_valid(vendor_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -148,21 +157,56 @@ async def get_vendor_dashboard_stats(
             detail="Vendor profile not found"
         )
     
-    # Get vendor statistics
-    total_products = await db.products.count_documents({"vendor_id": vendor["_id"]})
-    active_products = await db.products.count_documents({
-        "vendor_id": vendor["_id"],
-        "status": "active"
-    })
-    
-    # Get recent orders (simplified)
-    recent_orders = await db.orders.count_documents({
-        "items.vendor_id": vendor["_id"]
-    })
+    # Single point read of the incrementally maintained counters
+    stats = await get_vendor_stats(db, vendor["_id"])
+    products = stats.get("products", {})
+    orders = stats.get("orders", {})
     
     return {
-        "total_products": total_products,
-        "active_products": active_products,
-        "recent_orders": recent_orders,
+        "total_products": products.get("total", 0),
+        "active_products": products.get("active", 0),
+        "products_by_status": {k: v for k, v in products.items() if k != "total"},
+        "recent_orders": orders.get("total", 0),
+        "orders_by_status": orders.get("by_status", {}),
+        "total_revenue": stats.get("revenue", {}).get("total", 0.0),
+        "revenue_by_day": stats.get("revenue_by_day", {}),
         "vendor_status": vendor["status"]
-    }
\ No newline at end of file
+    }
+
+@router.get("/dashboard/sales-export")
+async def export_vendor_sales(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    gzip: bool = False,
+    current_user: User = Depends(get_current_vendor),
+    db = Depends(get_read_database)
+):
+    """Stream the vendor's order lines for a date range as CSV or NDJSON"""
+    vendor = await db.vendors.find_one({"user_id": current_user.id})
+    if not vendor:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Vendor profile not found"
+        )
+    
+    # Rows are encoded straight off the cursor, one batch in memory at a time
+    cursor = db.orders.aggregate(
+        sales_export_pipeline(vendor["_id"], start, end),
+        allowDiskUse=True,
+        batchSize=CURSOR_BATCH_SIZE
+    )
+    encode, media_type = ENCODERS[format]
+    body = encode(cursor)
+    
+    filename = f"sales-{vendor['_id']}.{format}"
+    if gzip:
+        body = gzip_stream(body)
+        media_type = "application/gzip"
+        filename += ".gz"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -0,0 +1,52 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from typing import Optional
+from pymongo.errors import DuplicateKeyError
+from app.config.database import get_database
+from app.config.settings import settings
+from app.services.integrations import get_stripe
+from app.services.payment_events import event_record, payment_events
+
+router = APIRouter()
+
+@router.post("/stripe", response_model=dict)
+async def stripe_webhook(
+    request: Request,
+    stripe_signature: Optional[str] = Header(None, alias="Stripe-Signature"),
+    db = Depends(get_database)
+):
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Stripe webhooks not configured"
+        )
+    
+    if not stripe_signature:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Missing Stripe signature"
+        )
+    
+    # Verify against the raw body, re-serialized JSON would not match
+    payload = await request.body()
+    stripe = get_stripe()
+    try:
+        event = stripe.Webhook.construct_event(
+            payload, stripe_signature, settings.STRIPE_WEBHOOK_SECRET
+        )
+    except (ValueError, stripe.error.SignatureVerificationError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid webhook signature"
+        )
+    
+    # Record first so redeliveries are dropped by the unique event id
+    record = event_record(event)
+    try:
+        await db.stripe_events.insert_one(record)
+    except DuplicateKeyError:
+        return {"received": True, "duplicate": True}
+    
+    # Order updates are applied in batches by the payment event worker
+    payment_events.enqueue(record)
+    
+    return {"received": True}
@@ -0,0 +1,56 @@
+"""
+Production server pieces for gunicorn (see gunicorn.conf.py)
+
+The gunicorn master preloads the app, forks the workers and restarts any
+that exit. Each worker is a uvicorn server on uvloop and httptools.
+
+- SIGTERM to the master drains: workers stop accepting, finish in-flight
+  requests for up to graceful_timeout minus a margin, then run the
+  shutdown handlers (background tasks cancelled, Mongo pool closed).
+- A worker exits after max_requests (+ jitter) requests and is replaced,
+  which bounds slow memory growth.
+- The configured integrations (stripe, openai, bcrypt) are imported in
+  the master before forking, so workers start with them loaded.
+- Every worker gets a slot 0..workers-1, reused by its replacement, which
+  labels its stats. Order number worker ids are leased from MongoDB by
+  each worker's startup (app/services/leases.py), not derived from the
+  slot, so they stay distinct across hosts too.
+
+    gunicorn app.main:app -c gunicorn.conf.py
+"""
+from typing import Set
+from uvicorn.workers import UvicornWorker
+from app.services import startup, worker_stats
+
+# Time kept back from graceful_timeout for the shutdown handlers
+SHUTDOWN_MARGIN_SECONDS = 5
+
+class ProductionWorker(UvicornWorker):
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Without a limit uvicorn waits for in-flight requests until the
+        # master loses patience and SIGKILLs the worker mid-shutdown
+        self.config.timeout_graceful_shutdown = max(1, self.cfg.graceful_timeout - SHUTDOWN_MARGIN_SECONDS)
+
+class WorkerSlots:
+    """Lowest free slot per worker, allocated in the master before fork"""
+
+    def __init__(self):
+        self._used: Set[int] = set()
+
+    def acquire(self, worker):
+        slot = 0
+        while slot in self._used:
+            slot += 1
+        self._used.add(slot)
+        worker.slot = slot
+
+    def release(self, worker):
+        self._used.discard(getattr(worker, "slot", None))
+
+def on_worker_start(worker):
+    """In the worker, right after fork"""
+    worker_stats.configure(worker.slot, worker.max_requests)
+    startup.worker_started()
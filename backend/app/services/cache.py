@@ -0,0 +1,118 @@
+"""
+In-process response cache
+
+`ResponseCache` is a TTL + LRU map with single-flight loading: concurrent
+`get_or_load` calls for the same key share one loader call instead of each
+going upstream. If the caller running the loader is cancelled (a client
+disconnect), one of the waiters runs its own loader instead. Hits, misses
+and coalesced waits are exported as metrics labelled with the cache name.
+"""
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from app.services.metrics import registry
+
+CACHE_REQUESTS = registry.counter(
+    "cache_requests_total", "Cache lookups by result (hit, miss, coalesced)", ["cache", "result"]
+)
+CACHE_EVICTIONS = registry.counter(
+    "cache_evictions_total", "Entries evicted to stay under max_entries", ["cache"]
+)
+CACHE_ENTRIES = registry.gauge(
+    "cache_entries", "Entries currently held", ["cache"]
+)
+
+_MISSING = object()
+# Result of a load whose caller was cancelled: waiters retry
+_ABANDONED = object()
+_WORD = re.compile(r"[a-z0-9$.]+")
+
+def normalize_query(text: str) -> str:
+    """Case, punctuation, spacing and word order insensitive form of a query"""
+    words = _WORD.findall((text or "").lower())
+    return " ".join(sorted(word.strip(".") for word in words if word.strip(".")))
+
+class ResponseCache:
+    def __init__(self, name: str, max_entries: int = 1024, ttl_seconds: float = 600):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            CACHE_ENTRIES.set(len(self._entries), cache=self.name)
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            CACHE_EVICTIONS.inc(cache=self.name)
+        CACHE_ENTRIES.set(len(self._entries), cache=self.name)
+
+    def clear(self):
+        self._entries.clear()
+        CACHE_ENTRIES.set(0, cache=self.name)
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        while True:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                CACHE_REQUESTS.inc(cache=self.name, result="hit")
+                return value
+
+            pending = self._loading.get(key)
+            if pending is None:
+                break
+            CACHE_REQUESTS.inc(cache=self.name, result="coalesced")
+            value = await asyncio.shield(pending)
+            if value is not _ABANDONED:
+                return value
+
+        CACHE_REQUESTS.inc(cache=self.name, result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        try:
+            value = await loader()
+        except Exception as e:
+            # Waiters see the same failure; nothing is cached
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody was waiting
+            raise
+        else:
+            self.set(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._loading[key]
+            if not future.done():
+                # Cancelled: the first waiter to wake takes over the load
+                future.set_result(_ABANDONED)
+
+    def stats(self) -> dict:
+        hits = CACHE_REQUESTS.value(cache=self.name, result="hit")
+        coalesced = CACHE_REQUESTS.value(cache=self.name, result="coalesced")
+        misses = CACHE_REQUESTS.value(cache=self.name, result="miss")
+        total = hits + coalesced + misses
+        return {
+            "entries": len(self._entries),
+            "hits": hits,
+            "coalesced": coalesced,
+            "misses": misses,
+            "hit_rate": (hits + coalesced) / total if total else 0.0,
+        }
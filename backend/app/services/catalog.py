@@ -0,0 +1,64 @@
+"""
+Catalog version
+
+A counter in `catalog_meta` bumped by every product create, update and
+delete. Caches derived from the catalog include it in their keys, so a
+product change makes their old entries unreachable without explicit
+invalidation. Reads are memoized per process for
+CATALOG_VERSION_REFRESH_SECONDS, so other workers see a bump within that
+window.
+
+Each bump also records which product changed in `catalog_changes`, keyed
+by the new version, so in-memory indexes catch up on just those products.
+A deleted product's record is its tombstone: it is no longer found. A bump
+without a product (bulk loads) tells readers to reload everything.
+"""
+import time
+from datetime import datetime
+from pymongo import ReturnDocument
+from app.config.settings import settings
+
+CATALOG_META_ID = "catalog"
+
+_cached_version = None
+_cached_at = 0.0
+
+def _remember(version: int):
+    global _cached_version, _cached_at
+    _cached_version = version
+    _cached_at = time.monotonic()
+
+async def get_catalog_version(db) -> int:
+    if _cached_version is not None and time.monotonic() - _cached_at < settings.CATALOG_VERSION_REFRESH_SECONDS:
+        return _cached_version
+    version = await read_catalog_version(db)
+    _remember(version)
+    return version
+
+async def read_catalog_version(db, session=None) -> int:
+    """The version as seen by the node db reads from, never memoized"""
+    meta = await db.catalog_meta.find_one({"_id": CATALOG_META_ID}, {"version": 1}, session=session)
+    return meta["version"] if meta else 0
+
+async def bump_catalog_version(db, product_id=None) -> int:
+    meta = await db.catalog_meta.find_one_and_update(
+        {"_id": CATALOG_META_ID},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    _remember(meta["version"])
+    await db.catalog_changes.insert_one(
+        {"_id": meta["version"], "product_id": product_id, "created_at": datetime.utcnow()}
+    )
+    return meta["version"]
+
+_categories = (None, [])
+
+async def get_categories(db) -> list:
+    """Distinct product categories, re-read when the catalog version changes"""
+    global _categories
+    version = await get_catalog_version(db)
+    if _categories[0] != version:
+        _categories = (version, sorted(c for c in await db.products.distinct("category") if c))
+    return _categories[1]
@@ -0,0 +1,92 @@
+"""
+Bounded chat session history
+
+Each turn is appended with `$push` + `$each` + `$slice`, so a session
+document never holds more than CHAT_HISTORY_MAX_MESSAGES messages and a
+turn writes only the new messages, never the whole array. Sessions are
+read with a `$slice` projection of the last CHAT_PROMPT_MESSAGES - 1
+messages: with the user's new message that is exactly the prompt window.
+
+Messages that scroll out of that stored window are folded into `summary`,
+a short extractive digest (one clipped line per message, oldest lines
+dropped beyond CHAT_SUMMARY_MAX_CHARS) that is sent ahead of the recent
+messages. It is built locally, so it costs no extra model call, and its
+size is bounded, so the per-turn write stays constant however long the
+session runs.
+
+The same update keeps `message_count`, `last_message_preview` and
+`updated_at` current, so the session list never has to read messages.
+"""
+from datetime import datetime
+from typing import List
+from app.config.settings import settings
+
+SUMMARY_LINE_CHARS = 160
+PREVIEW_CHARS = 100
+
+def message_preview(message: dict) -> str:
+    """Denormalized last_message_preview shown in the session list"""
+    return message["content"][:PREVIEW_CHARS] + "..."
+
+def stored_window() -> int:
+    """Stored messages sent with each prompt; the user's new message completes it"""
+    return max(settings.CHAT_PROMPT_MESSAGES - 1, 1)
+
+def session_projection() -> dict:
+    return {
+        "user_id": 1,
+        "summary": 1,
+        "created_at": 1,
+        "messages": {"$slice": -stored_window()},
+    }
+
+def _summary_line(message: dict) -> str:
+    speaker = "User" if message["role"] == "user" else "Assistant"
+    content = " ".join(message["content"].split())
+    if len(content) > SUMMARY_LINE_CHARS:
+        content = content[:SUMMARY_LINE_CHARS - 3].rstrip() + "..."
+    return f"{speaker}: {content}"
+
+def fold_into_summary(summary: str, messages: List[dict], max_chars: int) -> str:
+    """Append messages to the rolling summary, dropping the oldest lines over max_chars"""
+    lines = [line for line in (summary or "").split("\n") if line]
+    lines.extend(_summary_line(message) for message in messages)
+    while lines and len("\n".join(lines)) > max_chars:
+        lines.pop(0)
+    return "\n".join(lines)
+
+def turn_update(chat_session: dict, new_messages: List[dict]) -> dict:
+    """
+    Update document appending new_messages to a session loaded with
+    session_projection(); chat_session["messages"] holds the stored window.
+    Whatever leaves that window is folded into the summary, so every message
+    reaches the prompt either verbatim or summarized.
+    """
+    window = stored_window()
+    recent = chat_session.get("messages", [])
+    overflow = len(recent) + len(new_messages) - window
+    update = {
+        "$push": {
+            "messages": {
+                "$each": new_messages,
+                "$slice": -settings.CHAT_HISTORY_MAX_MESSAGES
+            }
+        },
+        "$inc": {"message_count": len(new_messages)},
+        "$set": {
+            "updated_at": datetime.utcnow(),
+            "last_message_preview": message_preview(new_messages[-1])
+        }
+    }
+    if overflow > 0:
+        dropped = (recent + new_messages)[:overflow]
+        update["$set"]["summary"] = fold_into_summary(
+            chat_session.get("summary", ""), dropped, settings.CHAT_SUMMARY_MAX_CHARS
+        )
+    return update
+
+async def append_turn(db, chat_session: dict, new_messages: List[dict]):
+    await db.chat_sessions.update_one(
+        {"_id": chat_session["_id"]},
+        turn_update(chat_session, new_messages)
+    )
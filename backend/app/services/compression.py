@@ -0,0 +1,109 @@
+"""
+Response compression
+
+`negotiate` picks the encoding for a request from Accept-Encoding: brotli
+when the client accepts it and the brotli package is installed, else
+gzip, else none. Bodies under COMPRESSION_MIN_BYTES are never compressed;
+the framing overhead outweighs the saving.
+
+`EncodedBody` holds one rendered response body plus its compressed forms,
+each made the first time a client asks for it and reused after that. It
+is what the catalog cache stores, so a hot page is compressed once per
+encoding per cache entry rather than on every hit.
+
+Compression work and its input/output sizes are recorded as metrics.
+"""
+import gzip
+import time
+from typing import Dict, Optional
+from fastapi.responses import Response
+from app.config.settings import settings
+from app.services.metrics import registry
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSION_SECONDS = registry.histogram(
+    "http_compression_seconds", "CPU time spent compressing one response body", ["encoding"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025)
+)
+COMPRESSION_INPUT_BYTES = registry.counter(
+    "http_compression_input_bytes_total", "Response bytes before compression", ["encoding"]
+)
+COMPRESSION_OUTPUT_BYTES = registry.counter(
+    "http_compression_output_bytes_total", "Response bytes after compression", ["encoding"]
+)
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """Encoding -> q-value from an Accept-Encoding header"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip()] = quality
+    return accepted
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    if not accept_encoding:
+        return None
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    # Brotli first on a tie: smaller output at a similar CPU cost
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for coding in candidates:
+        quality = accepted.get(coding, wildcard)
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+def compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(COMPRESSIBLE_TYPES)
+
+def compress(body: bytes, encoding: str) -> bytes:
+    start = time.process_time()
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=settings.BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=settings.GZIP_LEVEL, mtime=0)
+    COMPRESSION_SECONDS.observe(time.process_time() - start, encoding=encoding)
+    COMPRESSION_INPUT_BYTES.inc(len(body), encoding=encoding)
+    COMPRESSION_OUTPUT_BYTES.inc(len(compressed), encoding=encoding)
+    return compressed
+
+class EncodedBody:
+    def __init__(self, body: bytes, media_type: str = "application/json"):
+        self.body = body
+        self.media_type = media_type
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, accept_encoding: Optional[str]):
+        """(body, encoding or None) to send for this Accept-Encoding"""
+        if len(self.body) < settings.COMPRESSION_MIN_BYTES:
+            return self.body, None
+        encoding = negotiate(accept_encoding)
+        if encoding is None:
+            return self.body, None
+        compressed = self._encoded.get(encoding)
+        if compressed is None:
+            compressed = self._encoded[encoding] = compress(self.body, encoding)
+        return compressed, encoding
+
+def encoded_response(body: EncodedBody, accept_encoding: Optional[str]) -> Response:
+    content, encoding = body.encoded(accept_encoding)
+    headers = {"Vary": "Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content, media_type=body.media_type, headers=headers)
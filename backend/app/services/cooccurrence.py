@@ -0,0 +1,193 @@
+"""
+"Frequently bought together" from order baskets
+
+For every product the model keeps the products that appeared in the same
+orders and how often, as bounded neighbour lists:
+
+- each product keeps at most `max_neighbors` neighbours (the least
+  frequent are pruned once a list reaches twice that),
+- at most `max_products` products are tracked, least recently bought
+  evicted first,
+
+so memory is O(max_products * max_neighbors) whatever the order volume.
+Each product's neighbours are sorted lazily and cached until its next
+update, so a lookup is a slice of the top k.
+
+`create_order` adds each new basket. A periodic rebuild from the orders
+collection (lookback window, cancelled orders excluded) corrects for
+cancellations and for baskets recorded by other workers. Only the leader
+scans the orders: it publishes the model as a build, one document per
+product in `cooccurrence`, and points `cooccurrence_meta` at it. Every
+worker polls the meta document and loads a new build in the background,
+so startup never waits for the scan.
+"""
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from app.config.settings import settings
+from app.models import OrderStatus
+
+# Pairs grow quadratically with basket size; very large baskets are rare
+# and say little about affinity
+MAX_BASKET_ITEMS = 50
+META_ID = "model"
+# How often workers look for a new build
+SYNC_POLL_SECONDS = 60
+PUBLISH_BATCH_SIZE = 1000
+
+class CoOccurrenceModel:
+    def __init__(self, max_products: int = 50000, max_neighbors: int = 50):
+        self.max_products = max_products
+        self.max_neighbors = max_neighbors
+        self._lock = threading.Lock()
+        self._neighbors: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self._ranked: Dict[str, List[Tuple[str, int]]] = {}
+        self.baskets = 0
+        self.build: Optional[ObjectId] = None
+
+    def __len__(self) -> int:
+        return len(self._neighbors)
+
+    def _prune(self, counts: Dict[str, int]):
+        keep = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self.max_neighbors]
+        counts.clear()
+        counts.update(keep)
+
+    def add_basket(self, product_ids: Iterable):
+        products = list(dict.fromkeys(str(product_id) for product_id in product_ids))[:MAX_BASKET_ITEMS]
+        if len(products) < 2:
+            return
+        with self._lock:
+            self.baskets += 1
+            for product in products:
+                counts = self._neighbors.pop(product, None) or {}
+                # Re-inserted at the end: most recently bought
+                self._neighbors[product] = counts
+                for other in products:
+                    if other != product:
+                        counts[other] = counts.get(other, 0) + 1
+                if len(counts) >= 2 * self.max_neighbors:
+                    self._prune(counts)
+                self._ranked.pop(product, None)
+            while len(self._neighbors) > self.max_products:
+                evicted, _ = self._neighbors.popitem(last=False)
+                self._ranked.pop(evicted, None)
+
+    def neighbors(self, product_id, k: int = 10) -> List[Tuple[str, int]]:
+        """Top-k (product_id, times bought together), most frequent first"""
+        product_id = str(product_id)
+        ranked = self._ranked.get(product_id)
+        if ranked is None:
+            with self._lock:
+                counts = self._neighbors.get(product_id)
+                if not counts:
+                    return []
+                ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self.max_neighbors]
+                self._ranked[product_id] = ranked
+        return ranked[:k]
+
+    def recommend_for_basket(self, product_ids: Iterable, k: int = 10) -> List[Tuple[str, int]]:
+        """Products most often bought with anything in the basket, excluding the basket"""
+        basket = {str(product_id) for product_id in product_ids}
+        scores: Dict[str, int] = {}
+        for product_id in basket:
+            for other, count in self.neighbors(product_id, self.max_neighbors):
+                if other not in basket:
+                    scores[other] = scores.get(other, 0) + count
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    async def rebuild(self, db, lookback_days: Optional[int] = None) -> int:
+        """Recount from orders, returns baskets read"""
+        query = {"status": {"$ne": OrderStatus.CANCELLED}}
+        if lookback_days:
+            # Order _ids are creation-time ordered, so this rides the _id index
+            cutoff = datetime.utcnow() - timedelta(days=lookback_days)
+            query["_id"] = {"$gte": ObjectId.from_datetime(cutoff)}
+        fresh = CoOccurrenceModel(self.max_products, self.max_neighbors)
+        count = 0
+        async for order in db.orders.find(query, {"items.product_id": 1}).sort("_id", 1).batch_size(1000):
+            fresh.add_basket(item["product_id"] for item in order.get("items", []))
+            count += 1
+        with self._lock:
+            self._neighbors, self._ranked, self.baskets = fresh._neighbors, fresh._ranked, fresh.baskets
+        return count
+
+    async def publish(self, db, previous: Optional[ObjectId]) -> Optional[ObjectId]:
+        """Store this model as the current build, unless another build replaced `previous` meanwhile"""
+        build = ObjectId()
+        with self._lock:
+            # Least recently bought first, so loading keeps the eviction order
+            products = [(product, dict(counts)) for product, counts in self._neighbors.items()]
+            baskets = self.baskets
+        for start in range(0, len(products), PUBLISH_BATCH_SIZE):
+            await db.cooccurrence.insert_many([
+                {"build": build, "product_id": product, "neighbors": list(counts.items())}
+                for product, counts in products[start:start + PUBLISH_BATCH_SIZE]
+            ], ordered=False)
+        try:
+            result = await db.cooccurrence_meta.update_one(
+                {"_id": META_ID, "build": previous},
+                {"$set": {"build": build, "previous": previous, "baskets": baskets, "built_at": datetime.utcnow()}},
+                upsert=True
+            )
+            published = result.matched_count == 1 or previous is None
+        except DuplicateKeyError:
+            published = False
+        if not published:
+            await db.cooccurrence.delete_many({"build": build})
+            return None
+        self.build = build
+        # Keep the previous build for workers still loading it
+        await db.cooccurrence.delete_many({"build": {"$nin": [build, previous]}})
+        return build
+
+    async def load(self, db) -> bool:
+        """Swap in the stored build if it differs from ours"""
+        meta = await db.cooccurrence_meta.find_one({"_id": META_ID})
+        if not meta or meta["build"] == self.build:
+            return False
+        fresh = CoOccurrenceModel(self.max_products, self.max_neighbors)
+        async for doc in db.cooccurrence.find(
+            {"build": meta["build"]}, {"product_id": 1, "neighbors": 1}
+        ).sort("_id", 1).batch_size(PUBLISH_BATCH_SIZE):
+            fresh._neighbors[doc["product_id"]] = {other: count for other, count in doc["neighbors"]}
+        with self._lock:
+            self._neighbors, self._ranked = fresh._neighbors, fresh._ranked
+            self.baskets, self.build = meta["baskets"], meta["build"]
+        return True
+
+    async def sync(self, db, rebuild_seconds: float, lookback_days: Optional[int], leader) -> str:
+        """One step of run_sync_loop: rebuild and publish on the leader when due, else load"""
+        meta = await db.cooccurrence_meta.find_one({"_id": META_ID}, {"build": 1, "built_at": 1})
+        due = meta is None or (
+            rebuild_seconds > 0 and datetime.utcnow() - meta["built_at"] >= timedelta(seconds=rebuild_seconds)
+        )
+        if due and leader.is_leader:
+            baskets = await self.rebuild(db, lookback_days)
+            if await self.publish(db, meta["build"] if meta else None):
+                return f"Published the bought-together model from {baskets} orders"
+        if await self.load(db):
+            return f"Loaded bought-together model {self.build}"
+        return ""
+
+    async def run_sync_loop(self, get_db, rebuild_seconds: float, lookback_days: Optional[int], leader):
+        """Keep the model on the stored build; the leader rebuilds it every rebuild_seconds (0: only when none is stored)"""
+        while True:
+            try:
+                message = await self.sync(await get_db(), rebuild_seconds, lookback_days, leader)
+                if message:
+                    print(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Co-occurrence sync failed: {e}")
+            await asyncio.sleep(SYNC_POLL_SECONDS)
+
+cooccurrence = CoOccurrenceModel(
+    max_products=settings.COOCCURRENCE_MAX_PRODUCTS,
+    max_neighbors=settings.COOCCURRENCE_MAX_NEIGHBORS
+)
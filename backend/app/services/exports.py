@@ -0,0 +1,105 @@
+"""
+Streaming vendor sales exports
+
+Rows come straight off a Mongo aggregation cursor and are encoded into
+chunks of roughly CHUNK_SIZE bytes, optionally gzip-compressed as they are
+produced, so an export holds at most one cursor batch and one chunk in
+memory no matter how many orders it covers.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterable, AsyncIterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+CURSOR_BATCH_SIZE = 1000
+
+SALES_EXPORT_FIELDS = [
+    "order_number",
+    "order_id",
+    "created_at",
+    "status",
+    "product_id",
+    "product_name",
+    "quantity",
+    "unit_price",
+    "total_price",
+]
+
+def sales_export_pipeline(vendor_id, start: Optional[datetime] = None, end: Optional[datetime] = None) -> list:
+    """One row per order line of this vendor, oldest first"""
+    match = {"items.vendor_id": vendor_id}
+    if start or end:
+        match["created_at"] = {}
+        if start:
+            match["created_at"]["$gte"] = start
+        if end:
+            match["created_at"]["$lt"] = end
+
+    return [
+        # Served by the (items.vendor_id, created_at) index
+        {"$match": match},
+        {"$sort": {"created_at": 1}},
+        {"$unwind": "$items"},
+        {"$match": {"items.vendor_id": vendor_id}},
+        {"$project": {
+            "_id": 0,
+            "order_number": 1,
+            "order_id": {"$toString": "$_id"},
+            "created_at": 1,
+            "status": 1,
+            "product_id": {"$toString": "$items.product_id"},
+            "product_name": "$items.product_name",
+            "quantity": "$items.quantity",
+            "unit_price": "$items.unit_price",
+            "total_price": "$items.total_price",
+        }},
+    ]
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+async def iter_csv(rows: AsyncIterable[dict]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(SALES_EXPORT_FIELDS)
+    async for row in rows:
+        writer.writerow([_export_value(row.get(field)) for field in SALES_EXPORT_FIELDS])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+async def iter_ndjson(rows: AsyncIterable[dict]) -> AsyncIterator[bytes]:
+    lines = []
+    size = 0
+    async for row in rows:
+        line = json.dumps({field: _export_value(row.get(field)) for field in SALES_EXPORT_FIELDS})
+        lines.append(line)
+        size += len(line) + 1
+        if size >= CHUNK_SIZE:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+            size = 0
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
+
+async def gzip_stream(chunks: AsyncIterable[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Compress a byte stream incrementally into a single gzip member"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip header
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+ENCODERS = {
+    "csv": (iter_csv, "text/csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+}
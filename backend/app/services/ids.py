@@ -0,0 +1,120 @@
+"""
+Time-ordered unique ids (Snowflake layout)
+
+    | 41 bits ms since EPOCH_MS | 10 bits worker id | 12 bits sequence |
+
+Ids from one worker are strictly increasing, ids from different workers
+never collide as long as their worker ids differ, and the fixed-width
+base32 rendering sorts the same way as the integer. New keys therefore land
+at the right-hand edge of B-tree indexes instead of random pages.
+
+Distinct worker ids come from leases in MongoDB (app/services/leases.py),
+taken at startup and passed in with `set_worker_id`. Until then (scripts,
+tests, Mongo unreachable at startup) a process uses a random id, and
+`create_order` retries the rare order number clash that allows.
+"""
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# Crockford base32: no I, L, O or U, so numbers read back unambiguously
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ENCODED_LENGTH = 13  # ceil(64 / 5)
+
+class SnowflakeGenerator:
+    def __init__(self, worker_id: int, epoch_ms: int = EPOCH_MS):
+        if not 0 <= worker_id <= MAX_WORKER_ID:
+            raise ValueError(f"worker_id must be between 0 and {MAX_WORKER_ID}")
+        self.worker_id = worker_id
+        self.epoch_ms = epoch_ms
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _now_ms(self) -> int:
+        return time.time_ns() // 1_000_000 - self.epoch_ms
+
+    def next_id(self) -> int:
+        with self._lock:
+            now = self._now_ms()
+            # Never go backwards if the wall clock is stepped back: keep
+            # issuing from the last timestamp until the clock catches up
+            if now < self._last_ms:
+                now = self._last_ms
+
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # 4096 ids issued this millisecond, wait for the next one
+                    while now <= self._last_ms:
+                        time.sleep(0.0001)
+                        now = self._now_ms()
+            else:
+                self._sequence = 0
+
+            self._last_ms = now
+            return (now << (WORKER_BITS + SEQUENCE_BITS)) | (self.worker_id << SEQUENCE_BITS) | self._sequence
+
+def encode_id(value: int) -> str:
+    """Fixed-width base32 so string order matches numeric order"""
+    chars = []
+    for _ in range(ENCODED_LENGTH):
+        value, remainder = divmod(value, 32)
+        chars.append(ALPHABET[remainder])
+    return "".join(reversed(chars))
+
+def decode_id(text: str) -> int:
+    value = 0
+    for char in text.upper():
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+def id_timestamp_ms(value: int, epoch_ms: int = EPOCH_MS) -> int:
+    """Unix time in ms at which an id was generated"""
+    return (value >> (WORKER_BITS + SEQUENCE_BITS)) + epoch_ms
+
+_worker_id: Optional[int] = None
+_worker_id_pid: Optional[int] = None
+
+def set_worker_id(worker_id: int):
+    """Use a leased worker id in this process from now on"""
+    global _worker_id, _worker_id_pid
+    _worker_id = worker_id & MAX_WORKER_ID
+    _worker_id_pid = os.getpid()
+    reset_id_generator()
+
+def default_worker_id(pid: Optional[int] = None) -> int:
+    """The id leased by this process, otherwise a random one"""
+    pid = os.getpid() if pid is None else pid
+    if _worker_id is not None and _worker_id_pid == pid:
+        return _worker_id
+    # A forked child does not own its parent's lease
+    return random.randrange(MAX_WORKER_ID + 1)
+
+_generator: Optional[SnowflakeGenerator] = None
+_generator_pid: Optional[int] = None
+
+def get_id_generator() -> SnowflakeGenerator:
+    """Per-process generator; rebuilt after fork so workers get distinct ids"""
+    global _generator, _generator_pid
+    pid = os.getpid()
+    if _generator is None or _generator_pid != pid:
+        _generator = SnowflakeGenerator(default_worker_id(pid))
+        _generator_pid = pid
+    return _generator
+
+def reset_id_generator():
+    """Rebuild on next use, e.g. after the worker id changes"""
+    global _generator
+    _generator = None
+
+def new_order_number() -> str:
+    return f"ORD-{encode_id(get_id_generator().next_id())}"
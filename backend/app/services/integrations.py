@@ -0,0 +1,50 @@
+"""
+Lazily loaded third-party integrations
+
+`stripe` (~290 ms to import) and `openai` (~300 ms) are only used by the
+checkout, webhook and concierge routes, and passlib's bcrypt backend only
+at registration and login. Imported with app.main they made every cold
+start pay for them whether or not they were configured.
+
+Callers get them through the accessors below, which import and configure
+each one on first use. `preload()` loads the configured ones ahead of
+traffic: the startup warm-up calls it in every worker, and the gunicorn
+master calls it before forking so workers inherit them.
+"""
+import functools
+from typing import List
+from app.config.settings import settings
+
+@functools.lru_cache(maxsize=None)
+def get_stripe():
+    """The stripe module, configured from settings"""
+    import stripe
+    if settings.STRIPE_SECRET_KEY:
+        stripe.api_key = settings.STRIPE_SECRET_KEY
+    if settings.STRIPE_API_BASE:
+        stripe.api_base = settings.STRIPE_API_BASE
+    return stripe
+
+@functools.lru_cache(maxsize=None)
+def get_openai():
+    import openai
+    return openai
+
+@functools.lru_cache(maxsize=None)
+def get_password_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+def preload() -> List[str]:
+    """Load the configured integrations now; returns their names"""
+    loaded = []
+    if settings.STRIPE_SECRET_KEY or settings.STRIPE_WEBHOOK_SECRET:
+        get_stripe()
+        loaded.append("stripe")
+    if settings.OPENAI_API_KEY:
+        get_openai()
+        loaded.append("openai")
+    # Picks the bcrypt backend without paying for a hash
+    get_password_context().handler("bcrypt").get_backend()
+    loaded.append("bcrypt")
+    return loaded
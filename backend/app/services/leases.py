@@ -0,0 +1,156 @@
+"""
+Leases in MongoDB
+
+A lease is a document in `leases` naming its owner and when it expires.
+A process takes a free or expired lease with one conditional upsert (the
+unique `_id` makes a lost race a DuplicateKeyError) and keeps it by
+renewing it every third of LEASE_TTL_SECONDS. If the owner dies, the
+lease lapses and another process can take it.
+
+`WorkerIdLease` holds one `worker_id:<n>` lease per process, so no two
+live processes issue order numbers with the same Snowflake worker id
+(app/services/ids.py), on one host or many.
+
+`Leader` holds a named lease so that jobs which must run in one place
+(vendor stats reconciliation, ...) run in exactly one process across all
+workers and hosts; the others stand by and take over within a TTL if it
+dies.
+
+Expiry is compared against the application servers' clocks, which must
+agree to well within the TTL (NTP keeps them within milliseconds).
+"""
+import asyncio
+import os
+import random
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo.errors import DuplicateKeyError
+from app.config.settings import settings
+from app.services.ids import MAX_WORKER_ID, set_worker_id
+
+_owner: Optional[str] = None
+_owner_pid: Optional[int] = None
+
+def process_owner() -> str:
+    """Identifies this process in the leases it holds; new after fork"""
+    global _owner, _owner_pid
+    if _owner is None or _owner_pid != os.getpid():
+        _owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        _owner_pid = os.getpid()
+    return _owner
+
+async def acquire(db, name: str, owner: str, ttl_seconds: float) -> bool:
+    """Take or renew the named lease; False while another owner holds it"""
+    now = datetime.utcnow()
+    try:
+        await db.leases.update_one(
+            {"_id": name, "$or": [{"owner": owner}, {"expires_at": {"$lt": now}}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds), "renewed_at": now}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+async def release(db, name: str, owner: str):
+    await db.leases.delete_one({"_id": name, "owner": owner})
+
+class WorkerIdLease:
+    def __init__(self, ttl_seconds: float = 30, owner: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.worker_id: Optional[int] = None
+        self._owner = owner
+
+    @property
+    def owner(self) -> str:
+        return self._owner or process_owner()
+
+    @staticmethod
+    def lease_name(worker_id: int) -> str:
+        return f"worker_id:{worker_id}"
+
+    async def acquire(self, db, preferred: Optional[int] = None) -> int:
+        """Lease a free worker id, trying `preferred` first, and switch the id generator to it"""
+        start = preferred & MAX_WORKER_ID if preferred is not None else random.randrange(MAX_WORKER_ID + 1)
+        for offset in range(MAX_WORKER_ID + 1):
+            candidate = (start + offset) & MAX_WORKER_ID
+            if await acquire(db, self.lease_name(candidate), self.owner, self.ttl_seconds):
+                self.worker_id = candidate
+                set_worker_id(candidate)
+                return candidate
+        raise RuntimeError(f"All {MAX_WORKER_ID + 1} worker ids are leased")
+
+    async def release(self, db):
+        if self.worker_id is not None:
+            await release(db, self.lease_name(self.worker_id), self.owner)
+            self.worker_id = None
+
+    async def renew(self, db) -> int:
+        """Renew the lease, or lease another id if it lapsed and was taken"""
+        if self.worker_id is not None and await acquire(
+            db, self.lease_name(self.worker_id), self.owner, self.ttl_seconds
+        ):
+            return self.worker_id
+        if self.worker_id is not None:
+            print(f"Lost the lease on worker id {self.worker_id}, leasing another")
+        return await self.acquire(db)
+
+    async def run(self, get_db):
+        """Heartbeat: renew well before the lease expires"""
+        while True:
+            await asyncio.sleep(self.ttl_seconds / 3)
+            try:
+                await self.renew(await get_db())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Worker id lease renewal failed: {e}")
+
+class Leader:
+    def __init__(self, name: str, ttl_seconds: float = 30, owner: Optional[str] = None):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self._owner = owner
+        self._held_until = 0.0
+
+    @property
+    def owner(self) -> str:
+        return self._owner or process_owner()
+
+    @property
+    def is_leader(self) -> bool:
+        # Trusted only until the lease would have expired without a renewal
+        return time.monotonic() < self._held_until
+
+    async def try_acquire(self, db) -> bool:
+        started = time.monotonic()
+        if await acquire(db, self.name, self.owner, self.ttl_seconds):
+            self._held_until = started + self.ttl_seconds
+        else:
+            self._held_until = 0.0
+        return self.is_leader
+
+    async def release(self, db):
+        if self.is_leader:
+            self._held_until = 0.0
+            await release(db, self.name, self.owner)
+
+    async def run(self, get_db):
+        """Campaign for the lease, and renew it while held"""
+        while True:
+            try:
+                was_leader = self.is_leader
+                if await self.try_acquire(await get_db()) and not was_leader:
+                    print(f"Took the {self.name} lease")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"{self.name} lease renewal failed: {e}")
+            await asyncio.sleep(self.ttl_seconds / 3)
+
+worker_id_lease = WorkerIdLease(settings.LEASE_TTL_SECONDS)
+# Runs the jobs that must not run in every worker
+leader = Leader("background_jobs", settings.LEASE_TTL_SECONDS)
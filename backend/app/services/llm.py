@@ -0,0 +1,230 @@
+"""
+Async LLM client for the AI concierge
+
+All concierge model calls go through `llm_client`, which wraps the async
+OpenAI client with:
+
+- a process-wide semaphore (LLM_MAX_CONCURRENCY) so a traffic spike queues
+  here instead of opening hundreds of upstream requests,
+- a per-attempt timeout (LLM_TIMEOUT_SECONDS),
+- retries with exponential backoff and jitter for timeouts, connection
+  errors, rate limits and 5xx responses (LLM_MAX_RETRIES),
+- metrics: queue depth, in-flight calls, latency and outcomes, plus the
+  upstream time of each attempt in external_call_seconds.
+
+Point OPENAI_BASE_URL at `fakes/openai_server.py` to exercise it offline.
+"""
+import asyncio
+import functools
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional, Tuple, Type
+from app.config.settings import settings
+from app.services.integrations import get_openai
+from app.services.metrics import external_call, registry
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+LLM_QUEUE_DEPTH = registry.gauge(
+    "llm_queue_depth", "LLM calls waiting for a concurrency slot"
+)
+LLM_IN_FLIGHT = registry.gauge(
+    "llm_in_flight", "LLM calls currently in progress"
+)
+LLM_REQUESTS = registry.counter(
+    "llm_requests_total", "LLM calls by outcome", ["outcome"]
+)
+LLM_LATENCY = registry.histogram(
+    "llm_request_seconds", "LLM call latency including retries",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+)
+LLM_TIME_TO_FIRST_TOKEN = registry.histogram(
+    "llm_time_to_first_token_seconds", "Time until the first streamed token arrives",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0)
+)
+
+@functools.lru_cache(maxsize=None)
+def retryable_errors() -> Tuple[Type[BaseException], ...]:
+    # A function so the openai SDK is only imported once the client is used
+    openai = get_openai()
+    return (
+        asyncio.TimeoutError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+
+class LLMError(Exception):
+    """The model call failed after all retries"""
+
+class LLMClient:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        model: str = "gpt-3.5-turbo",
+        max_concurrency: int = 16,
+        timeout: float = 20.0,
+        max_retries: int = 2,
+        backoff_seconds: float = 0.5,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._client: Optional["AsyncOpenAI"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def client(self) -> "AsyncOpenAI":
+        if self._client is None:
+            # Retries and timeouts are handled here, not by the SDK
+            self._client = get_openai().AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=self.timeout,
+                max_retries=0,
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the max_concurrency upstream slots"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        LLM_QUEUE_DEPTH.inc()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            LLM_QUEUE_DEPTH.dec()
+        LLM_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            LLM_IN_FLIGHT.dec()
+            self._semaphore.release()
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_seconds * (2 ** attempt) * (0.5 + random.random())
+
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+    ) -> str:
+        """Return the assistant message content for a chat completion"""
+        openai, retryable = get_openai(), retryable_errors()
+        start = time.perf_counter()
+        try:
+            async with self.slot():
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        with external_call("openai", "chat.completions"):
+                            response = await asyncio.wait_for(
+                                self.client.chat.completions.create(
+                                    model=self.model,
+                                    messages=messages,
+                                    max_tokens=max_tokens,
+                                    temperature=temperature,
+                                ),
+                                self.timeout,
+                            )
+                        LLM_REQUESTS.inc(outcome="success")
+                        return response.choices[0].message.content
+                    except retryable as e:
+                        if attempt == self.max_retries:
+                            LLM_REQUESTS.inc(outcome="failure")
+                            raise LLMError(f"LLM call failed after {attempt + 1} attempts: {e!r}") from e
+                        LLM_REQUESTS.inc(outcome="retry")
+                        await asyncio.sleep(self._backoff(attempt))
+                    except openai.OpenAIError as e:
+                        LLM_REQUESTS.inc(outcome="failure")
+                        raise LLMError(str(e)) from e
+        finally:
+            LLM_LATENCY.observe(time.perf_counter() - start)
+
+    async def stream_chat(
+        self,
+        messages: List[Dict[str, str]],
+        max_tokens: int = 500,
+        temperature: float = 0.7,
+    ) -> AsyncIterator[str]:
+        """
+        Yield content deltas as the model generates them.
+
+        Retries only happen before the first token; once text has been
+        yielded a failure is raised as LLMError. The timeout applies to the
+        first token and then to each gap between chunks.
+        """
+        openai, retryable = get_openai(), retryable_errors()
+        start = time.perf_counter()
+        first_token = True
+        try:
+            async with self.slot():
+                for attempt in range(self.max_retries + 1):
+                    try:
+                        # Timed until the response starts; chunks are covered by TTFT/latency
+                        with external_call("openai", "chat.completions.stream"):
+                            stream = await asyncio.wait_for(
+                                self.client.chat.completions.create(
+                                    model=self.model,
+                                    messages=messages,
+                                    max_tokens=max_tokens,
+                                    temperature=temperature,
+                                    stream=True,
+                                ),
+                                self.timeout,
+                            )
+                        chunks = stream.__aiter__()
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                            except StopAsyncIteration:
+                                break
+                            delta = chunk.choices[0].delta.content if chunk.choices else None
+                            if delta:
+                                if first_token:
+                                    LLM_TIME_TO_FIRST_TOKEN.observe(time.perf_counter() - start)
+                                    first_token = False
+                                yield delta
+                        LLM_REQUESTS.inc(outcome="success")
+                        return
+                    except retryable as e:
+                        if not first_token or attempt == self.max_retries:
+                            LLM_REQUESTS.inc(outcome="failure")
+                            raise LLMError(f"LLM stream failed after {attempt + 1} attempts: {e!r}") from e
+                        LLM_REQUESTS.inc(outcome="retry")
+                        await asyncio.sleep(self._backoff(attempt))
+                    except openai.OpenAIError as e:
+                        LLM_REQUESTS.inc(outcome="failure")
+                        raise LLMError(str(e)) from e
+        finally:
+            LLM_LATENCY.observe(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": LLM_QUEUE_DEPTH.value(),
+            "in_flight": LLM_IN_FLIGHT.value(),
+            "max_concurrency": self.max_concurrency,
+        }
+
+llm_client = LLMClient(
+    api_key=settings.OPENAI_API_KEY,
+    base_url=settings.OPENAI_BASE_URL,
+    model=settings.OPENAI_MODEL,
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    timeout=settings.LLM_TIMEOUT_SECONDS,
+    max_retries=settings.LLM_MAX_RETRIES,
+    backoff_seconds=settings.LLM_RETRY_BACKOFF_SECONDS,
+)
@@ -0,0 +1,145 @@
+"""
+pymongo event listeners feeding the metrics registry
+
+Registered on the Motor client in `connect_to_mongo`. pymongo calls them
+synchronously from whichever thread runs the operation (Motor's executor
+threads), so they only do constant-time bookkeeping.
+"""
+import threading
+import time
+from pymongo import monitoring
+from app.config.settings import settings
+from app.services.metrics import registry
+from app.services.query_guard import current_query_log, query_shape
+
+POOL_CHECKOUT_WAIT = registry.histogram(
+    "mongo_pool_checkout_seconds", "Time spent waiting to check a connection out of the pool",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+POOL_CHECKOUT_FAILURES = registry.counter(
+    "mongo_pool_checkout_failures_total", "Connection checkouts that failed", ["reason"]
+)
+POOL_CHECKED_OUT = registry.gauge(
+    "mongo_pool_checked_out", "Connections currently checked out", ["address"]
+)
+POOL_CONNECTIONS = registry.gauge(
+    "mongo_pool_connections", "Open pooled connections", ["address"]
+)
+COMMAND_LATENCY = registry.histogram(
+    "mongo_command_seconds", "Server round trip per command", ["command", "collection"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+COMMAND_FAILURES = registry.counter(
+    "mongo_command_failures_total", "Commands that returned an error", ["command", "collection"]
+)
+SLOW_COMMANDS = registry.counter(
+    "mongo_slow_commands_total", "Commands slower than MONGO_SLOW_COMMAND_MS", ["command", "collection"]
+)
+# Connection handshakes and monitoring chatter, not application queries
+IGNORED_COMMANDS = frozenset({
+    "hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "buildinfo", "buildInfo",
+    "endSessions", "killCursors",
+})
+
+def _address(event) -> str:
+    host, port = event.address
+    return f"{host}:{port}"
+
+class CommandMetricsListener(monitoring.CommandListener):
+    """
+    Command latency from pymongo's own `duration_micros`. The collection and
+    command are only on the started event, so they are held by request_id
+    until the command finishes. Also feeds the per-request QueryLog and
+    prints commands slower than MONGO_SLOW_COMMAND_MS with their filter
+    shape (values stripped).
+    """
+
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        command = event.command
+        target = command.get(event.command_name)
+        # getMore names its collection separately
+        if event.command_name == "getMore":
+            target = command.get("collection")
+        self._pending[event.request_id] = (target if isinstance(target, str) else "", command)
+        log = current_query_log()
+        if log is not None:
+            log.record(event.command_name, command)
+
+    def _finished(self, event):
+        pending = self._pending.pop(event.request_id, None)
+        if pending is None:
+            return None
+        collection, command = pending
+        seconds = event.duration_micros / 1e6
+        COMMAND_LATENCY.observe(seconds, command=event.command_name, collection=collection)
+        if seconds * 1000 >= settings.MONGO_SLOW_COMMAND_MS:
+            SLOW_COMMANDS.inc(command=event.command_name, collection=collection)
+            print(f"Slow Mongo command ({seconds * 1000:.1f} ms): {query_shape(event.command_name, command)}")
+        return collection
+
+    def succeeded(self, event):
+        self._finished(event)
+
+    def failed(self, event):
+        collection = self._finished(event)
+        if collection is not None:
+            COMMAND_FAILURES.inc(command=event.command_name, collection=collection)
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Checkout wait time: pymongo 4.6 events carry no duration, but a
+    checkout starts and completes on the same thread, so the start time is
+    kept in a thread-local.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def _waited(self):
+        started = getattr(self._local, "started", None)
+        self._local.started = None
+        return None if started is None else time.perf_counter() - started
+
+    def connection_checked_out(self, event):
+        waited = self._waited()
+        if waited is not None:
+            POOL_CHECKOUT_WAIT.observe(waited)
+        POOL_CHECKED_OUT.inc(address=_address(event))
+
+    def connection_check_out_failed(self, event):
+        waited = self._waited()
+        if waited is not None:
+            POOL_CHECKOUT_WAIT.observe(waited)
+        POOL_CHECKOUT_FAILURES.inc(reason=event.reason)
+
+    def connection_checked_in(self, event):
+        POOL_CHECKED_OUT.dec(address=_address(event))
+
+    def connection_created(self, event):
+        POOL_CONNECTIONS.inc(address=_address(event))
+
+    def connection_closed(self, event):
+        POOL_CONNECTIONS.dec(address=_address(event))
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
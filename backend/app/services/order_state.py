@@ -0,0 +1,53 @@
+"""
+Order status state machine
+
+Every order status change goes through `transition_order`, which applies
+the change with a single `find_one_and_update` guarded on the statuses the
+target may be reached from. Two concurrent requests can therefore never
+both win the same transition (e.g. two cancels restocking twice).
+"""
+from datetime import datetime
+from typing import List, Optional
+from pymongo import ReturnDocument
+from app.models import OrderStatus
+from app.services import vendor_stats
+
+ALLOWED_TRANSITIONS = {
+    OrderStatus.PENDING: {OrderStatus.CONFIRMED, OrderStatus.CANCELLED},
+    OrderStatus.CONFIRMED: {OrderStatus.PROCESSING, OrderStatus.CANCELLED},
+    OrderStatus.PROCESSING: {OrderStatus.SHIPPED},
+    OrderStatus.SHIPPED: {OrderStatus.DELIVERED},
+    OrderStatus.DELIVERED: set(),
+    OrderStatus.CANCELLED: set(),
+}
+
+def can_transition(old_status, new_status) -> bool:
+    return OrderStatus(new_status) in ALLOWED_TRANSITIONS[OrderStatus(old_status)]
+
+def allowed_sources(new_status) -> List[OrderStatus]:
+    """Statuses an order may be in for it to move to new_status"""
+    new_status = OrderStatus(new_status)
+    return [old for old, targets in ALLOWED_TRANSITIONS.items() if new_status in targets]
+
+def transition_guard(new_status) -> dict:
+    return {"status": {"$in": allowed_sources(new_status)}}
+
+async def transition_order(db, query: dict, new_status, extra_fields: Optional[dict] = None) -> Optional[dict]:
+    """
+    Atomically move the order matching query to new_status.
+
+    Returns the order as it was before the update, or None when no order
+    matches query in a status that allows the transition.
+    """
+    update = {"status": OrderStatus(new_status), "updated_at": datetime.utcnow()}
+    if extra_fields:
+        update.update(extra_fields)
+
+    order = await db.orders.find_one_and_update(
+        {**query, **transition_guard(new_status)},
+        {"$set": update},
+        return_document=ReturnDocument.BEFORE
+    )
+    if order:
+        await vendor_stats.record_order_status_changed(db, order, order["status"], new_status)
+    return order
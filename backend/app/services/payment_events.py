@@ -0,0 +1,180 @@
+"""
+Stripe webhook event processing
+
+The webhook route verifies and records each event in `stripe_events` (the
+Stripe event id is the `_id`, so redeliveries are dropped by the unique
+key) and hands it to the in-process queue below. A single task per process
+drains the queue in batches, so payment state converges without the client
+polling `confirm_order_payment`. A batch is one ordered `bulk_write`.
+Status transitions in it are guarded like `transition_order` and stamp the
+batch id on the orders they move; the orders carrying that stamp are read
+back with one `find`, so vendor stats move (in one more `bulk_write`) only
+for the updates that actually changed an order.
+
+A batch that fails is retried a few times with a backoff. Events still
+`processed: False` after that (retries exhausted, worker crash, shutdown
+with a non-empty queue) are re-queued by the leader's recovery loop once
+they are RECOVERY_GRACE_SECONDS old; applying an event twice is harmless.
+Events already queued or in a batch being retried in this process are
+skipped, so a long outage does not fill the queue with copies of them.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import List
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.config.settings import settings
+from app.models import OrderStatus
+from app.services import vendor_stats
+from app.services.order_state import allowed_sources
+
+# Backoff between attempts at a failed batch
+RETRY_DELAYS_SECONDS = (1, 5, 30)
+# Younger unprocessed events may still be queued in the worker that received them
+RECOVERY_GRACE_SECONDS = 60
+
+# Stripe event type -> (payment_status to record, order status to move to)
+EVENT_UPDATES = {
+    "payment_intent.succeeded": ("succeeded", OrderStatus.CONFIRMED),
+    "payment_intent.processing": ("processing", None),
+    "payment_intent.payment_failed": ("failed", None),
+    "payment_intent.canceled": ("canceled", None),
+}
+
+def event_record(event: dict) -> dict:
+    """Compact form of a Stripe event as stored in stripe_events"""
+    obj = event.get("data", {}).get("object", {})
+    return {
+        "_id": event["id"],
+        "type": event["type"],
+        "payment_intent_id": obj.get("id") if obj.get("object") == "payment_intent" else None,
+        "created": event.get("created"),
+        "processed": event["type"] not in EVENT_UPDATES,
+        "received_at": datetime.utcnow()
+    }
+
+class PaymentEventProcessor:
+    def __init__(self, batch_size: int = 100, batch_window_ms: int = 200):
+        self.batch_size = batch_size
+        self.batch_window = batch_window_ms / 1000
+        self.queue: asyncio.Queue = None
+        # Event ids queued or in a batch being applied
+        self.pending = set()
+
+    def _ensure_queue(self) -> asyncio.Queue:
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        return self.queue
+
+    def enqueue(self, record: dict) -> bool:
+        """Queue an unprocessed event unless it is already queued or being applied"""
+        if record["processed"] or record["_id"] in self.pending:
+            return False
+        self.pending.add(record["_id"])
+        self._ensure_queue().put_nowait(record)
+        return True
+
+    async def recover(self, db, grace_seconds: float = RECOVERY_GRACE_SECONDS) -> int:
+        """Re-queue events that were stored but not applied within grace_seconds"""
+        count = 0
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_seconds)
+        query = {"processed": False, "received_at": {"$lt": cutoff}}
+        async for record in db.stripe_events.find(query).sort("created", 1):
+            count += self.enqueue(record)
+        return count
+
+    async def _next_batch(self) -> List[dict]:
+        queue = self._ensure_queue()
+        batch = [await queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.batch_window
+        while len(batch) < self.batch_size:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def apply_batch(self, db, batch: List[dict]) -> int:
+        """Apply a batch of events to orders in order, returns the updates that changed an order"""
+        now = datetime.utcnow()
+        batch_id = ObjectId()
+        operations = []
+        transitioned = {}
+        for record in batch:
+            payment_status, new_status = EVENT_UPDATES[record["type"]]
+            intent_id = record.get("payment_intent_id")
+            if not intent_id:
+                continue
+            update = {"payment_status": payment_status, "updated_at": now}
+            # Payment events only ever touch orders that are still pending
+            guard = {"status": OrderStatus.PENDING}
+            if new_status is not None:
+                # Single source status, so the read-back knows what each order left
+                (source,) = allowed_sources(new_status)
+                guard = {"status": source}
+                update.update(status=new_status, transition_batch=batch_id)
+                transitioned[intent_id] = (source, new_status)
+            operations.append(UpdateOne({"payment_intent_id": intent_id, **guard}, {"$set": update}))
+
+        modified = 0
+        if operations:
+            result = await db.orders.bulk_write(operations, ordered=True)
+            modified = result.modified_count
+        if transitioned:
+            changes = []
+            async for order in db.orders.find(
+                {"payment_intent_id": {"$in": list(transitioned)}, "transition_batch": batch_id},
+                {"items": 1, "created_at": 1, "payment_intent_id": 1}
+            ):
+                # From the batch, not order["status"]: a later cancel may have moved it on
+                changes.append((order, *transitioned[order["payment_intent_id"]]))
+            await vendor_stats.record_order_status_changes(db, changes)
+
+        await db.stripe_events.update_many(
+            {"_id": {"$in": [r["_id"] for r in batch]}},
+            {"$set": {"processed": True, "processed_at": now}}
+        )
+        return modified
+
+    async def run(self, get_db):
+        """Worker loop: drain the queue in batches until cancelled"""
+        while True:
+            batch = await self._next_batch()
+            try:
+                for attempt, delay in enumerate((*RETRY_DELAYS_SECONDS, None), 1):
+                    try:
+                        db = await get_db()
+                        await self.apply_batch(db, batch)
+                        break
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        print(f"Failed to apply {len(batch)} payment events (attempt {attempt}): {e}")
+                        if delay is None:
+                            # Left unprocessed in stripe_events for the recovery loop
+                            break
+                        await asyncio.sleep(delay)
+            finally:
+                self.pending.difference_update(record["_id"] for record in batch)
+
+    async def run_recovery_loop(self, get_db, interval_seconds: int, leader):
+        """Re-queue stranded events every interval, while `leader` holds its lease"""
+        while True:
+            if leader.is_leader:
+                try:
+                    recovered = await self.recover(await get_db())
+                    if recovered:
+                        print(f"Re-queued {recovered} unapplied payment events")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Failed to re-queue pending payment events: {e}")
+            await asyncio.sleep(interval_seconds)
+
+payment_events = PaymentEventProcessor(
+    batch_size=settings.PAYMENT_EVENT_BATCH_SIZE,
+    batch_window_ms=settings.PAYMENT_EVENT_BATCH_WINDOW_MS
+)
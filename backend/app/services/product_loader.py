@@ -0,0 +1,55 @@
+"""
+Batch product loading
+
+Routes that turn a list of product ids (model answers, index matches,
+cart lines) into products use these helpers instead of a find_one per id:
+one `$in` query, results returned in the order the ids were given, with
+unknown or deleted ids skipped.
+"""
+from typing import Dict, Iterable, List, Optional
+from bson import ObjectId
+
+# Fields needed by product_card, so card routes don't read whole documents
+CARD_PROJECTION = {"name": 1, "description": 1, "price": 1, "category": 1, "images": 1}
+
+def _object_ids(product_ids: Iterable) -> List[ObjectId]:
+    ids = []
+    for product_id in product_ids:
+        if isinstance(product_id, ObjectId):
+            ids.append(product_id)
+        elif ObjectId.is_valid(product_id):
+            ids.append(ObjectId(product_id))
+    return list(dict.fromkeys(ids))
+
+async def load_products_by_id(db, product_ids: Iterable, projection: Optional[dict] = None,
+                              active_only: bool = False) -> Dict[ObjectId, dict]:
+    ids = _object_ids(product_ids)
+    if not ids:
+        return {}
+    query = {"_id": {"$in": ids}}
+    if active_only:
+        query["status"] = "active"
+    found = await db.products.find(query, projection).to_list(length=len(ids))
+    return {product["_id"]: product for product in found}
+
+async def load_products(db, product_ids: Iterable, projection: Optional[dict] = None,
+                        active_only: bool = False) -> List[dict]:
+    """Products in the order of product_ids (duplicates and misses dropped)"""
+    ids = _object_ids(product_ids)
+    by_id = await load_products_by_id(db, ids, projection, active_only)
+    return [by_id[product_id] for product_id in ids if product_id in by_id]
+
+def product_card(product: dict) -> dict:
+    """Compact product shape returned by recommendation-style routes"""
+    return {
+        "id": str(product["_id"]),
+        "name": product["name"],
+        "description": product["description"],
+        "price": product["price"],
+        "category": product["category"],
+        "images": product.get("images", [])
+    }
+
+async def load_product_cards(db, product_ids: Iterable, active_only: bool = False) -> List[dict]:
+    products = await load_products(db, product_ids, CARD_PROJECTION, active_only)
+    return [product_card(product) for product in products]
@@ -0,0 +1,213 @@
+"""
+Token-budgeted prompt assembly for the concierge
+
+Sections (system text, conversation summary, history, retrieved products,
+the user's query) are added with a priority; `build()` fills the budget
+in priority order and returns the messages in the order they were added.
+
+- required text is always included, truncated only if it alone exceeds
+  the budget,
+- message sections keep the newest (or first) messages that fit and drop
+  the rest whole,
+- list sections keep as many lines as fit, in the order given (best
+  ranked first),
+- text sections are clipped at a word boundary, or mid-word when not even
+  one whole word fits (a long pasted URL or token).
+
+Token counts are a local estimate (no tokenizer download): roughly one
+token per short word or punctuation mark, one per four characters of
+longer words, plus the chat format's per-message overhead. It errs high,
+so a budget is not overrun. Built prompt sizes and truncations are
+recorded as metrics.
+"""
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List
+from app.services.metrics import registry
+
+PROMPT_TOKENS = registry.histogram(
+    "llm_prompt_tokens", "Estimated prompt size in tokens", ["prompt"],
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192)
+)
+PROMPT_BUDGET_USED = registry.histogram(
+    "llm_prompt_budget_ratio", "Estimated prompt tokens divided by the budget", ["prompt"],
+    buckets=(0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+)
+PROMPT_TRUNCATIONS = registry.counter(
+    "llm_prompt_truncations_total", "Prompt sections shortened to fit the budget", ["prompt", "section"]
+)
+
+MESSAGE_OVERHEAD_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+CHARS_PER_TOKEN = 4
+_PIECES = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    tokens = 0
+    for piece in _PIECES.findall(text or ""):
+        tokens += max(1, math.ceil(len(piece) / CHARS_PER_TOKEN))
+    return tokens
+
+def _clip(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """Longest word-boundary prefix (or suffix) of text within max_tokens"""
+    if max_tokens <= 0:
+        return ""
+    words = text.split(" ")
+    if keep_end:
+        words.reverse()
+    kept, used = [], 0
+    for word in words:
+        cost = estimate_tokens(word)
+        if used + cost > max_tokens:
+            break
+        kept.append(word)
+        used += cost
+    if not kept:
+        return _clip_chars(text, max_tokens, keep_end)
+    if keep_end:
+        kept.reverse()
+    return " ".join(kept)
+
+def _clip_chars(text: str, max_tokens: int, keep_end: bool = False) -> str:
+    """Character-level prefix (or suffix) within max_tokens, for text without a usable word boundary"""
+    length = min(len(text), max_tokens * CHARS_PER_TOKEN)
+    while length > 0:
+        clipped = text[-length:] if keep_end else text[:length]
+        tokens = estimate_tokens(clipped)
+        if tokens <= max_tokens:
+            return clipped
+        # Punctuation costs a token per character: shrink in proportion
+        length = min(length - 1, length * max_tokens // tokens)
+    return ""
+
+@dataclass
+class _Section:
+    name: str
+    priority: int
+    kind: str  # "text", "messages" or "list"
+    role: str = "user"
+    text: str = ""
+    messages: List[dict] = field(default_factory=list)
+    lines: List[str] = field(default_factory=list)
+    header: str = ""
+    required: bool = False
+    keep_end: bool = False
+    output: List[dict] = field(default_factory=list)
+
+class PromptBuilder:
+    def __init__(self, name: str, budget: int):
+        self.name = name
+        self.budget = budget
+        self._sections: List[_Section] = []
+        self.section_tokens: Dict[str, int] = {}
+
+    def add_text(self, name: str, role: str, text: str, priority: int,
+                 required: bool = False, keep_end: bool = False) -> "PromptBuilder":
+        """One message; clipped to fit (keep_end keeps the tail, e.g. newest summary lines)"""
+        if text:
+            self._sections.append(_Section(
+                name, priority, "text", role=role, text=text, required=required, keep_end=keep_end
+            ))
+        return self
+
+    def add_messages(self, name: str, messages: List[dict], priority: int,
+                     keep_end: bool = True) -> "PromptBuilder":
+        """Whole messages; keep_end keeps the most recent ones that fit"""
+        if messages:
+            self._sections.append(_Section(
+                name, priority, "messages", messages=list(messages), keep_end=keep_end
+            ))
+        return self
+
+    def add_list(self, name: str, role: str, header: str, lines: List[str],
+                 priority: int) -> "PromptBuilder":
+        """One message of header plus as many leading lines as fit"""
+        if lines:
+            self._sections.append(_Section(
+                name, priority, "list", role=role, header=header, lines=list(lines)
+            ))
+        return self
+
+    def _fill(self, section: _Section, available: int) -> int:
+        """Set section.output within available tokens, returns tokens used"""
+        if section.kind == "messages":
+            ordered = reversed(section.messages) if section.keep_end else section.messages
+            used = 0
+            for message in ordered:
+                cost = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(message["content"])
+                if used + cost > available:
+                    break
+                section.output.append({"role": message["role"], "content": message["content"]})
+                used += cost
+            if section.keep_end:
+                section.output.reverse()
+            if len(section.output) < len(section.messages):
+                PROMPT_TRUNCATIONS.inc(prompt=self.name, section=section.name)
+            return used
+
+        if section.kind == "list":
+            used = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(section.header)
+            kept = []
+            for line in section.lines:
+                cost = estimate_tokens(line) + 1
+                if used + cost > available:
+                    break
+                kept.append(line)
+                used += cost
+            if len(kept) < len(section.lines):
+                PROMPT_TRUNCATIONS.inc(prompt=self.name, section=section.name)
+            if not kept:
+                return 0
+            content = "\n".join([section.header] + kept) if section.header else "\n".join(kept)
+            section.output.append({"role": section.role, "content": content})
+            return used
+
+        cost = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(section.text)
+        text = section.text
+        if cost > available:
+            PROMPT_TRUNCATIONS.inc(prompt=self.name, section=section.name)
+            text = _clip(text, available - MESSAGE_OVERHEAD_TOKENS, section.keep_end)
+            if not text:
+                return 0
+            cost = MESSAGE_OVERHEAD_TOKENS + estimate_tokens(text)
+        section.output.append({"role": section.role, "content": text})
+        return cost
+
+    def build(self) -> List[dict]:
+        remaining = self.budget - REPLY_PRIMING_TOKENS
+        self.section_tokens = {}
+        for section in self._sections:
+            section.output = []
+
+        # Required sections are reserved first, then the rest by priority
+        required = [s for s in self._sections if s.required]
+        optional = sorted((s for s in self._sections if not s.required), key=lambda s: s.priority)
+        reserved = sum(MESSAGE_OVERHEAD_TOKENS + estimate_tokens(s.text) for s in required)
+        if reserved > remaining:
+            # Only possible with an oversized query: smaller sections are kept
+            # whole and the largest ones share what is left
+            by_size = sorted(required, key=lambda s: estimate_tokens(s.text))
+            for left, section in zip(range(len(by_size), 0, -1), by_size):
+                used = self._fill(section, max(0, remaining // left))
+                self.section_tokens[section.name] = used
+                remaining -= used
+            remaining = 0
+        else:
+            for section in required:
+                self.section_tokens[section.name] = self._fill(section, remaining)
+            remaining -= reserved
+        for section in optional:
+            used = self._fill(section, remaining)
+            self.section_tokens[section.name] = used
+            remaining -= used
+
+        messages = [message for section in self._sections for message in section.output]
+        total = self.tokens
+        PROMPT_TOKENS.observe(total, prompt=self.name)
+        PROMPT_BUDGET_USED.observe(total / self.budget if self.budget else 0, prompt=self.name)
+        return messages
+
+    @property
+    def tokens(self) -> int:
+        return REPLY_PRIMING_TOKENS + sum(self.section_tokens.values())
@@ -0,0 +1,113 @@
+"""
+Per-request Mongo command tracking
+
+`track_queries()` installs a QueryLog in a context variable; the command
+listener in mongo_monitoring records every command issued while it is
+active. Motor runs pymongo in executor threads with a copy of the calling
+context, so commands are attributed to the request that awaited them,
+and background tasks (which run outside any request) are not tracked.
+
+Each command is reduced to a shape: command, collection and the filter
+with values replaced by "?", e.g. `find products {"_id": "?"}`. The same
+shape repeated many times in one request is the signature of a query in
+a loop (N+1). Cursor `getMore`s are counted but never treated as repeats.
+"""
+import json
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+# Where each command keeps the filter that decides which documents it touches
+_FILTER_PATHS = {
+    "find": ("filter",),
+    "count": ("query",),
+    "distinct": ("query",),
+    "findAndModify": ("query",),
+    "update": ("updates", 0, "q"),
+    "delete": ("deletes", 0, "q"),
+}
+
+class QueryBudgetExceeded(Exception):
+    """Raised in strict mode when a request issues too many or repeated commands"""
+
+def _shape_of(value):
+    if isinstance(value, dict):
+        return {key: _shape_of(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        # Operator arrays ($and/$or) keep their structure, value lists collapse
+        if value and all(isinstance(item, dict) for item in value):
+            return [_shape_of(item) for item in value]
+        return "?"
+    return "?"
+
+def _command_filter(command_name: str, command) -> Optional[dict]:
+    if command_name == "aggregate":
+        pipeline = command.get("pipeline") or []
+        return pipeline[0].get("$match") if pipeline and "$match" in pipeline[0] else None
+    path = _FILTER_PATHS.get(command_name)
+    if path is None:
+        return None
+    value = command
+    for step in path:
+        try:
+            value = value[step]
+        except (KeyError, IndexError, TypeError):
+            return None
+    return value
+
+def query_shape(command_name: str, command) -> str:
+    collection = command.get(command_name)
+    if command_name == "getMore":
+        collection = command.get("collection")
+    parts = [command_name, collection if isinstance(collection, str) else ""]
+    command_filter = _command_filter(command_name, command)
+    if command_filter is not None:
+        parts.append(json.dumps(_shape_of(command_filter), sort_keys=True, default=str))
+    return " ".join(parts)
+
+class QueryLog:
+    def __init__(self):
+        self.commands = 0
+        self.get_mores = 0
+        self.shapes = Counter()
+        # Concurrent awaits in one request record from different executor threads
+        self._lock = threading.Lock()
+
+    def record(self, command_name: str, command):
+        shape = None if command_name == "getMore" else query_shape(command_name, command)
+        with self._lock:
+            self.commands += 1
+            if shape is None:
+                self.get_mores += 1
+            else:
+                self.shapes[shape] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+_current = ContextVar("query_log", default=None)
+
+def current_query_log() -> Optional[QueryLog]:
+    return _current.get()
+
+@contextmanager
+def track_queries():
+    log = QueryLog()
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+
+def check_query_budget(log: QueryLog, max_commands: int, repeat_threshold: int) -> Optional[str]:
+    """Problem description if the log is over budget, else None"""
+    repeated = log.repeated(repeat_threshold)
+    # Cursor batches are not separate queries
+    commands = log.commands - log.get_mores
+    if commands <= max_commands and not repeated:
+        return None
+    lines = [f"{commands} commands (limit {max_commands})"]
+    lines.extend(f"  {count}x {shape}" for shape, count in (repeated or log.shapes.most_common(5)))
+    return "\n".join(lines)
@@ -0,0 +1,219 @@
+"""
+Local parser for natural-language shopping queries
+
+Turns "red running shoes under $80 size 9" into filters `list_products`
+can run directly (category, min_price, max_price, search) plus the
+colors, sizes and keywords it recognised. Products carry no color or size
+fields, so both reach `list_products` as search terms. It is a handful of regexes and
+set lookups, so it answers in microseconds; only queries it cannot make
+sense of are marked `ambiguous` for the LLM.
+"""
+import json
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+from app.services.similarity import STOPWORDS, tokenize
+
+_NUMBER = r"\$?\s*(\d+(?:\.\d+)?)\s*(?:k\b)?\s*(?:dollars?|usd|bucks)?"
+# "max price of", "minimum budget" - a price word between the keyword and the amount
+_PRICE_NOUN = r"(?:\s+(?:price|budget|cost)(?:\s+(?:of|is))?)?"
+# (pattern, kind, weak). Weak keywords also appear in product names ("air max 90",
+# "pro max 256", "min 3 pieces") and bare ranges are as often ages, models or
+# years ("ages 3-5", "2020-2021"), so they only count as a price next to a
+# currency marker or a price word.
+PRICE_PATTERNS = [
+    (re.compile(r"\bbetween\s+" + _NUMBER + r"\s+and\s+" + _NUMBER), "between", False),
+    (re.compile(r"\bfrom\s+" + _NUMBER + r"\s+to\s+" + _NUMBER), "between", True),
+    (re.compile(r"(?<![\w.])" + _NUMBER + r"\s*(?:-|to)\s*" + _NUMBER), "between", True),
+    (re.compile(r"(?:\bunder|\bbelow|\bless than|\bcheaper than|\bat most|<=?)\s*" + _NUMBER), "max", False),
+    (re.compile(r"(?:\bup to|\bmax(?:imum)?)" + _PRICE_NOUN + r"\s*" + _NUMBER), "max", True),
+    (re.compile(r"(?:\bover|\babove|\bmore than|\bat least|>=?)\s*" + _NUMBER), "min", False),
+    (re.compile(r"(?:\bfrom|\bmin(?:imum)?)" + _PRICE_NOUN + r"\s*" + _NUMBER), "min", True),
+    (re.compile(r"(?:\baround|\babout|\broughly|~)\s*" + _NUMBER), "around", False),
+]
+_CURRENCY = re.compile(r"\$|\b(?:usd|dollars?|bucks)\b")
+_PRICE_WORD = re.compile(r"\b(?:price|budget|cost)\b")
+_PRICE_WORD_BEFORE = re.compile(r"\b(?:price|priced|budget|cost|costing)\s*(?:is|of|:)?\s*$")
+PRICE_HINTS = {
+    "cheap": "low", "cheapest": "low", "affordable": "low", "budget": "low", "inexpensive": "low",
+    "premium": "high", "luxury": "high", "expensive": "high", "high-end": "high",
+}
+COLORS = frozenset(
+    "black white red blue green yellow orange purple pink brown gray grey silver gold "
+    "beige navy teal maroon ivory".split()
+)
+_SIZE = re.compile(r"\bsize\s*:?\s*([a-z0-9.]+(?:\s*-\s*[a-z0-9.]+)?)|\b(xxs|xs|xl|xxl|xxxl|2xl|3xl)\b")
+# Words that say what the shopper wants to do rather than what they want
+VAGUE_WORDS = frozenset(
+    "gift present idea something anything recommend suggest suggestion surprise".split()
+)
+FILLER_WORDS = STOPWORDS | frozenset(
+    "show find get buy me some any that which under below over above between around about "
+    "less more than cheaper at most least up to price priced cost costing dollar usd buck "
+    "size please best good nice perfect need want looking".split()
+)
+# Common product words that name a category without saying it
+CATEGORY_SYNONYMS = {
+    "electronics": "phone smartphone laptop computer tablet headphone earbud speaker camera tv "
+                   "television monitor charger keyboard mouse console",
+    "clothing": "shirt tshirt t-shirt dress jacket coat jean pant trouser skirt sweater hoodie "
+                "shoe sneaker boot sock hat apparel",
+    "book": "novel paperback hardcover ebook cookbook textbook",
+    "home": "furniture lamp sofa chair table kitchen cookware bedding pillow rug decor mug plant",
+    "sport": "fitness yoga gym bike bicycle tent camping hiking ball racket dumbbell",
+    "beauty": "makeup cosmetic skincare lipstick serum shampoo perfume fragrance",
+    "toy": "lego puzzle doll boardgame",
+    "automotive": "car tire tyre motor",
+    "food": "snack coffee tea chocolate wine",
+    "art": "paint canvas craft sketchbook",
+}
+
+def _price_candidates(text: str, price_context: bool):
+    """(match, kind, has_currency) for every price expression, in pattern order"""
+    for pattern, kind, weak in PRICE_PATTERNS:
+        for match in pattern.finditer(text):
+            has_currency = bool(_CURRENCY.search(match.group(0)))
+            if weak and not (
+                price_context
+                or has_currency
+                or _PRICE_WORD.search(match.group(0))
+                or _PRICE_WORD_BEFORE.search(text[:match.start()])
+            ):
+                continue
+            yield match, kind, has_currency
+
+def extract_price(text: str, price_context: bool = False) -> Dict[str, Optional[float]]:
+    """
+    min_price / max_price from the first price expression, plus the matched
+    span. An amount with a currency marker wins over one without, so a model
+    number ("air max 270 under $150") never shadows the real budget.
+    `price_context` is for text that is only ever a price, like a
+    price_range parameter, where a bare "max 50" needs no currency.
+    """
+    candidates = list(_price_candidates(text, price_context))
+    if not candidates:
+        return {"min_price": None, "max_price": None, "span": None}
+    match, kind, _ = next((c for c in candidates if c[2]), candidates[0])
+    numbers = [float(v) for v in match.groups() if v is not None]
+    # "5k" style amounts
+    scale = 1000 if re.search(r"\d\s*k\b", match.group(0)) else 1
+    numbers = [n * scale for n in numbers]
+    if kind == "between":
+        low, high = sorted(numbers)
+        return {"min_price": low, "max_price": high, "span": match.span()}
+    if kind == "max":
+        return {"min_price": None, "max_price": numbers[0], "span": match.span()}
+    if kind == "min":
+        return {"min_price": numbers[0], "max_price": None, "span": match.span()}
+    return {"min_price": round(numbers[0] * 0.8, 2), "max_price": round(numbers[0] * 1.2, 2), "span": match.span()}
+
+@lru_cache(maxsize=8)
+def _category_index(categories: Tuple[str, ...], synonyms: bool = True) -> Dict[str, str]:
+    """Token -> category name, from the category names and product-word synonyms"""
+    index = {}
+    for category in categories:
+        for token in tokenize(category):
+            index.setdefault(token, category)
+    if not synonyms:
+        return index
+    for root, words in CATEGORY_SYNONYMS.items():
+        root = tokenize(root)[0]
+        category = next((c for c in categories if root in tokenize(c)), None)
+        if category:
+            for word in words.split():
+                for token in tokenize(word):
+                    index.setdefault(token, category)
+    return index
+
+def parse_query(text: str, categories: List[str]) -> dict:
+    lowered = (text or "").lower()
+
+    # Sizes first, so a size range ("size 9-10") is never read as a price
+    sizes = []
+    for match in _SIZE.finditer(lowered):
+        sizes.append(re.sub(r"\s+", "", match.group(1) or match.group(2)).upper())
+    lowered = _SIZE.sub(" ", lowered)
+
+    price = extract_price(lowered)
+    if price["span"]:
+        start, end = price["span"]
+        lowered = lowered[:start] + " " + lowered[end:]
+
+    tokens = tokenize(lowered)
+    raw_words = re.findall(r"[a-z0-9-]+", lowered)
+    colors = list(dict.fromkeys(t for t in tokens if t in COLORS))
+    price_range = next((PRICE_HINTS[w] for w in raw_words if w in PRICE_HINTS), None)
+
+    # Naming a category ("electronics") filters on it; a product word that
+    # implies one ("laptop") only suggests it and stays a search term
+    category_names = _category_index(tuple(categories), synonyms=False)
+    category_index = _category_index(tuple(categories))
+    named = [t for t in tokens if t in category_names]
+    category = category_names[named[0]] if named else None
+    suggested = category or next((category_index[t] for t in tokens if t in category_index), None)
+
+    keywords = [
+        t for t in dict.fromkeys(tokens)
+        if t not in FILLER_WORDS and t not in VAGUE_WORDS and t not in PRICE_HINTS
+        and t not in category_names
+    ]
+    # Products have no size field, so a size only narrows the results as a
+    # search term ("running shoes size 9" searches "running shoe 9")
+    keywords += [size.lower() for size in dict.fromkeys(sizes) if size.lower() not in keywords]
+    vague = any(t in VAGUE_WORDS for t in tokens)
+    has_filters = bool(category or price["min_price"] is not None or price["max_price"] is not None)
+    # Nothing concrete to search for, or intent words ("gift ideas for mom")
+    # that only the model can turn into products
+    ambiguous = (not keywords and not has_filters) or (vague and not category)
+
+    filters = {
+        "category": category,
+        "min_price": price["min_price"],
+        "max_price": price["max_price"],
+        "search": " ".join(keywords) or None,
+    }
+    return {
+        "search_query": " ".join(keywords),
+        "suggested_category": suggested,
+        "price_range": price_range,
+        "keywords": keywords,
+        "colors": colors,
+        "sizes": sizes,
+        "filters": {k: v for k, v in filters.items() if v is not None},
+        "ambiguous": ambiguous,
+    }
+
+def merge_model_interpretation(parsed: dict, content: str, categories: List[str]) -> dict:
+    """
+    Fill gaps in a local parse from the model's JSON answer. Locally parsed
+    prices win; a category is only taken if it exists in the catalog.
+    """
+    match = re.search(r"\{.*\}", content or "", re.DOTALL)
+    if not match:
+        return parsed
+    try:
+        answer = json.loads(match.group(0))
+    except ValueError:
+        return parsed
+    if not isinstance(answer, dict):
+        return parsed
+
+    merged = dict(parsed, filters=dict(parsed["filters"]))
+    by_name = {c.lower(): c for c in categories}
+    category = by_name.get(str(answer.get("suggested_category") or "").lower())
+    if category:
+        merged["suggested_category"] = category
+    if answer.get("price_range") in ("low", "medium", "high"):
+        merged["price_range"] = answer["price_range"]
+    for key in ("min_price", "max_price"):
+        value = answer.get(key)
+        if key not in merged["filters"] and isinstance(value, (int, float)) and value >= 0:
+            merged["filters"][key] = float(value)
+    keywords = answer.get("keywords")
+    if isinstance(keywords, list) and all(isinstance(k, str) for k in keywords):
+        merged["keywords"] = keywords
+    search_query = answer.get("search_query")
+    if isinstance(search_query, str) and search_query.strip():
+        merged["search_query"] = search_query.strip()
+        merged["filters"]["search"] = search_query.strip()
+    return merged
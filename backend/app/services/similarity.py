@@ -0,0 +1,329 @@
+"""
+Local product similarity engine
+
+Products are embedded with signed feature hashing of their name (unigrams
+and bigrams, weighted up), description and category into a fixed number of
+dimensions, then TF-IDF weighted and L2 normalized. All vectors live in one
+NumPy matrix, so ranking the whole catalog for a query is a single
+matrix-vector product followed by an `argpartition` top-k. No network
+access or model is involved.
+
+The index is built from MongoDB on startup, off the event loop, and kept
+current by the product write routes (`upsert` / `remove`). Writes made by
+other workers are picked up by `run_refresh_loop`, which re-indexes only
+the products named in `catalog_changes` since its catalog version (see
+app/services/catalog.py); it rebuilds only when that record is incomplete
+for longer than CHANGE_GAP_SECONDS or asks for a full reload. A write re-weights only its own
+row with the current IDF; the whole matrix is re-weighted once writes since
+the last full pass exceed IDF_REFRESH_FRACTION of the catalog, since
+document frequencies barely move with a few products.
+"""
+import asyncio
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.config.settings import settings
+from app.services.catalog import get_catalog_version
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have i in is it me my of on or "
+    "our the this to was we with you your".split()
+)
+NAME_WEIGHT = 3.0
+CATEGORY_WEIGHT = 2.0
+IDF_REFRESH_FRACTION = 0.1
+# A version whose change record is still missing after this was lost (or
+# expired): rebuild rather than wait for it
+CHANGE_GAP_SECONDS = 60
+PRODUCT_PROJECTION = {"name": 1, "description": 1, "category": 1, "price": 1, "status": 1}
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for token in _TOKEN.findall((text or "").lower()):
+        if token in STOPWORDS or len(token) < 2:
+            continue
+        # Cheap plural folding so "shoes" matches "shoe"
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+def product_features(product: dict) -> Counter:
+    features = Counter()
+    name_tokens = tokenize(product.get("name", ""))
+    for token in name_tokens:
+        features[token] += NAME_WEIGHT
+    for first, second in zip(name_tokens, name_tokens[1:]):
+        features[f"{first}_{second}"] += NAME_WEIGHT
+    for token in tokenize(product.get("description", "")):
+        features[token] += 1.0
+    category = product.get("category")
+    if category:
+        for token in tokenize(category):
+            features[token] += CATEGORY_WEIGHT
+    return features
+
+def query_features(text: str) -> Counter:
+    tokens = tokenize(text)
+    features = Counter(tokens)
+    for first, second in zip(tokens, tokens[1:]):
+        features[f"{first}_{second}"] += 1
+    return features
+
+def hash_features(features: Counter, dimensions: int) -> np.ndarray:
+    """Signed hashing trick with sublinear term frequency"""
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for feature, count in features.items():
+        digest = zlib.crc32(feature.encode())
+        sign = 1.0 if digest & 0x80000000 else -1.0
+        vector[digest % dimensions] += sign * (1.0 + np.log(count))
+    return vector
+
+class SimilarityIndex:
+    def __init__(self, dimensions: int = 512, initial_capacity: int = 1024):
+        self.dimensions = dimensions
+        self._lock = threading.RLock()
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._tf = np.zeros((initial_capacity, dimensions), dtype=np.float32)
+        self._price = np.zeros(initial_capacity, dtype=np.float64)
+        self._category = np.full(initial_capacity, -1, dtype=np.int32)
+        self._category_codes: Dict[str, int] = {}
+        self._active = np.zeros(initial_capacity, dtype=bool)
+        self._df = np.zeros(dimensions, dtype=np.float64)
+        self._weighted: Optional[np.ndarray] = None
+        self._idf: Optional[np.ndarray] = None
+        self._writes_since_idf = 0
+        self.catalog_version: Optional[int] = None
+        self._gap_since: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, product_id) -> bool:
+        return str(product_id) in self._rows
+
+    def _grow(self):
+        count, capacity = len(self._ids), self._tf.shape[0] * 2
+        tf = np.zeros((capacity, self.dimensions), dtype=np.float32)
+        tf[:count] = self._tf[:count]
+        price = np.zeros(capacity, dtype=np.float64)
+        price[:count] = self._price[:count]
+        category = np.full(capacity, -1, dtype=np.int32)
+        category[:count] = self._category[:count]
+        active = np.zeros(capacity, dtype=bool)
+        active[:count] = self._active[:count]
+        self._tf, self._price, self._category, self._active = tf, price, category, active
+        if self._weighted is not None:
+            weighted = np.zeros((capacity, self.dimensions), dtype=np.float32)
+            weighted[:count] = self._weighted[:count]
+            self._weighted = weighted
+
+    def _reweight(self, row: int):
+        """Bring one row of the weighted matrix up to date, keeping the IDF"""
+        self._writes_since_idf += 1
+        if self._weighted is None:
+            return
+        weighted = self._tf[row] * self._idf
+        norm = np.linalg.norm(weighted)
+        self._weighted[row] = weighted / norm if norm else weighted
+
+    def upsert(self, product: dict):
+        product_id = str(product["_id"])
+        vector = hash_features(product_features(product), self.dimensions)
+        with self._lock:
+            row = self._rows.get(product_id)
+            if row is None:
+                if len(self._ids) == self._tf.shape[0]:
+                    self._grow()
+                row = len(self._ids)
+                self._ids.append(product_id)
+                self._rows[product_id] = row
+            else:
+                self._df -= self._tf[row] != 0
+            self._tf[row] = vector
+            self._df += vector != 0
+            self._price[row] = product.get("price", 0.0)
+            category = product.get("category", "")
+            self._category[row] = self._category_codes.setdefault(category, len(self._category_codes))
+            self._active[row] = product.get("status", "active") == "active"
+            self._reweight(row)
+
+    def remove(self, product_id):
+        product_id = str(product_id)
+        with self._lock:
+            row = self._rows.pop(product_id, None)
+            if row is None:
+                return
+            self._df -= self._tf[row] != 0
+            last = len(self._ids) - 1
+            if row != last:
+                # Move the last row into the hole to keep the matrix dense
+                moved = self._ids[last]
+                self._ids[row] = moved
+                self._rows[moved] = row
+                self._tf[row] = self._tf[last]
+                self._price[row] = self._price[last]
+                self._category[row] = self._category[last]
+                self._active[row] = self._active[last]
+                if self._weighted is not None:
+                    self._weighted[row] = self._weighted[last]
+            self._ids.pop()
+            self._tf[last] = 0
+            self._writes_since_idf += 1
+
+    def _weighted_matrix(self) -> Tuple[np.ndarray, np.ndarray]:
+        """TF-IDF rows, L2 normalized; fully recomputed once the IDF is too stale"""
+        count = len(self._ids)
+        if self._weighted is None or self._writes_since_idf > IDF_REFRESH_FRACTION * count:
+            self._idf = (np.log((1.0 + count) / (1.0 + self._df)) + 1.0).astype(np.float32)
+            weighted = np.zeros_like(self._tf)
+            weighted[:count] = self._tf[:count] * self._idf
+            norms = np.linalg.norm(weighted[:count], axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            weighted[:count] /= norms
+            self._weighted = weighted
+            self._writes_since_idf = 0
+        return self._weighted[:count], self._idf
+
+    def _rank(self, scores: np.ndarray, k: int, mask: np.ndarray, exclude: Optional[int] = None):
+        if exclude is not None:
+            mask[exclude] = False
+        candidates = np.flatnonzero(mask & (scores > 0))
+        if candidates.size == 0:
+            return []
+        if candidates.size > k:
+            top = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[top]
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self._ids[i], float(scores[i])) for i in order]
+
+    def _mask(self, count: int, category: Optional[str], min_price: Optional[float],
+              max_price: Optional[float], active_only: bool) -> np.ndarray:
+        mask = self._active[:count].copy() if active_only else np.ones(count, dtype=bool)
+        if category:
+            mask &= self._category[:count] == self._category_codes.get(category, -2)
+        if min_price is not None:
+            mask &= self._price[:count] >= min_price
+        if max_price is not None:
+            mask &= self._price[:count] <= max_price
+        return mask
+
+    def search(
+        self,
+        text: str,
+        k: int = 10,
+        category: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        active_only: bool = True,
+    ) -> List[Tuple[str, float]]:
+        """Top-k (product_id, cosine score) for free text, best first"""
+        features = query_features(text)
+        if not features:
+            return []
+        with self._lock:
+            count = len(self._ids)
+            if count == 0:
+                return []
+            weighted, idf = self._weighted_matrix()
+            query = hash_features(features, self.dimensions) * idf
+            norm = np.linalg.norm(query)
+            if norm == 0:
+                return []
+            scores = weighted @ (query / norm)
+            return self._rank(scores, k, self._mask(count, category, min_price, max_price, active_only))
+
+    def similar(self, product_id, k: int = 10, category: Optional[str] = None,
+                active_only: bool = True) -> List[Tuple[str, float]]:
+        """Products most similar to an indexed product"""
+        with self._lock:
+            row = self._rows.get(str(product_id))
+            if row is None:
+                return []
+            weighted, _ = self._weighted_matrix()
+            scores = weighted @ weighted[row]
+            mask = self._mask(len(self._ids), category, None, None, active_only)
+            return self._rank(scores, k, mask, exclude=row)
+
+    def _build(self, products: List[dict]) -> "SimilarityIndex":
+        fresh = SimilarityIndex(self.dimensions, max(1024, len(products)))
+        for product in products:
+            fresh.upsert(product)
+        fresh._weighted_matrix()
+        return fresh
+
+    async def rebuild(self, db) -> int:
+        """Re-index the whole catalog from MongoDB; the CPU work runs in a thread"""
+        version = await get_catalog_version(db)
+        products = await db.products.find({}, PRODUCT_PROJECTION).batch_size(1000).to_list(length=None)
+        fresh = await asyncio.to_thread(self._build, products)
+        with self._lock:
+            self.__dict__.update({k: v for k, v in fresh.__dict__.items() if k != "_lock"})
+            self.catalog_version = version
+        return len(self._ids)
+
+    async def catch_up(self, db) -> int:
+        """Re-index the products changed since catalog_version, returns products applied"""
+        version = await get_catalog_version(db)
+        if self.catalog_version is None:
+            return await self.rebuild(db)
+        if version <= self.catalog_version:
+            return 0
+        changes = await db.catalog_changes.find(
+            {"_id": {"$gt": self.catalog_version, "$lte": version}}
+        ).sort("_id", 1).to_list(length=None)
+
+        # Apply versions in order, stopping at one whose record is not there yet
+        applied = []
+        for change in changes:
+            if change["_id"] != self.catalog_version + len(applied) + 1:
+                break
+            if change.get("product_id") is None:
+                return await self.rebuild(db)
+            applied.append(change)
+        if not applied:
+            now = time.monotonic()
+            if self._gap_since is None:
+                self._gap_since = now
+            elif now - self._gap_since > CHANGE_GAP_SECONDS:
+                return await self.rebuild(db)
+            return 0
+        self._gap_since = None
+
+        product_ids = list(dict.fromkeys(change["product_id"] for change in applied))
+        found = {
+            product["_id"]: product
+            async for product in db.products.find({"_id": {"$in": product_ids}}, PRODUCT_PROJECTION)
+        }
+        with self._lock:
+            for product_id in product_ids:
+                if product_id in found:
+                    self.upsert(found[product_id])
+                else:
+                    self.remove(product_id)
+            self.catalog_version = applied[-1]["_id"]
+        return len(product_ids)
+
+    def note_local_write(self, new_version: int):
+        """Keep catalog_version in step after a write applied via upsert/remove"""
+        if self.catalog_version is not None and new_version == self.catalog_version + 1:
+            self.catalog_version = new_version
+
+    async def run_refresh_loop(self, get_db, interval_seconds: float):
+        """Catch up with products other workers have changed"""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.catch_up(await get_db())
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Similarity index refresh failed: {e}")
+
+similarity_index = SimilarityIndex(settings.SIMILARITY_DIMENSIONS)
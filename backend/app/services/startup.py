@@ -0,0 +1,72 @@
+"""
+Startup profile
+
+How long this process took to become ready to serve, split into the
+import of app.main and each startup phase (Mongo connect, worker id
+lease, similarity index load, warm-up steps). Under the production
+server the import happens once in the gunicorn master, so a worker's
+time to ready counts from its fork.
+
+The profile is printed once startup finishes, returned by
+/health/worker and exported as the app_startup_* gauges.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from app.services.metrics import registry
+
+STARTUP_IMPORT_SECONDS = registry.gauge(
+    "app_startup_import_seconds", "Time to import app.main"
+)
+STARTUP_PHASE_SECONDS = registry.gauge(
+    "app_startup_phase_seconds", "Time spent in each startup phase", ["phase"]
+)
+STARTUP_READY_SECONDS = registry.gauge(
+    "app_startup_ready_seconds", "Time from import (or worker fork) until ready to serve"
+)
+
+_started = time.monotonic()
+_import_seconds: Optional[float] = None
+_phases: Dict[str, float] = {}
+_ready_seconds: Optional[float] = None
+
+def imported(import_started: float):
+    """Called at the end of app.main with the monotonic time its import began"""
+    global _started, _import_seconds
+    _started = import_started
+    _import_seconds = time.monotonic() - import_started
+    STARTUP_IMPORT_SECONDS.set(_import_seconds)
+
+def worker_started():
+    """Called in each worker right after fork: its startup counts from here"""
+    global _started, _phases, _ready_seconds
+    _started = time.monotonic()
+    _phases = {}
+    _ready_seconds = None
+
+@contextmanager
+def phase(name: str):
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        _phases[name] = time.monotonic() - start
+        STARTUP_PHASE_SECONDS.set(_phases[name], phase=name)
+
+def startup_profile() -> dict:
+    return {
+        "import_seconds": round(_import_seconds, 3) if _import_seconds is not None else None,
+        "phases": {name: round(seconds, 3) for name, seconds in _phases.items()},
+        "ready_seconds": round(_ready_seconds, 3) if _ready_seconds is not None else None,
+    }
+
+def ready() -> dict:
+    """Mark the process ready to serve and log the profile"""
+    global _ready_seconds
+    _ready_seconds = time.monotonic() - _started
+    STARTUP_READY_SECONDS.set(_ready_seconds)
+    profile = startup_profile()
+    phases = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in profile["phases"].items())
+    imported_in = f"{profile['import_seconds']:.3f}s" if _import_seconds is not None else "n/a"
+    print(f"Ready in {profile['ready_seconds']:.3f}s (import {imported_in}; {phases})")
+    return profile
@@ -0,0 +1,284 @@
+"""
+Materialized per-vendor dashboard counters
+
+One document per vendor in `vendor_stats`, keyed by the vendor id:
+
+    {
+        "_id": vendor_id,
+        "products": {"total": n, "active": n, "inactive": n, ...},
+        "orders": {"total": n, "by_status": {"pending": n, ...}},
+        "revenue": {"total": x},
+        "revenue_by_day": {"2024-01-31": x, ...},
+        "version": n,
+        "updated_at": datetime
+    }
+
+The product and order write paths apply `$inc` deltas so the dashboard is a
+single point read. Increments can drift (a crash between the primary write
+and the counter update, manual edits in the shell), so
+`reconcile_vendor_stats` recomputes the documents from the source
+collections and `run_reconciliation_loop` does that periodically, on the
+leader only.
+
+Every delta also bumps `version`. A correction replaces a document only if
+its version is still the one read before the aggregation (and after a
+settle delay for deltas already in flight), so a delta that lands while
+reconciling is never overwritten: that vendor waits for the next pass.
+"""
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.models import OrderStatus, ProductStatus
+
+# How long a correction waits after the aggregation for the deltas of
+# writes it already counted, so they bump the version before the guard
+RECONCILE_SETTLE_SECONDS = 5
+
+def _value(status) -> str:
+    return getattr(status, "value", status)
+
+def _day(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%d")
+
+def _revenue_by_vendor(items) -> dict:
+    revenue = defaultdict(float)
+    for item in items:
+        if item.get("vendor_id") is not None:
+            revenue[item["vendor_id"]] += item["total_price"]
+    return revenue
+
+def _empty_stats(vendor_id) -> dict:
+    return {
+        "_id": vendor_id,
+        "products": {"total": 0},
+        "orders": {"total": 0, "by_status": {}},
+        "revenue": {"total": 0.0},
+        "revenue_by_day": {},
+    }
+
+async def _apply(db, vendor_id, inc: dict):
+    await db.vendor_stats.update_one(
+        {"_id": vendor_id},
+        {"$inc": {**inc, "version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+async def record_product_created(db, vendor_id, product_status=ProductStatus.ACTIVE):
+    await _apply(db, vendor_id, {
+        "products.total": 1,
+        f"products.{_value(product_status)}": 1
+    })
+
+async def record_product_status_changed(db, vendor_id, old_status, new_status):
+    old_status, new_status = _value(old_status), _value(new_status)
+    if old_status == new_status:
+        return
+    await _apply(db, vendor_id, {
+        f"products.{old_status}": -1,
+        f"products.{new_status}": 1
+    })
+
+async def record_product_deleted(db, vendor_id, product_status):
+    await _apply(db, vendor_id, {
+        "products.total": -1,
+        f"products.{_value(product_status)}": -1
+    })
+
+async def record_order_created(db, order: dict):
+    """Count a new order once for every vendor that has lines in it"""
+    day = _day(order.get("created_at") or datetime.utcnow())
+    order_status = _value(order["status"])
+    now = datetime.utcnow()
+
+    operations = [
+        UpdateOne(
+            {"_id": vendor_id},
+            {
+                "$inc": {
+                    "orders.total": 1,
+                    f"orders.by_status.{order_status}": 1,
+                    "revenue.total": revenue,
+                    f"revenue_by_day.{day}": revenue,
+                    "version": 1
+                },
+                "$set": {"updated_at": now}
+            },
+            upsert=True
+        )
+        for vendor_id, revenue in _revenue_by_vendor(order["items"]).items()
+    ]
+    if operations:
+        await db.vendor_stats.bulk_write(operations, ordered=False)
+
+def _status_change_operations(order: dict, old_status, new_status, now: datetime) -> list:
+    old_status, new_status = _value(old_status), _value(new_status)
+    if old_status == new_status:
+        return []
+
+    cancelled = _value(OrderStatus.CANCELLED)
+    day = _day(order.get("created_at") or order["_id"].generation_time)
+
+    operations = []
+    for vendor_id, revenue in _revenue_by_vendor(order["items"]).items():
+        inc = {
+            f"orders.by_status.{old_status}": -1,
+            f"orders.by_status.{new_status}": 1,
+            "version": 1
+        }
+        if new_status == cancelled:
+            inc["revenue.total"] = -revenue
+            inc[f"revenue_by_day.{day}"] = -revenue
+        elif old_status == cancelled:
+            inc["revenue.total"] = revenue
+            inc[f"revenue_by_day.{day}"] = revenue
+        operations.append(UpdateOne(
+            {"_id": vendor_id},
+            {"$inc": inc, "$set": {"updated_at": now}},
+            upsert=True
+        ))
+    return operations
+
+async def record_order_status_changed(db, order: dict, old_status, new_status):
+    """Move an order between status buckets; cancelling also removes its revenue"""
+    await record_order_status_changes(db, [(order, old_status, new_status)])
+
+async def record_order_status_changes(db, changes):
+    """record_order_status_changed for many (order, old_status, new_status) in one bulk_write"""
+    now = datetime.utcnow()
+    operations = [
+        operation
+        for order, old_status, new_status in changes
+        for operation in _status_change_operations(order, old_status, new_status, now)
+    ]
+    if operations:
+        await db.vendor_stats.bulk_write(operations, ordered=False)
+
+async def compute_vendor_stats(db, vendor_id=None) -> dict:
+    """Stats documents recomputed from products and orders, by vendor id"""
+    stats = {}
+
+    def stats_for(vid):
+        if vid not in stats:
+            stats[vid] = _empty_stats(vid)
+        return stats[vid]
+
+    if vendor_id is not None:
+        stats_for(vendor_id)
+    else:
+        # Vendors with no products or orders left still get zeroed counters
+        async for vendor in db.vendors.find({}, {"_id": 1}):
+            stats_for(vendor["_id"])
+
+    product_match = {} if vendor_id is None else {"vendor_id": vendor_id}
+    product_pipeline = [
+        {"$match": product_match},
+        {"$group": {
+            "_id": {
+                "vendor_id": "$vendor_id",
+                "status": {"$ifNull": ["$status", _value(ProductStatus.ACTIVE)]}
+            },
+            "count": {"$sum": 1}
+        }}
+    ]
+    async for row in db.products.aggregate(product_pipeline):
+        products = stats_for(row["_id"]["vendor_id"])["products"]
+        products["total"] += row["count"]
+        products[row["_id"]["status"]] = row["count"]
+
+    vendor_match = {"items.vendor_id": vendor_id if vendor_id is not None else {"$ne": None}}
+    order_pipeline = [
+        {"$match": vendor_match},
+        {"$unwind": "$items"},
+        {"$match": vendor_match},
+        # One row per (order, vendor) with that vendor's share of the order
+        {"$group": {
+            "_id": {"order_id": "$_id", "vendor_id": "$items.vendor_id"},
+            "status": {"$first": "$status"},
+            "created_at": {"$first": {"$ifNull": ["$created_at", {"$toDate": "$_id"}]}},
+            "revenue": {"$sum": "$items.total_price"}
+        }},
+        {"$group": {
+            "_id": {
+                "vendor_id": "$_id.vendor_id",
+                "status": "$status",
+                "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}}
+            },
+            "orders": {"$sum": 1},
+            "revenue": {"$sum": "$revenue"}
+        }}
+    ]
+    cancelled = _value(OrderStatus.CANCELLED)
+    async for row in db.orders.aggregate(order_pipeline, allowDiskUse=True):
+        doc = stats_for(row["_id"]["vendor_id"])
+        order_status = row["_id"]["status"]
+        doc["orders"]["total"] += row["orders"]
+        by_status = doc["orders"]["by_status"]
+        by_status[order_status] = by_status.get(order_status, 0) + row["orders"]
+        if order_status != cancelled:
+            day = row["_id"]["day"]
+            doc["revenue"]["total"] += row["revenue"]
+            doc["revenue_by_day"][day] = doc["revenue_by_day"].get(day, 0.0) + row["revenue"]
+
+    return stats
+
+async def reconcile_vendor_stats(db, vendor_id=None, settle_seconds: float = 0) -> int:
+    """Correct stats documents whose counters did not move meanwhile, returns vendors written"""
+    query = {} if vendor_id is None else {"_id": vendor_id}
+    versions = {
+        doc["_id"]: doc.get("version")
+        async for doc in db.vendor_stats.find(query, {"version": 1})
+    }
+    stats = await compute_vendor_stats(db, vendor_id)
+    if settle_seconds:
+        await asyncio.sleep(settle_seconds)
+
+    now = datetime.utcnow()
+    operations, missing = [], []
+    for vid, doc in stats.items():
+        if vid not in versions:
+            missing.append({**doc, "version": 0, "updated_at": now})
+            continue
+        # {"version": None} also matches documents written before versions
+        version = versions[vid]
+        operations.append(ReplaceOne(
+            {"_id": vid, "version": version},
+            {**doc, "version": (version or 0) + 1, "updated_at": now}
+        ))
+
+    written = 0
+    if operations:
+        result = await db.vendor_stats.bulk_write(operations, ordered=False)
+        written += result.matched_count
+    for doc in missing:
+        try:
+            await db.vendor_stats.insert_one(doc)
+            written += 1
+        except DuplicateKeyError:
+            # A delta created it meanwhile; corrected on the next pass
+            pass
+    return written
+
+async def get_vendor_stats(db, vendor_id) -> dict:
+    """Point read of a vendor's stats, building the document on first use"""
+    doc = await db.vendor_stats.find_one({"_id": vendor_id})
+    if doc is None:
+        await reconcile_vendor_stats(db, vendor_id)
+        doc = await db.vendor_stats.find_one({"_id": vendor_id}) or _empty_stats(vendor_id)
+    return doc
+
+async def run_reconciliation_loop(get_db, interval_seconds: int, leader):
+    """Periodically correct every vendor's stats for counter drift, while `leader` holds its lease"""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        if not leader.is_leader:
+            continue
+        try:
+            db = await get_db()
+            written = await reconcile_vendor_stats(db, settle_seconds=RECONCILE_SETTLE_SECONDS)
+            print(f"Reconciled stats for {written} vendors")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Vendor stats reconciliation failed: {e}")
@@ -0,0 +1,77 @@
+"""
+Startup warm-up
+
+Runs at the end of startup, before the worker takes traffic, so that the
+first requests after a deploy, restart or scale-out do not pay one-off
+costs:
+
+- integrations: the configured stripe/openai SDKs and the bcrypt backend
+  (app/services/integrations.py),
+- mongo_pool: MONGO_MIN_POOL_SIZE connections opened now rather than by
+  the first concurrent requests,
+- caches: catalog version and categories,
+- routes: one in-process GET per route in WARM_UP_PATHS (health and
+  the catalog list routes; routes keyed by a product id are left cold)
+  through the whole middleware stack, which runs routing, dependencies
+  and the response serializer once and fills the catalog cache's first
+  page,
+- openapi: the schema behind /docs, otherwise built on the first visit.
+
+Every step is timed in the startup profile. A failing step is logged and
+skipped; the database steps are skipped when Mongo is unreachable so the
+worker does not wait on a server selection timeout for each of them.
+Disable with STARTUP_WARM_UP=false.
+"""
+import asyncio
+import inspect
+from typing import Callable, Dict, Iterable
+from app.config.settings import settings
+from app.services import integrations, startup
+from app.services.catalog import get_catalog_version, get_categories
+
+WARM_UP_PATHS = (
+    "/health",
+    "/api/products/",
+    "/api/products/categories/list",
+)
+
+async def _step(name: str, action: Callable) -> bool:
+    with startup.phase(f"warmup.{name}"):
+        try:
+            result = action()
+            if inspect.isawaitable(result):
+                await result
+            return True
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {e}")
+            return False
+
+async def open_pool(db, connections: int):
+    # Each concurrent command needs its own socket, so the pool grows to `connections`
+    await asyncio.gather(*(db.command("ping") for _ in range(max(1, connections))))
+
+async def prime_caches(db):
+    await get_catalog_version(db)
+    await get_categories(db)
+
+async def request_routes(app, paths: Iterable[str]) -> Dict[str, int]:
+    # Only needed here, so kept out of the app import
+    import httpx
+    statuses = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://warm-up") as client:
+        for path in paths:
+            # Compressed, like most clients ask for, so the encoded variant is cached too
+            response = await client.get(path, headers={"Accept-Encoding": "br, gzip"})
+            statuses[path] = response.status_code
+    failed = {path: code for path, code in statuses.items() if code >= 500}
+    if failed:
+        raise RuntimeError(f"warm-up requests failed: {failed}")
+    return statuses
+
+async def warm_up(app, db):
+    await _step("integrations", integrations.preload)
+    if await _step("mongo_pool", lambda: open_pool(db, settings.MONGO_MIN_POOL_SIZE)):
+        await _step("caches", lambda: prime_caches(db))
+        await _step("routes", lambda: request_routes(app, WARM_UP_PATHS))
+    await _step("openapi", app.openapi)
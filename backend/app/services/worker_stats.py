@@ -0,0 +1,63 @@
+"""
+Per-worker process stats
+
+Under the production server (app/server.py) each worker records its slot
+(0..workers-1, stable across restarts) and request limit after fork.
+`worker_stats()` reports them with the pid, uptime, requests served and
+in flight, and memory, so a scrape or a /health/worker call shows which
+worker answered and how close it is to being recycled. Under plain
+uvicorn the slot is 0 and there is no request limit.
+"""
+import os
+import resource
+import time
+from typing import Optional
+from app.middleware.metrics import IN_FLIGHT, REQUESTS
+from app.services.ids import get_id_generator
+from app.services.metrics import registry
+
+WORKER_UPTIME = registry.gauge("app_worker_uptime_seconds", "Seconds since this worker started", ["slot"])
+WORKER_REQUESTS = registry.gauge("app_worker_requests", "Requests this worker has served", ["slot"])
+WORKER_RSS = registry.gauge("app_worker_resident_memory_bytes", "Resident memory of this worker", ["slot"])
+
+_slot = 0
+_max_requests: Optional[int] = None
+_started = time.monotonic()
+_page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+def configure(slot: int, max_requests: Optional[int]):
+    """Called in each worker right after fork"""
+    global _slot, _max_requests, _started
+    _slot = slot
+    _max_requests = max_requests or None
+    _started = time.monotonic()
+
+def _resident_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _page_size
+    except (OSError, IndexError, ValueError):
+        # Peak rather than current outside Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def worker_stats() -> dict:
+    requests = int(REQUESTS.total())
+    return {
+        "slot": _slot,
+        "pid": os.getpid(),
+        "worker_id": get_id_generator().worker_id,
+        "uptime_seconds": round(time.monotonic() - _started, 1),
+        "requests": requests,
+        "in_flight": int(IN_FLIGHT.total()),
+        "max_requests": _max_requests,
+        "requests_until_recycle": max(0, _max_requests - requests) if _max_requests else None,
+        "resident_memory_bytes": _resident_bytes(),
+    }
+
+def update_metrics():
+    """Refresh the worker gauges before a /metrics scrape"""
+    stats = worker_stats()
+    slot = str(stats["slot"])
+    WORKER_UPTIME.set(stats["uptime_seconds"], slot=slot)
+    WORKER_REQUESTS.set(stats["requests"], slot=slot)
+    WORKER_RSS.set(stats["resident_memory_bytes"], slot=slot)
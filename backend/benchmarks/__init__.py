@@ -0,0 +1,2 @@
+# Performance benchmarks. Run from the backend directory, e.g.
+#   python -m benchmarks.bench_order_ids
@@ -0,0 +1,100 @@
+"""
+Bytes on the wire and CPU per request for catalog responses
+
+For a product page of each size (rendered like the cached catalog pages)
+prints the body size without compression, with gzip and with brotli at
+the configured levels, and the CPU time per request when the middleware
+compresses every response versus when the compressed body comes from an
+EncodedBody cache entry. Requests are raw ASGI calls, no socket.
+
+    python -m benchmarks.bench_compression --requests 2000
+"""
+import argparse
+import asyncio
+import random
+import time
+from fastapi import FastAPI, Request
+from fastapi.responses import Response
+from app.middleware.compression import CompressionMiddleware
+from app.models import Product
+from app.routes.products import PRODUCT_LIST
+from app.services.compression import EncodedBody, brotli, compress, encoded_response
+from benchmarks.bench_hot_paths import product_documents
+
+SIZES = (1, 20, 100)
+WORDS = (
+    "durable lightweight premium cotton steel wireless battery compact ergonomic waterproof "
+    "handmade organic adjustable portable classic modern vintage soft warm breathable quick "
+    "charging noise cancelling stainless bamboo leather recycled travel kitchen outdoor office"
+).split()
+
+def render(size: int) -> bytes:
+    # Varied descriptions: repeated filler text would overstate compression ratios
+    rng = random.Random(size)
+    documents = product_documents(size)
+    for document in documents:
+        document["name"] = " ".join(rng.choices(WORDS, k=3)).title()
+        document["description"] = " ".join(rng.choices(WORDS, k=60)) + "."
+    products = [Product(**document) for document in documents]
+    if size == 1:
+        return products[0].model_dump_json(by_alias=True).encode()
+    return PRODUCT_LIST.dump_json(products, by_alias=True)
+
+def build_app(body: bytes) -> FastAPI:
+    app = FastAPI()
+    cached = EncodedBody(body)
+
+    @app.get("/uncached")
+    async def uncached():
+        return Response(body, media_type="application/json")
+
+    @app.get("/cached")
+    async def cached_page(request: Request):
+        return encoded_response(cached, request.headers.get("accept-encoding"))
+
+    app.add_middleware(CompressionMiddleware)
+    return app
+
+async def cpu_per_request(app, path: str, accept_encoding: str, count: int) -> float:
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": headers, "client": ("127.0.0.1", 1), "server": ("test", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(50):
+        await app(dict(scope), receive, send)
+    start = time.process_time()
+    for _ in range(count):
+        await app(dict(scope), receive, send)
+    return (time.process_time() - start) / count
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    encodings = [("identity", "")] + [("gzip", "gzip")] + ([("br", "br")] if brotli else [])
+    print(f"CPU microseconds per request over {args.requests} requests")
+    for size in SIZES:
+        body = render(size)
+        sizes = "  ".join(
+            f"{name} {len(body) if not accept else len(compress(body, accept)):>7,} B"
+            for name, accept in encodings
+        )
+        print(f"{size:>3} product(s): {sizes}")
+        app = build_app(body)
+        for name, accept in encodings:
+            uncached = await cpu_per_request(app, "/uncached", accept, args.requests)
+            cached = await cpu_per_request(app, "/cached", accept, args.requests)
+            print(f"     {name:<8} compress per request {uncached * 1e6:8.1f}  from cache {cached * 1e6:8.1f}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
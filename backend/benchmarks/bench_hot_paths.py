@@ -0,0 +1,161 @@
+"""
+Micro-benchmarks for per-request hot paths (pytest-benchmark)
+
+Model construction and validation (PyObjectId's custom core schema and
+the datetime default factories run for every document), response
+serialization the way FastAPI does it for `response_model`, JWT issue
+and verification, and cart totals. Datasets are fixed (seeded, fixed
+sizes: a default 20-product page, a 100-product page, a 10-item order,
+3- and 50-item carts) so results are comparable across releases.
+
+Not collected by the normal test run; pass the file explicitly:
+
+    python -m pytest benchmarks/bench_hot_paths.py --benchmark-autosave
+    python -m pytest benchmarks/bench_hot_paths.py --benchmark-compare --benchmark-compare-fail=mean:15%
+
+Saved runs go to .benchmarks/; compare a release against the previous
+one's saved run to catch regressions.
+"""
+import json
+import random
+from datetime import datetime, timedelta
+from typing import List
+import pytest
+from bson import ObjectId
+from jose import jwt
+from pydantic import TypeAdapter
+from app.config.settings import settings
+from app.models import CartItem, Order, OrderItem, Product
+from app.routes.cart import cart_total
+from app.services.auth import create_access_token
+
+PAGE_SIZES = [20, 100]
+ORDER_ITEMS = 10
+CART_SIZES = [3, 50]
+
+def product_documents(count: int, seed: int = 7) -> List[dict]:
+    """Products as Motor returns them: ObjectIds and datetimes, no defaults missing"""
+    rng = random.Random(seed)
+    created = datetime(2024, 1, 1)
+    return [
+        {
+            "_id": ObjectId(),
+            "vendor_id": ObjectId(),
+            "name": f"Product {i}",
+            "description": "A sturdy, well-reviewed everyday item. " * 8,
+            "price": round(rng.uniform(5, 500), 2),
+            "category": rng.choice(["Electronics", "Clothing", "Books", "Home & Garden"]),
+            "images": [f"https://cdn.example.com/products/{i}/{n}.jpg" for n in range(3)],
+            "stock_quantity": rng.randint(0, 500),
+            "sku": f"SKU-{i:06d}",
+            "status": "active",
+            "created_at": created + timedelta(minutes=i),
+            "updated_at": created + timedelta(minutes=i),
+        }
+        for i in range(count)
+    ]
+
+def order_document(items: int) -> dict:
+    now = datetime(2024, 1, 1)
+    return {
+        "_id": ObjectId(),
+        "user_id": ObjectId(),
+        "order_number": "AM-20240101-000001",
+        "items": [
+            {
+                "product_id": ObjectId(), "vendor_id": ObjectId(), "product_name": f"Product {i}",
+                "quantity": 2, "unit_price": 19.99, "total_price": 39.98,
+            }
+            for i in range(items)
+        ],
+        "total_amount": 39.98 * items,
+        "status": "pending",
+        "shipping_address": {
+            "street": "1 Main St", "city": "Springfield", "state": "IL",
+            "postal_code": "62701", "country": "US",
+        },
+        "payment_intent_id": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+def cart_items(count: int, seed: int = 11) -> List[dict]:
+    rng = random.Random(seed)
+    return [
+        {"product_id": ObjectId(), "quantity": rng.randint(1, 5), "price": round(rng.uniform(5, 500), 2)}
+        for _ in range(count)
+    ]
+
+PRODUCT_LIST = TypeAdapter(List[Product])
+
+def render_response(adapter: TypeAdapter, content) -> bytes:
+    """What FastAPI 0.104 does with a response_model return value"""
+    value = adapter.validate_python(content, from_attributes=True)
+    data = adapter.dump_python(value, mode="json", by_alias=True)
+    return json.dumps(data, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+# Models
+
+@pytest.mark.parametrize("size", PAGE_SIZES)
+def test_product_page_validation(benchmark, size):
+    documents = product_documents(size)
+    products = benchmark(lambda: [Product(**document) for document in documents])
+    assert len(products) == size
+
+@pytest.mark.parametrize("size", PAGE_SIZES)
+def test_product_validation_from_string_ids(benchmark, size):
+    # The PyObjectId str -> ObjectId branch (request bodies, cached JSON)
+    documents = [dict(d, _id=str(d["_id"]), vendor_id=str(d["vendor_id"])) for d in product_documents(size)]
+    products = benchmark(lambda: [Product(**document) for document in documents])
+    assert isinstance(products[0].id, ObjectId)
+
+def test_new_order_items_with_default_factories(benchmark):
+    def build():
+        return [
+            OrderItem(product_id=ObjectId(), product_name=f"Product {i}", quantity=1,
+                      unit_price=9.99, total_price=9.99)
+            for i in range(ORDER_ITEMS)
+        ]
+    assert len(benchmark(build)) == ORDER_ITEMS
+
+def test_cart_item_construction(benchmark):
+    product_id = str(ObjectId())
+    item = benchmark(CartItem, product_id=product_id, quantity=2, price=19.99)
+    assert item.quantity == 2
+
+def test_order_validation(benchmark):
+    document = order_document(ORDER_ITEMS)
+    order = benchmark(Order, **document)
+    assert len(order.items) == ORDER_ITEMS
+
+# Serialization
+
+@pytest.mark.parametrize("size", PAGE_SIZES)
+def test_product_page_response(benchmark, size):
+    products = [Product(**document) for document in product_documents(size)]
+    body = benchmark(render_response, PRODUCT_LIST, products)
+    assert body.startswith(b"[{")
+
+def test_order_response(benchmark):
+    order = Order(**order_document(ORDER_ITEMS))
+    body = benchmark(render_response, TypeAdapter(Order), order)
+    assert b'"order_number"' in body
+
+# Auth
+
+def test_create_access_token(benchmark):
+    token = benchmark(create_access_token, {"sub": str(ObjectId())}, timedelta(minutes=30))
+    assert token.count(".") == 2
+
+def test_decode_access_token(benchmark):
+    user_id = str(ObjectId())
+    token = create_access_token({"sub": user_id}, timedelta(minutes=30))
+    payload = benchmark(jwt.decode, token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    assert payload["sub"] == user_id
+
+# Cart
+
+@pytest.mark.parametrize("size", CART_SIZES)
+def test_cart_total(benchmark, size):
+    items = cart_items(size)
+    assert benchmark(cart_total, items) > 0
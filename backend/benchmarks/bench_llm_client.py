@@ -0,0 +1,86 @@
+"""
+Concierge LLM client latency and throughput against the fake model server
+
+Starts fakes/openai_server.py in-process on --port and fires --requests
+chat calls, --clients at a time, through app.services.llm.LLMClient.
+Shows how the concurrency limit trades queueing for upstream load and
+that the event loop keeps serving while calls are outstanding.
+
+    FAKE_LLM_LATENCY_MS=500 python -m benchmarks.bench_llm_client --requests 200 --clients 50 --limit 16
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uvicorn
+from app.services.llm import LLM_QUEUE_DEPTH, LLMClient
+from fakes.openai_server import app as fake_app
+
+async def start_fake_server(port: int):
+    server = uvicorn.Server(uvicorn.Config(fake_app, port=port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server, task
+
+async def measure_loop_lag(stop: asyncio.Event, lags: list):
+    """How late a 10ms timer fires while LLM calls are in flight"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+async def run(args):
+    server, server_task = await start_fake_server(args.port)
+    client = LLMClient(
+        api_key="sk-fake",
+        base_url=f"http://127.0.0.1:{args.port}/v1",
+        max_concurrency=args.limit,
+        timeout=args.timeout,
+    )
+    messages = [{"role": "user", "content": "running shoes under 80 dollars"}]
+
+    latencies, failures, max_queue = [], 0, 0
+    pending = iter(range(args.requests))
+
+    async def worker():
+        nonlocal failures, max_queue
+        for _ in pending:
+            start = time.perf_counter()
+            try:
+                await client.chat(messages)
+                latencies.append(time.perf_counter() - start)
+            except Exception:
+                failures += 1
+            max_queue = max(max_queue, LLM_QUEUE_DEPTH.value())
+
+    stop, lags = asyncio.Event(), []
+    lag_task = asyncio.create_task(measure_loop_lag(stop, lags))
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await lag_task
+
+    server.should_exit = True
+    await server_task
+    latencies.sort()
+    print(f"requests={args.requests} clients={args.clients} limit={args.limit}")
+    print(f"  throughput   {len(latencies) / elapsed:8.1f} req/s  failures={failures}")
+    if latencies:
+        print(f"  latency p50  {statistics.median(latencies) * 1000:8.0f} ms")
+        print(f"  latency p95  {latencies[int(len(latencies) * 0.95) - 1] * 1000:8.0f} ms")
+    print(f"  max queue depth {max_queue:.0f}")
+    print(f"  event loop lag max {max(lags, default=0) * 1000:.1f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=9100)
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Per-request cost of the metrics middleware and the Mongo command listener
+
+Drives a FastAPI app through raw ASGI calls (no HTTP client or socket in
+the loop) with and without MetricsMiddleware, on a routing table about
+the size of the real one, for a static and a parameterised route. Also
+times one started/succeeded event pair through CommandMetricsListener.
+
+    python -m benchmarks.bench_metrics_overhead --requests 20000
+"""
+import argparse
+import asyncio
+import time
+from datetime import timedelta
+from fastapi import FastAPI
+from pymongo import monitoring
+from app.middleware.metrics import MetricsMiddleware
+from app.services.mongo_monitoring import CommandMetricsListener
+
+def build_app(with_metrics: bool) -> FastAPI:
+    app = FastAPI()
+    for i in range(40):
+        app.add_api_route(f"/api/filler{i}/{{item_id}}", lambda item_id: {}, methods=["GET"])
+
+    @app.get("/api/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/api/products/{product_id}")
+    async def product(product_id: str):
+        return {"id": product_id}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+async def drive(app, path: str, count: int) -> float:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("test", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):
+        await app(dict(scope), receive, send)
+    start = time.perf_counter()
+    for _ in range(count):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / count
+
+def bench_listener(count: int) -> float:
+    listener = CommandMetricsListener()
+    address = ("localhost", 27017)
+    started = [
+        monitoring.CommandStartedEvent({"find": "products", "filter": {}}, "db", i, address, None)
+        for i in range(count)
+    ]
+    succeeded = [
+        monitoring.CommandSucceededEvent(timedelta(microseconds=800), {"ok": 1}, "find", i, address, None)
+        for i in range(count)
+    ]
+    start = time.perf_counter()
+    for begin, end in zip(started, succeeded):
+        listener.started(begin)
+        listener.succeeded(end)
+    return (time.perf_counter() - start) / count
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    plain, instrumented = build_app(False), build_app(True)
+    print(f"{args.requests} requests per case, best of {args.rounds} rounds, microseconds per request")
+    for label, path in (("static route", "/api/health"), ("param route", "/api/products/42")):
+        base, with_metrics = float("inf"), float("inf")
+        # Interleaved rounds, best of each, to keep machine noise out of the difference
+        for _ in range(args.rounds):
+            base = min(base, await drive(plain, path, args.requests))
+            with_metrics = min(with_metrics, await drive(instrumented, path, args.requests))
+        print(f"  {label:<13} plain {base * 1e6:7.1f}  metrics {with_metrics * 1e6:7.1f}  "
+              f"overhead {(with_metrics - base) * 1e6:6.1f} ({(with_metrics / base - 1) * 100:.1f}%)")
+    per_command = bench_listener(args.requests)
+    print(f"  command listener  {per_command * 1e6:.2f} us per command")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,85 @@
+"""
+Order number generation and insert throughput: random vs time-ordered
+
+Compares the old `ORD-<8 hex chars of uuid4>` scheme with the Snowflake
+order numbers from app.services.ids. Generation speed is always measured;
+insert throughput is measured against MongoDB (MONGODB_URL) into a scratch
+collection with the same unique index init_db.py puts on order_number.
+
+    python -m benchmarks.bench_order_ids --count 200000 --batch 1000
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError
+from app.config.settings import settings
+from app.services.ids import new_order_number
+
+def random_order_number() -> str:
+    return f"ORD-{uuid.uuid4().hex[:8].upper()}"
+
+SCHEMES = {
+    "uuid4": random_order_number,
+    "snowflake": new_order_number,
+}
+
+def bench_generation(count: int):
+    print(f"Generating {count} order numbers")
+    for name, generate in SCHEMES.items():
+        start = time.perf_counter()
+        numbers = [generate() for _ in range(count)]
+        elapsed = time.perf_counter() - start
+        duplicates = count - len(set(numbers))
+        print(f"  {name:<10} {count / elapsed:>12,.0f} ids/s  duplicates={duplicates}")
+
+async def bench_inserts(count: int, batch: int):
+    client = AsyncIOMotorClient(settings.MONGODB_URL, serverSelectionTimeoutMS=2000)
+    db = client[f"{settings.DATABASE_NAME}_bench"]
+    try:
+        await client.admin.command("ping")
+    except ServerSelectionTimeoutError:
+        print("MongoDB not reachable, skipping insert benchmark")
+        return
+
+    print(f"Inserting {count} orders in batches of {batch} (unique order_number index)")
+    for name, generate in SCHEMES.items():
+        collection = db[f"orders_{name}"]
+        await collection.drop()
+        await collection.create_index("order_number", unique=True)
+
+        collisions = 0
+        start = time.perf_counter()
+        for offset in range(0, count, batch):
+            docs = [
+                {"order_number": generate(), "total_amount": 0.0}
+                for _ in range(min(batch, count - offset))
+            ]
+            try:
+                await collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                collisions += len(e.details.get("writeErrors", []))
+        elapsed = time.perf_counter() - start
+
+        stats = await db.command("collStats", collection.name)
+        index_size = stats["indexSizes"].get("order_number_1", 0)
+        print(
+            f"  {name:<10} {count / elapsed:>12,.0f} inserts/s  "
+            f"collisions={collisions}  order_number index={index_size / 1024:,.0f} KiB"
+        )
+        await collection.drop()
+
+    client.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=200000)
+    parser.add_argument("--batch", type=int, default=1000)
+    args = parser.parse_args()
+
+    bench_generation(args.count)
+    asyncio.run(bench_inserts(args.count, args.batch))
+
+if __name__ == "__main__":
+    main()
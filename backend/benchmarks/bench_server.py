@@ -0,0 +1,109 @@
+"""
+Throughput of the production server against single-process uvicorn
+
+Starts the app each way in turn on --port and drives GET --path with
+--connections keep-alive connections for --seconds, using a minimal
+raw-socket HTTP/1.1 client (an HTTP library would saturate long before
+the server does). Modes:
+
+- uvicorn: `uvicorn app.main:app`, one process (development setup
+  without --reload),
+- gunicorn-N: `gunicorn app.main:app -c gunicorn.conf.py` with N workers.
+
+    python -m benchmarks.bench_server --workers 1 2 4 --seconds 10
+
+Run the load generator on other cores than the server (taskset) or
+another machine; on a single core both compete and the numbers say
+little about scaling.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+async def wait_until_up(port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+async def connection(port: int, path: str, stop_at: float, latencies: list, reconnects: list):
+    request = f"GET {path} HTTP/1.1\r\nHost: bench\r\n\r\n".encode()
+    while time.monotonic() < stop_at:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        try:
+            while time.monotonic() < stop_at:
+                start = time.perf_counter()
+                writer.write(request)
+                headers = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in headers.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":", 1)[1])
+                await reader.readexactly(length)
+                latencies.append(time.perf_counter() - start)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            # A recycled worker closes its keep-alive connections
+            reconnects.append(1)
+        finally:
+            writer.close()
+
+async def drive(port: int, path: str, connections: int, seconds: float):
+    # Warm up every worker before measuring
+    warm_up_until = time.monotonic() + 1
+    await asyncio.gather(*(connection(port, path, warm_up_until, [], []) for _ in range(connections)))
+    latencies, reconnects = [], []
+    start = time.monotonic()
+    await asyncio.gather(*(
+        connection(port, path, start + seconds, latencies, reconnects) for _ in range(connections)
+    ))
+    elapsed = time.monotonic() - start
+    latencies.sort()
+    p99 = latencies[int(len(latencies) * 0.99)]
+    return len(latencies) / elapsed, statistics.median(latencies), p99, len(reconnects)
+
+def start_server(mode: str, workers: int, port: int) -> subprocess.Popen:
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers))
+    if mode == "uvicorn":
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"]
+    else:
+        command = [sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn.conf.py", "--log-level", "warning"]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--port", type=int, default=8200)
+    parser.add_argument("--connections", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    print(f"GET {args.path}, {args.connections} connections, {args.seconds}s per mode")
+    for mode, workers in [("uvicorn", 1)] + [("gunicorn", n) for n in args.workers]:
+        process = start_server(mode, workers, args.port)
+        try:
+            await wait_until_up(args.port)
+            # Startup hooks finish after the socket opens
+            await asyncio.sleep(2)
+            throughput, p50, p99, reconnects = await drive(args.port, args.path, args.connections, args.seconds)
+        finally:
+            process.terminate()
+            process.wait()
+        label = mode if mode == "uvicorn" else f"gunicorn-{workers}"
+        print(f"  {label:<12} {throughput:9.0f} req/s  p50 {p50 * 1000:6.2f} ms  "
+              f"p99 {p99 * 1000:6.2f} ms  reconnects {reconnects}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
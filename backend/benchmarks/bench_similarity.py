@@ -0,0 +1,59 @@
+"""
+Similarity index build and query latency on a synthetic catalog
+
+    python -m benchmarks.bench_similarity --products 50000 --dimensions 512
+"""
+import argparse
+import random
+import statistics
+import time
+from bson import ObjectId
+from app.services.similarity import SimilarityIndex
+
+WORDS = (
+    "red blue black running shoe leather jacket wireless headphone laptop stand "
+    "cotton shirt yoga mat coffee grinder steel bottle kids toy puzzle garden hose "
+    "lamp desk chair organic tea novel cookbook lipstick serum bike helmet tent"
+).split()
+CATEGORIES = ["Electronics", "Clothing", "Books", "Home & Garden", "Sports & Outdoors", "Beauty & Health"]
+QUERIES = ["wireless headphones", "red running shoes", "organic tea gift", "yoga mat", "desk lamp for kids"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--products", type=int, default=50000)
+    parser.add_argument("--dimensions", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(7)
+    index = SimilarityIndex(args.dimensions)
+    start = time.perf_counter()
+    for _ in range(args.products):
+        index.upsert({
+            "_id": ObjectId(),
+            "name": " ".join(random.sample(WORDS, 3)),
+            "description": " ".join(random.choices(WORDS, k=30)),
+            "category": random.choice(CATEGORIES),
+            "price": random.uniform(5, 300),
+        })
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    index.search("warm up")
+    weighting = time.perf_counter() - start
+
+    timings = []
+    for i in range(args.queries):
+        start = time.perf_counter()
+        index.search(QUERIES[i % len(QUERIES)], k=20, max_price=150)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    matrix_mb = args.products * args.dimensions * 4 / 1e6
+    print(f"products={args.products} dimensions={args.dimensions} matrix={matrix_mb:.0f} MB")
+    print(f"  build        {build:8.2f} s  ({args.products / build:,.0f} products/s)")
+    print(f"  tf-idf pass  {weighting * 1000:8.1f} ms (after writes)")
+    print(f"  query p50    {statistics.median(timings) * 1000:8.2f} ms")
+    print(f"  query p95    {timings[int(len(timings) * 0.95) - 1] * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
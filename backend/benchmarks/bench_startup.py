@@ -0,0 +1,90 @@
+"""
+Cold start: import time, time to first ready and first-request latency
+
+Each run starts a fresh interpreter:
+
+- import: `import app.main` alone, median of --runs,
+- ready: `uvicorn app.main:app` on --port, from spawn until GET /health
+  answers (startup hooks and warm-up included), with the app's own
+  startup profile from /health/worker,
+- first requests: latency of the first and second GET of each --paths
+  right after ready, which shows what the warm-up left for traffic.
+
+    python -m benchmarks.bench_startup --runs 5
+    STARTUP_WARM_UP=false python -m benchmarks.bench_startup
+
+Run it against the MongoDB the app is configured for; without one every
+startup phase waits MONGO_SERVER_SELECTION_TIMEOUT_MS.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+def import_seconds() -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+def get(port: int, path: str, timeout: float = 5.0, accept_encoding: str = "gzip"):
+    start = time.perf_counter()
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", headers={"Accept-Encoding": accept_encoding})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        body = response.read()
+    return time.perf_counter() - start, body
+
+def start_and_wait(port: int, timeout: float = 120.0):
+    spawned = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=dict(os.environ), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    while time.perf_counter() - spawned < timeout:
+        try:
+            get(port, "/health", timeout=1.0)
+            return process, time.perf_counter() - spawned
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.01)
+    process.terminate()
+    raise RuntimeError(f"server on port {port} did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8210)
+    parser.add_argument("--paths", nargs="+", default=["/api/products/", "/api/products/categories/list", "/openapi.json"])
+    args = parser.parse_args()
+
+    imports = [import_seconds() for _ in range(args.runs)]
+    print(f"import app.main: median {statistics.median(imports) * 1000:.0f} ms "
+          f"(min {min(imports) * 1000:.0f}, max {max(imports) * 1000:.0f})")
+
+    ready, first, second = [], {path: [] for path in args.paths}, {path: [] for path in args.paths}
+    profile = None
+    for _ in range(args.runs):
+        process, seconds = start_and_wait(args.port)
+        try:
+            ready.append(seconds)
+            for path in args.paths:
+                first[path].append(get(args.port, path)[0])
+                second[path].append(get(args.port, path)[0])
+            profile = json.loads(get(args.port, "/health/worker", accept_encoding="identity")[1])["startup"]
+        finally:
+            process.terminate()
+            process.wait()
+    print(f"spawn to first ready: median {statistics.median(ready) * 1000:.0f} ms")
+    print(f"startup profile (last run): {json.dumps(profile)}")
+    for path in args.paths:
+        print(f"  GET {path:<32} first {statistics.median(first[path]) * 1000:7.2f} ms  "
+              f"second {statistics.median(second[path]) * 1000:7.2f} ms")
+
+if __name__ == "__main__":
+    main()
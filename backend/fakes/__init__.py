@@ -0,0 +1,4 @@
+# Local stand-ins for third-party APIs, for offline load and latency testing.
+# Run from the backend directory, e.g.
+#   uvicorn fakes.openai_server:app --port 9100
+#   uvicorn fakes.stripe_server:app --port 9200
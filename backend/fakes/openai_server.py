@@ -0,0 +1,111 @@
+"""
+Fake OpenAI chat completions server
+
+Implements enough of POST /v1/chat/completions for the concierge:
+responses arrive after FAKE_LLM_LATENCY_MS (plus up to FAKE_LLM_JITTER_MS)
+and, when the prompt contains product ids, the reply lists the first five
+so the recommendation path can be exercised end to end. With "stream": true
+the reply is sent as SSE chunks, the first after FAKE_LLM_TTFT_MS and one
+word every FAKE_LLM_TOKEN_MS after that.
+
+    uvicorn fakes.openai_server:app --port 9100
+    OPENAI_API_KEY=sk-fake OPENAI_BASE_URL=http://localhost:9100/v1 uvicorn app.main:app
+
+FAKE_LLM_ERROR_RATE (0..1) makes that share of calls fail with a 500 to
+exercise the client's retries.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "800"))
+JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "200"))
+ERROR_RATE = float(os.getenv("FAKE_LLM_ERROR_RATE", "0"))
+TTFT_MS = float(os.getenv("FAKE_LLM_TTFT_MS", "150"))
+TOKEN_MS = float(os.getenv("FAKE_LLM_TOKEN_MS", "30"))
+
+OBJECT_ID = re.compile(r"\b[0-9a-f]{24}\b")
+
+app = FastAPI(title="Fake OpenAI")
+
+def reply_for(messages) -> str:
+    prompt = "\n".join(str(message.get("content", "")) for message in messages)
+    ids = list(dict.fromkeys(OBJECT_ID.findall(prompt)))
+    if ids:
+        return ",".join(ids[:5])
+    return (
+        "Happy to help! Based on what you described, I'd start with our "
+        "best-rated options in that category and narrow down by budget."
+    )
+
+async def stream_reply(completion_id: str, model: str, content: str):
+    await asyncio.sleep(TTFT_MS / 1000)
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        if i:
+            await asyncio.sleep(TOKEN_MS / 1000)
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "delta": {"content": word if i == 0 else " " + word},
+                "finish_reason": None,
+            }],
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+    done = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+    }
+    yield f"data: {json.dumps(done)}\n\n"
+    yield "data: [DONE]\n\n"
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if body.get("stream"):
+        content = reply_for(body.get("messages", []))
+        return StreamingResponse(
+            stream_reply(f"chatcmpl-{uuid.uuid4().hex}", body.get("model", "fake"), content),
+            media_type="text/event-stream"
+        )
+
+    await asyncio.sleep((LATENCY_MS + random.random() * JITTER_MS) / 1000)
+
+    if random.random() < ERROR_RATE:
+        return JSONResponse(
+            status_code=500,
+            content={"error": {"message": "Injected failure", "type": "server_error"}}
+        )
+
+    content = reply_for(body.get("messages", []))
+    prompt_tokens = sum(len(str(m.get("content", ""))) for m in body.get("messages", [])) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "fake"),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
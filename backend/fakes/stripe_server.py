@@ -0,0 +1,93 @@
+"""
+Fake Stripe PaymentIntents server
+
+Implements the calls checkout makes: POST /v1/payment_intents
+(form-encoded, as the stripe library sends it), GET /v1/payment_intents/{id}
+and POST /v1/payment_intents/{id} for metadata updates. Intents are kept in memory and report
+"succeeded" on retrieval, as if the client had completed payment, unless
+FAKE_STRIPE_AUTO_SUCCEED=0. Responses arrive after FAKE_STRIPE_LATENCY_MS
+(plus up to FAKE_STRIPE_JITTER_MS).
+
+    uvicorn fakes.stripe_server:app --port 9200
+    STRIPE_SECRET_KEY=sk_test_fake STRIPE_API_BASE=http://localhost:9200 uvicorn app.main:app
+
+FAKE_STRIPE_ERROR_RATE (0..1) makes that share of calls fail with a 402
+card error.
+"""
+import asyncio
+import os
+import random
+import time
+import uuid
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.getenv("FAKE_STRIPE_LATENCY_MS", "300"))
+JITTER_MS = float(os.getenv("FAKE_STRIPE_JITTER_MS", "100"))
+ERROR_RATE = float(os.getenv("FAKE_STRIPE_ERROR_RATE", "0"))
+AUTO_SUCCEED = os.getenv("FAKE_STRIPE_AUTO_SUCCEED", "1") != "0"
+
+app = FastAPI(title="Fake Stripe")
+payment_intents = {}
+
+def stripe_error(status_code: int, message: str, error_type: str = "invalid_request_error", code: str = None):
+    error = {"message": message, "type": error_type}
+    if code:
+        error["code"] = code
+    return JSONResponse(status_code=status_code, content={"error": error})
+
+async def simulate_latency():
+    await asyncio.sleep((LATENCY_MS + random.random() * JITTER_MS) / 1000)
+
+def form_metadata(form) -> dict:
+    # metadata[order_number]=... style keys
+    return {
+        key[len("metadata["):-1]: value
+        for key, value in form.items() if key.startswith("metadata[") and key.endswith("]")
+    }
+
+@app.post("/v1/payment_intents")
+async def create_payment_intent(request: Request):
+    await simulate_latency()
+    if random.random() < ERROR_RATE:
+        return stripe_error(402, "Your card was declined.", "card_error", "card_declined")
+
+    form = await request.form()
+    try:
+        amount = int(form["amount"])
+    except (KeyError, ValueError):
+        return stripe_error(400, "Missing required param: amount.")
+    metadata = form_metadata(form)
+    intent_id = f"pi_{uuid.uuid4().hex[:24]}"
+    intent = {
+        "id": intent_id,
+        "object": "payment_intent",
+        "amount": amount,
+        "currency": form.get("currency", "usd"),
+        "client_secret": f"{intent_id}_secret_{uuid.uuid4().hex[:16]}",
+        "created": int(time.time()),
+        "livemode": False,
+        "metadata": metadata,
+        "status": "requires_payment_method",
+    }
+    payment_intents[intent_id] = intent
+    return intent
+
+@app.get("/v1/payment_intents/{intent_id}")
+async def retrieve_payment_intent(intent_id: str):
+    await simulate_latency()
+    intent = payment_intents.get(intent_id)
+    if intent is None:
+        return stripe_error(404, f"No such payment_intent: '{intent_id}'", code="resource_missing")
+    if AUTO_SUCCEED:
+        intent["status"] = "succeeded"
+    return intent
+
+@app.post("/v1/payment_intents/{intent_id}")
+async def update_payment_intent(intent_id: str, request: Request):
+    await simulate_latency()
+    intent = payment_intents.get(intent_id)
+    if intent is None:
+        return stripe_error(404, f"No such payment_intent: '{intent_id}'", code="resource_missing")
+    intent["metadata"].update(form_metadata(await request.form()))
+    return intent
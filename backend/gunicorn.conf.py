@@ -0,0 +1,49 @@
+"""
+Production server settings
+
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Environment overrides: WEB_CONCURRENCY (workers, default one per
+available CPU), PORT or BIND, MAX_REQUESTS and MAX_REQUESTS_JITTER
+(worker recycling, 0 disables), GRACEFUL_TIMEOUT (SIGTERM drain, seconds),
+WORKER_TIMEOUT and KEEPALIVE. See app/server.py.
+"""
+import os
+from app.server import WorkerSlots, on_worker_start
+from app.services import integrations
+
+def _available_cpus() -> int:
+    # Honours container CPU sets where the platform exposes them
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+bind = os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+workers = int(os.getenv("WEB_CONCURRENCY", _available_cpus()))
+worker_class = "app.server.ProductionWorker"
+# Import once in the master: faster worker boots and shared read-only pages
+preload_app = True
+# Recycled workers drop their keep-alive connections and rebuild their
+# in-memory indexes, so not too often: minutes apart at production rates
+max_requests = int(os.getenv("MAX_REQUESTS", "50000"))
+max_requests_jitter = int(os.getenv("MAX_REQUESTS_JITTER", "5000"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+_slots = WorkerSlots()
+
+def when_ready(server):
+    # After the app is preloaded, before the first fork: imported once, shared by every worker
+    loaded = integrations.preload()
+    server.log.info(f"Preloaded integrations: {', '.join(loaded)}")
+
+def pre_fork(server, worker):
+    _slots.acquire(worker)
+
+def post_fork(server, worker):
+    on_worker_start(worker)
+    server.log.info(f"Worker {worker.slot} (pid {worker.pid}) started")
+
+def child_exit(server, worker):
+    _slots.release(worker)
@@ -6,21 +6,15 @@ import asyncio
 from motor.motor_asyncio import AsyncIOMotorClient
 from app.config.settings import settings
 
-async def init_database():
-    """Initialize database with indexes and sample data"""
-    client = AsyncIOMotorClient(settings.MONGODB_URL)
-    db = client[settings.DATABASE_NAME]
-    
-    # Create indexes
-    print("Creating database indexes...")
-    
+async def create_indexes(db):
+    """Create every collection's indexes; safe to re-run"""
     # Users collection indexes
     await db.users.create_index("email", unique=True)
     await db.users.create_index("role")
     
     # Products collection indexes
     await db.products.create_index("vendor_id")
-    await db.products.create_index("category")
+    await db.products.create_index([("category", 1), ("price", 1)])
     await db.products.create_index("status")
     await db.products.create_index([("name", "text"), ("description", "text")])
     
@@ -32,13 +26,37 @@ async def init_database():
     await db.carts.create_index("user_id", unique=True)
     
     # Orders collection indexes
-    await db.orders.create_index("user_id")
+    await db.orders.create_index([("user_id", 1), ("_id", -1)])
     await db.orders.create_index("order_number", unique=True)
     await db.orders.create_index("status")
+    await db.orders.create_index("payment_intent_id", sparse=True)
+    # Vendor order listing: equality on the denormalized item vendor id,
+    # then sort on created_at (multikey over the items array)
+    await db.orders.create_index([("items.vendor_id", 1), ("created_at", -1)])
+    await db.orders.create_index([("items.vendor_id", 1), ("status", 1), ("created_at", -1)])
+    
+    # Stripe events are keyed by event id; the leader re-queues stranded unprocessed ones
+    await db.stripe_events.create_index(
+        "processed", partialFilterExpression={"processed": False}
+    )
     
     # Chat sessions collection indexes
-    await db.chat_sessions.create_index("user_id")
+    await db.chat_sessions.create_index([("user_id", 1), ("updated_at", -1)])
     
+    # Product change records, kept long enough for any worker to catch up
+    await db.catalog_changes.create_index("created_at", expireAfterSeconds=86400)
+    
+    # Published bought-together builds are loaded in _id order
+    await db.cooccurrence.create_index([("build", 1), ("_id", 1)])
+
+async def init_database():
+    """Initialize database with indexes and sample data"""
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.DATABASE_NAME]
+    
+    # Create indexes
+    print("Creating database indexes...")
+    await create_indexes(db)
     print("Database indexes created successfully!")
     
     # Create sample categories
@@ -0,0 +1,4 @@
+# End-to-end load tests: browse -> cart -> checkout -> concierge against a
+# running app, local MongoDB and the fake Stripe and OpenAI servers.
+# Run from the backend directory, e.g.
+#   python -m loadtest.run --spawn --users 20 --duration 60
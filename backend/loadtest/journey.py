@@ -0,0 +1,113 @@
+"""
+The shopper journey each virtual user repeats
+
+Register and log in once, then loop: browse a category, search, open a
+product and its "bought together" list, add two products to the cart,
+change a quantity, view the cart, check out, confirm payment, and ask
+the concierge (search assistant and chat). Every request is recorded
+under its step name together with the endpoint function it hits, which
+is how DB operations from /metrics are matched to steps.
+"""
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import List
+import httpx
+from loadtest.stats import Results
+
+SEARCH_WORDS = "wireless lamp yoga novel serum jacket speaker organic".split()
+ASSISTANT_QUERIES = [
+    "red sneakers under $80",
+    "wireless headphones between 50 and 150",
+    "a cookbook for beginners",
+    "gift ideas for a runner",
+]
+CHAT_MESSAGES = [
+    "I need a lightweight jacket for hiking",
+    "What goes well with a yoga mat?",
+    "Recommend a speaker for a small room",
+]
+SHIPPING_ADDRESS = {
+    "street": "1 Load Street", "city": "Testville", "state": "CA",
+    "postal_code": "94000", "country": "US",
+}
+
+@dataclass
+class Catalog:
+    product_ids: List[str]
+    categories: List[str] = field(default_factory=list)
+
+class RequestFailed(Exception):
+    pass
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, catalog: Catalog, results: Results,
+                 rng: random.Random, chat: bool = True):
+        self.client = client
+        self.catalog = catalog
+        self.results = results
+        self.rng = rng
+        self.chat = chat
+        self.headers = {}
+        self.recording = False
+
+    async def call(self, step: str, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, headers=self.headers, **kwargs)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            response, ok = None, False
+        if self.recording:
+            self.results.record(step, endpoint, time.perf_counter() - start, ok)
+        if not ok:
+            raise RequestFailed(f"{step}: {response.status_code if response is not None else 'connection error'}")
+        return response
+
+    async def sign_up(self):
+        email = f"loadtest-{uuid.uuid4().hex[:12]}@example.com"
+        password = "loadtest-password"
+        await self.call("register", "register", "POST", "/api/auth/register", json={
+            "email": email, "password": password, "first_name": "Load", "last_name": "Tester",
+        })
+        response = await self.call("login", "login", "POST", "/api/auth/login", json={
+            "email": email, "password": password,
+        })
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def shop(self):
+        rng = self.rng
+        if self.catalog.categories:
+            await self.call("browse", "list_products", "GET", "/api/products/",
+                            params={"category": rng.choice(self.catalog.categories), "limit": 20})
+        await self.call("search", "list_products", "GET", "/api/products/",
+                        params={"search": rng.choice(SEARCH_WORDS), "limit": 20})
+
+        first, second = rng.sample(self.catalog.product_ids, 2)
+        await self.call("product", "get_product", "GET", f"/api/products/{first}")
+        await self.call("bought_together", "get_bought_together", "GET",
+                        f"/api/products/{first}/bought-together")
+
+        await self.call("add_to_cart", "add_to_cart", "POST", "/api/cart/items",
+                        params={"product_id": first, "quantity": 1})
+        await self.call("add_to_cart", "add_to_cart", "POST", "/api/cart/items",
+                        params={"product_id": second, "quantity": 1})
+        await self.call("update_cart", "update_cart_item", "PUT", f"/api/cart/items/{second}",
+                        params={"quantity": 2})
+        await self.call("cart_details", "get_cart_details", "GET", "/api/cart/details")
+
+        order = (await self.call("checkout", "create_order", "POST", "/api/orders/create",
+                                 json=SHIPPING_ADDRESS)).json()
+        client_secret = order.get("client_secret")
+        if client_secret:
+            payment_intent_id = client_secret.split("_secret_")[0]
+            await self.call("confirm_payment", "confirm_order_payment", "POST",
+                            f"/api/orders/{order['order_id']}/confirm",
+                            params={"payment_intent_id": payment_intent_id})
+
+        await self.call("search_assistant", "ai_search_assistant", "POST", "/api/ai/search-assistant",
+                        params={"natural_query": rng.choice(ASSISTANT_QUERIES)})
+        if self.chat:
+            await self.call("chat", "chat_with_ai", "POST", "/api/ai/chat",
+                            params={"message": rng.choice(CHAT_MESSAGES)})
@@ -0,0 +1,189 @@
+"""
+Browse -> cart -> checkout load test
+
+Runs --users virtual shoppers (closed loop: each starts its next journey
+when the last one ends, after --think-ms) against --base-url for
+--warmup plus --duration seconds; only the --duration window is
+measured. Prints throughput, p50/p95/p99 per step and DB operations per
+request, then compares with the baseline file and exits 1 on a
+regression.
+
+With --spawn it starts everything itself against a local MongoDB
+(MONGODB_URL): the fake Stripe and OpenAI servers, a freshly seeded
+DATABASE_NAME=--database (dropped first) and one uvicorn process of the
+app pointed at all three. Without it, the app at --base-url must already
+be running with its catalog seeded (--seed seeds it through MONGODB_URL).
+
+    python -m loadtest.run --spawn --users 20 --duration 60
+    python -m loadtest.run --spawn --users 20 --duration 60 --save-baseline
+
+DB operations come from the app's /metrics, which is per process: point
+the run at a single worker, as --spawn does.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from pathlib import Path
+import httpx
+from motor.motor_asyncio import AsyncIOMotorClient
+from loadtest.journey import Catalog, RequestFailed, VirtualUser
+from loadtest.seed import seed_catalog
+from loadtest.stats import Results, compare, db_ops_per_request, format_summary, load_baseline, save_baseline
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+def start_process(module: str, port: int, env: dict) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env={**os.environ, **env}
+    )
+
+async def wait_until_up(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not come up within {timeout}s")
+            await asyncio.sleep(0.2)
+
+async def seed(args):
+    mongodb_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+    client = AsyncIOMotorClient(mongodb_url)
+    try:
+        if args.spawn:
+            await client.drop_database(args.database)
+        count = await seed_catalog(client[args.database], args.products)
+        print(f"Seeded {count} products into {args.database}")
+    finally:
+        client.close()
+
+async def load_catalog(client: httpx.AsyncClient) -> Catalog:
+    categories = (await client.get("/api/products/categories/list")).json()
+    product_ids = []
+    for category in categories:
+        response = await client.get("/api/products/", params={"category": category, "limit": 100})
+        product_ids.extend(product["_id"] for product in response.json())
+    if len(product_ids) < 2:
+        raise RuntimeError("The catalog is empty, run with --seed or --spawn")
+    return Catalog(product_ids=product_ids, categories=categories)
+
+async def run_users(args, results: Results):
+    """Measured seconds and DB operations per request by endpoint"""
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        catalog = await load_catalog(client)
+        users = [
+            VirtualUser(client, catalog, results, random.Random(i), chat=not args.no_chat)
+            for i in range(args.users)
+        ]
+        # Sign-ups are measured once, outside the journey loop
+        for user in users:
+            user.recording = True
+        await asyncio.gather(*(user.sign_up() for user in users))
+
+        start = time.monotonic()
+        measure_from = start + args.warmup
+        stop_at = measure_from + args.duration
+        before = None
+
+        async def loop(user: VirtualUser):
+            while time.monotonic() < stop_at:
+                user.recording = time.monotonic() >= measure_from
+                try:
+                    await user.shop()
+                except RequestFailed:
+                    pass
+                if args.think_ms:
+                    await asyncio.sleep(args.think_ms / 1000)
+
+        async def snapshot_after_warmup():
+            nonlocal before
+            await asyncio.sleep(max(0.0, measure_from - time.monotonic()))
+            before = (await client.get("/metrics")).text
+
+        await asyncio.gather(snapshot_after_warmup(), *(loop(user) for user in users))
+        elapsed = time.monotonic() - measure_from
+        after = (await client.get("/metrics")).text
+        return elapsed, db_ops_per_request(before, after)
+
+async def main(args) -> int:
+    processes = []
+    try:
+        if args.spawn:
+            await seed(args)
+            stripe_port, openai_port, app_port = args.port + 1, args.port + 2, args.port
+            processes.append(start_process("fakes.stripe_server:app", stripe_port, {
+                "FAKE_STRIPE_LATENCY_MS": str(args.stripe_latency_ms), "FAKE_STRIPE_JITTER_MS": "0",
+            }))
+            processes.append(start_process("fakes.openai_server:app", openai_port, {
+                "FAKE_LLM_LATENCY_MS": str(args.llm_latency_ms), "FAKE_LLM_JITTER_MS": "0",
+            }))
+            processes.append(start_process("app.main:app", app_port, {
+                "DATABASE_NAME": args.database,
+                "STRIPE_SECRET_KEY": "sk_test_fake",
+                "STRIPE_API_BASE": f"http://127.0.0.1:{stripe_port}",
+                "OPENAI_API_KEY": "sk-fake",
+                "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+            }))
+            args.base_url = f"http://127.0.0.1:{app_port}"
+            await wait_until_up(f"{args.base_url}/metrics")
+        elif args.seed:
+            await seed(args)
+
+        results = Results()
+        elapsed, db_ops = await run_users(args, results)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+    summary = results.summary(elapsed, db_ops, args.users)
+    print(format_summary(summary))
+
+    if args.save_baseline:
+        save_baseline(args.baseline, summary)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    problems = compare(summary, baseline, args.tolerance)
+    if summary["requests"] and summary["errors"] / summary["requests"] > args.max_error_rate:
+        problems.append(f"error rate {summary['errors'] / summary['requests']:.1%} > {args.max_error_rate:.1%}")
+    for problem in problems:
+        print(f"REGRESSION: {problem}")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="start the fakes and the app, seeded")
+    parser.add_argument("--seed", action="store_true", help="seed the catalog of an already running app")
+    parser.add_argument("--database", default="aislemarts_loadtest")
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--port", type=int, default=8100, help="app port with --spawn; fakes use the next two")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--warmup", type=float, default=10.0)
+    parser.add_argument("--think-ms", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--no-chat", action="store_true", help="skip the concierge chat step")
+    parser.add_argument("--stripe-latency-ms", type=float, default=150.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    sys.exit(asyncio.run(main(parser.parse_args())))
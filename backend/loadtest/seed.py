@@ -0,0 +1,78 @@
+"""
+Load-test catalog
+
+Writes an approved vendor and `count` active products spread over the
+sample categories straight into the database (the product API needs an
+admin to approve the vendor first), with the production indexes. Stock
+is effectively unlimited so checkouts never run out mid-run. Names and
+descriptions are drawn from a small vocabulary so searches and the
+concierge's retrieval have something to match.
+"""
+import random
+from datetime import datetime
+from bson import ObjectId
+from app.services.catalog import bump_catalog_version
+from init_db import create_indexes
+
+CATEGORIES = {
+    "Electronics": "phone laptop headphones speaker camera monitor charger keyboard",
+    "Clothing": "shirt dress jacket jeans sneakers boots hoodie sweater",
+    "Books": "novel cookbook paperback hardcover textbook",
+    "Home & Garden": "lamp sofa chair rug pillow mug planter",
+    "Sports & Outdoors": "yoga mat dumbbell tent bike helmet racket",
+    "Beauty & Health": "serum shampoo perfume lipstick moisturizer",
+}
+ADJECTIVES = "red blue black white green wireless compact premium classic organic lightweight".split()
+
+async def seed_catalog(db, count: int = 2000, seed: int = 42) -> int:
+    rng = random.Random(seed)
+    await create_indexes(db)
+    now = datetime.utcnow()
+
+    vendor_user_id = ObjectId()
+    await db.users.insert_one({
+        "_id": vendor_user_id,
+        "email": f"loadtest-vendor-{vendor_user_id}@example.com",
+        "first_name": "Load",
+        "last_name": "Vendor",
+        "role": "vendor",
+        "is_active": True,
+        "created_at": now,
+    })
+    vendor_id = ObjectId()
+    await db.vendors.insert_one({
+        "_id": vendor_id,
+        "user_id": vendor_user_id,
+        "business_name": "Load Test Goods",
+        "business_description": "Synthetic catalog for load tests",
+        "business_address": "1 Test Street",
+        "business_phone": "555-0100",
+        "business_email": "loadtest@example.com",
+        "status": "approved",
+        "created_at": now,
+        "updated_at": now,
+    })
+
+    products = []
+    categories = list(CATEGORIES)
+    for i in range(count):
+        category = categories[i % len(categories)]
+        noun = rng.choice(CATEGORIES[category].split())
+        words = rng.sample(ADJECTIVES, 2)
+        products.append({
+            "_id": ObjectId(),
+            "vendor_id": vendor_id,
+            "name": f"{words[0].title()} {noun} {i}",
+            "description": f"A {words[0]} {words[1]} {noun} from the load-test catalog. " * 3,
+            "price": round(rng.uniform(5, 500), 2),
+            "category": category,
+            "images": [],
+            "stock_quantity": 10 ** 7,
+            "status": "active",
+            "created_at": now,
+            "updated_at": now,
+        })
+    for start in range(0, len(products), 1000):
+        await db.products.insert_many(products[start:start + 1000], ordered=False)
+    await bump_catalog_version(db)
+    return len(products)
@@ -0,0 +1,141 @@
+"""
+Load-test results and baselines
+
+Latencies are kept per journey step and reduced to p50/p95/p99 (nearest
+rank). DB operations per request come from the app's own
+`http_request_db_commands` histogram, scraped from /metrics before and
+after the measured window, so warm-up traffic is excluded.
+
+A baseline is the JSON summary of a reference run. `compare` fails a run
+when a step's p50 or p95 is more than `tolerance` slower than the
+baseline (plus `slack_ms`, so sub-millisecond steps do not flap), when a
+step issues more DB commands per request than before, or when overall
+throughput drops by more than `tolerance`. p99 is reported but not
+gated: at load-test sample sizes it is too noisy to fail a build on.
+"""
+import json
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Measured once per user before the window opens, so not part of throughput
+SETUP_STEPS = frozenset({"register", "login"})
+_SAMPLE = re.compile(r'^(\w+)\{endpoint="([^"]*)"\} ([0-9.eE+-]+)$')
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+def db_commands_by_endpoint(metrics_text: str) -> Dict[str, Dict[str, float]]:
+    """{endpoint: {"sum": ..., "count": ...}} from http_request_db_commands"""
+    totals = defaultdict(lambda: {"sum": 0.0, "count": 0.0})
+    for line in metrics_text.splitlines():
+        match = _SAMPLE.match(line)
+        if not match:
+            continue
+        name, endpoint, value = match.groups()
+        if name == "http_request_db_commands_sum":
+            totals[endpoint]["sum"] = float(value)
+        elif name == "http_request_db_commands_count":
+            totals[endpoint]["count"] = float(value)
+    return dict(totals)
+
+def db_ops_per_request(before: str, after: str) -> Dict[str, float]:
+    start, end = db_commands_by_endpoint(before), db_commands_by_endpoint(after)
+    result = {}
+    for endpoint, totals in end.items():
+        previous = start.get(endpoint, {"sum": 0.0, "count": 0.0})
+        count = totals["count"] - previous["count"]
+        if count > 0:
+            result[endpoint] = (totals["sum"] - previous["sum"]) / count
+    return result
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.endpoints: Dict[str, str] = {}
+
+    def record(self, step: str, endpoint: str, seconds: float, ok: bool):
+        self.endpoints[step] = endpoint
+        if ok:
+            self.latencies[step].append(seconds)
+        else:
+            self.errors[step] += 1
+
+    def summary(self, elapsed: float, db_ops: Dict[str, float], users: int) -> dict:
+        steps = {}
+        total = 0
+        for step, endpoint in self.endpoints.items():
+            values = sorted(self.latencies[step])
+            if step not in SETUP_STEPS:
+                total += len(values) + self.errors[step]
+            steps[step] = {
+                "endpoint": endpoint,
+                "requests": len(values),
+                "errors": self.errors[step],
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "db_ops": round(db_ops[endpoint], 2) if endpoint in db_ops else None,
+            }
+        return {
+            "users": users,
+            "duration_s": round(elapsed, 1),
+            "requests": total,
+            "errors": sum(count for step, count in self.errors.items() if step not in SETUP_STEPS),
+            "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "steps": steps,
+        }
+
+def format_summary(summary: dict) -> str:
+    lines = [
+        f"{summary['requests']} requests in {summary['duration_s']}s from {summary['users']} users: "
+        f"{summary['throughput_rps']} req/s, {summary['errors']} errors",
+        f"{'step':<18}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'db ops':>8}",
+    ]
+    for step, row in summary["steps"].items():
+        db_ops = "-" if row["db_ops"] is None else f"{row['db_ops']:.1f}"
+        lines.append(
+            f"{step:<18}{row['requests']:>9}{row['errors']:>8}"
+            f"{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}{db_ops:>8}"
+        )
+    return "\n".join(lines)
+
+def compare(summary: dict, baseline: dict, tolerance: float = 0.2, slack_ms: float = 5.0) -> List[str]:
+    """Regressions against a baseline summary, empty if there are none"""
+    problems = []
+    floor = baseline["throughput_rps"] * (1 - tolerance)
+    if summary["throughput_rps"] < floor:
+        problems.append(
+            f"throughput {summary['throughput_rps']} req/s < {floor:.1f} "
+            f"(baseline {baseline['throughput_rps']})"
+        )
+    for step, base in baseline["steps"].items():
+        row = summary["steps"].get(step)
+        if row is None:
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            limit = base[key] * (1 + tolerance) + slack_ms
+            if row[key] > limit:
+                problems.append(f"{step} {key} {row[key]} > {limit:.1f} (baseline {base[key]})")
+        # Command counts are deterministic; half a command absorbs getMore noise
+        if base.get("db_ops") is not None and row["db_ops"] is not None \
+                and row["db_ops"] > base["db_ops"] + 0.5:
+            problems.append(f"{step} db ops {row['db_ops']} > baseline {base['db_ops']}")
+    return problems
+
+def load_baseline(path) -> Optional[dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_baseline(path, summary: dict):
+    with open(path, "w") as f:
+        json.dump(summary, f, indent=2)
+        f.write("\n")
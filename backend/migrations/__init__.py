@@ -0,0 +1,2 @@
+# One-off data migrations. Run from the backend directory, e.g.
+#   python -m migrations.backfill_order_vendor_ids
@@ -0,0 +1,86 @@
+"""
+Backfill message_count, last_message_preview and timestamps on chat sessions
+
+The session list reads these denormalized fields instead of the messages
+array. Sessions written before they existed are walked in _id order; the
+count and last message are computed server-side with $size/$arrayElemAt,
+so message bodies other than the last one never leave the database.
+
+A legacy session that took a turn after the deploy already has a
+`message_count`, but only of the messages added since (`$inc` from
+nothing). Sessions are therefore matched when the count is missing or
+below the size of the stored array, and get the larger of the two. That
+is exact unless the turn's `$slice` had already cut the array down to
+CHAT_HISTORY_MAX_MESSAGES, where it is the best lower bound left. Safe to
+re-run: fixed sessions no longer match.
+"""
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from app.config.settings import settings
+from app.services.chat_history import message_preview
+
+BATCH_SIZE = 500
+
+async def backfill_chat_session_summaries(db, batch_size: int = BATCH_SIZE) -> int:
+    """Fill in session list fields, returns sessions updated"""
+    updated = 0
+    last_id = None
+
+    while True:
+        stored = {"$size": {"$ifNull": ["$messages", []]}}
+        match = {"$or": [
+            {"message_count": {"$exists": False}},
+            {"last_message_preview": {"$exists": False}},
+            {"$expr": {"$lt": ["$message_count", stored]}},
+        ]}
+        if last_id is not None:
+            match["_id"] = {"$gt": last_id}
+
+        sessions = await db.chat_sessions.aggregate([
+            {"$match": match},
+            {"$sort": {"_id": 1}},
+            {"$limit": batch_size},
+            {"$project": {
+                "created_at": 1,
+                "updated_at": 1,
+                "last_message_preview": 1,
+                "message_count": {"$max": [stored, {"$ifNull": ["$message_count", 0]}]},
+                "last_message": {"$arrayElemAt": [{"$ifNull": ["$messages", []]}, -1]},
+            }},
+        ]).to_list(length=batch_size)
+        if not sessions:
+            break
+        last_id = sessions[-1]["_id"]
+
+        operations = []
+        for session in sessions:
+            created_at = session.get("created_at") or session["_id"].generation_time.replace(tzinfo=None)
+            last_message = session.get("last_message")
+            update = {
+                "message_count": session["message_count"],
+                "last_message_preview": session.get("last_message_preview") or (
+                    message_preview(last_message) if last_message else ""
+                ),
+                "created_at": created_at,
+                "updated_at": session.get("updated_at") or (last_message or {}).get("timestamp") or created_at,
+            }
+            operations.append(UpdateOne({"_id": session["_id"]}, {"$set": update}))
+
+        result = await db.chat_sessions.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+        print(f"Backfilled {updated} chat sessions...")
+
+    return updated
+
+async def main():
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.DATABASE_NAME]
+
+    updated = await backfill_chat_session_summaries(db)
+    print(f"Backfill complete: {updated} chat sessions updated")
+
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,83 @@
+"""
+Backfill vendor_id on order items and created_at on orders
+
+Orders created before vendor ids were denormalized into order lines are
+invisible to the vendor order listing. This walks those orders in batches,
+resolves each line's vendor from the products collection with one $in query
+per batch and writes the fixed items back with a single bulk_write.
+Safe to re-run: only orders that still have lines without vendor_id are read.
+"""
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from app.config.settings import settings
+
+BATCH_SIZE = 500
+
+async def backfill_order_vendor_ids(db, batch_size: int = BATCH_SIZE) -> int:
+    """Fill in missing vendor ids on order items, returns orders updated"""
+    query = {
+        "$or": [
+            {"items": {"$elemMatch": {"vendor_id": {"$exists": False}}}},
+            {"created_at": {"$exists": False}},
+        ]
+    }
+    updated = 0
+    last_id = None
+
+    while True:
+        batch_query = dict(query)
+        if last_id is not None:
+            batch_query["_id"] = {"$gt": last_id}
+
+        orders = await db.orders.find(
+            batch_query, {"items": 1, "created_at": 1}
+        ).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+        if not orders:
+            break
+        last_id = orders[-1]["_id"]
+
+        product_ids = {
+            item["product_id"]
+            for order in orders
+            for item in order.get("items", [])
+            if "vendor_id" not in item
+        }
+        vendor_by_product = {}
+        if product_ids:
+            async for product in db.products.find(
+                {"_id": {"$in": list(product_ids)}}, {"vendor_id": 1}
+            ):
+                vendor_by_product[product["_id"]] = product.get("vendor_id")
+
+        operations = []
+        for order in orders:
+            items = order.get("items", [])
+            for item in items:
+                if "vendor_id" not in item:
+                    # Deleted products keep an explicit null so the order
+                    # is not picked up again on the next run
+                    item["vendor_id"] = vendor_by_product.get(item["product_id"])
+
+            update = {"items": items}
+            if "created_at" not in order:
+                update["created_at"] = order["_id"].generation_time.replace(tzinfo=None)
+            operations.append(UpdateOne({"_id": order["_id"]}, {"$set": update}))
+
+        result = await db.orders.bulk_write(operations, ordered=False)
+        updated += result.modified_count
+        print(f"Backfilled {updated} orders...")
+
+    return updated
+
+async def main():
+    client = AsyncIOMotorClient(settings.MONGODB_URL)
+    db = client[settings.DATABASE_NAME]
+
+    updated = await backfill_order_vendor_ids(db)
+    print(f"Backfill complete: {updated} orders updated")
+
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,9 @@
+import pytest
+
+from app.config.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def strict_query_guard(monkeypatch):
+    # Route tests run through QueryGuardMiddleware; an N+1 fails them
+    monkeypatch.setattr(settings, "ENVIRONMENT", "test")
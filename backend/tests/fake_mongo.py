@@ -0,0 +1,395 @@
+"""
+In-memory stand-in for the Motor collections the services use
+
+Covers the subset of the query and update language the app relies on:
+equality on dotted paths (matching inside arrays), $in/$nin/$ne/$exists,
+$elemMatch, comparisons, $and/$or, $set/$inc/$unset/$setOnInsert/$push
+(with $each/$slice) updates with upserts, and $slice projections. Every
+operation yields to the event loop first and then runs atomically, like
+a single-document write on the server, so concurrent requests
+interleave the way they would against MongoDB.
+
+Aggregation pipelines are not evaluated: `aggregate` returns the rows a
+test put in the collection's `aggregate_results`.
+
+Each operation is recorded in the request's QueryLog as the command
+pymongo would send, so the query guard checks route tests too.
+"""
+import asyncio
+import copy
+from types import SimpleNamespace
+from bson import ObjectId
+from pymongo import DeleteMany, DeleteOne, InsertOne, ReplaceOne, ReturnDocument, UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.services.query_guard import current_query_log
+
+_MISSING = object()
+
+def _values(doc, path):
+    """Every value at a dotted path, descending into arrays"""
+    values = [doc]
+    for part in path.split("."):
+        found = []
+        for value in values:
+            if isinstance(value, dict) and part in value:
+                found.append(value[part])
+            elif isinstance(value, list):
+                for element in value:
+                    if isinstance(element, dict) and part in element:
+                        found.append(element[part])
+        values = found
+    flat = []
+    for value in values:
+        flat.append(value)
+        if isinstance(value, list):
+            flat.extend(value)
+    return flat
+
+def _compare(values, op, operand):
+    if op == "$eq":
+        return operand in values or (operand is None and not values)
+    if op == "$ne":
+        return not _compare(values, "$eq", operand)
+    if op == "$in":
+        return any(_compare(values, "$eq", option) for option in operand)
+    if op == "$nin":
+        return not _compare(values, "$in", operand)
+    if op == "$exists":
+        return bool(values) == bool(operand)
+    if op == "$elemMatch":
+        return any(
+            isinstance(element, dict) and matches(element, operand)
+            for value in values if isinstance(value, list) for element in value
+        )
+    checks = {
+        "$lt": lambda a: a < operand, "$lte": lambda a: a <= operand,
+        "$gt": lambda a: a > operand, "$gte": lambda a: a >= operand,
+    }
+    if op in checks:
+        return any(value is not None and not isinstance(value, list) and checks[op](value) for value in values)
+    raise NotImplementedError(op)
+
+def matches(doc, query) -> bool:
+    for key, condition in query.items():
+        if key == "$and":
+            if not all(matches(doc, part) for part in condition):
+                return False
+        elif key == "$or":
+            if not any(matches(doc, part) for part in condition):
+                return False
+        else:
+            values = _values(doc, key)
+            if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+                if not all(_compare(values, op, operand) for op, operand in condition.items()):
+                    return False
+            elif not _compare(values, "$eq", condition):
+                return False
+    return True
+
+def _set_path(doc, path, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+def _get_path(doc, path, default=_MISSING):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return default
+        doc = doc[part]
+    return doc
+
+def _unset_path(doc, path):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.get(part, {})
+    doc.pop(last, None)
+
+def _push(doc, path, value):
+    each = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+    array = _get_path(doc, path, []) + copy.deepcopy(list(each))
+    if isinstance(value, dict) and "$slice" in value:
+        limit = value["$slice"]
+        array = array[limit:] if limit < 0 else array[:limit]
+    _set_path(doc, path, array)
+
+def apply_update(doc, update, inserting=False):
+    for op, fields in update.items():
+        for path, value in fields.items():
+            if op == "$set" or (op == "$setOnInsert" and inserting):
+                _set_path(doc, path, copy.deepcopy(value))
+            elif op == "$inc":
+                _set_path(doc, path, _get_path(doc, path, 0) + value)
+            elif op == "$unset":
+                _unset_path(doc, path)
+            elif op == "$push":
+                _push(doc, path, value)
+            elif op != "$setOnInsert":
+                raise NotImplementedError(op)
+
+def _upsert_seed(query) -> dict:
+    doc = {}
+    for key, condition in query.items():
+        if not key.startswith("$") and not (isinstance(condition, dict) and any(k.startswith("$") for k in condition)):
+            _set_path(doc, key, copy.deepcopy(condition))
+    return doc
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+    include = {path.split(".")[0] for path, flag in projection.items() if flag}
+    result = {key: copy.deepcopy(value) for key, value in doc.items() if key in include or key == "_id"}
+    for path, flag in projection.items():
+        if isinstance(flag, dict) and "$slice" in flag and isinstance(result.get(path), list):
+            limit = flag["$slice"]
+            result[path] = result[path][limit:] if limit < 0 else result[path][:limit]
+    if projection.get("_id") == 0:
+        result.pop("_id", None)
+    return result
+
+class FakeCursor:
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key, direction=1):
+        keys = [(key, direction)] if isinstance(key, str) else key
+        for field, order in reversed(keys):
+            self._docs.sort(key=lambda doc: _get_path(doc, field, None), reverse=order == -1)
+        return self
+
+    def skip(self, count):
+        self._docs = self._docs[count:]
+        return self
+
+    def limit(self, count):
+        if count:
+            self._docs = self._docs[:count]
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length=None):
+        return self._docs if length is None else self._docs[:length]
+
+    def __aiter__(self):
+        self._iter = iter(self._docs)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+class FakeCollection:
+    def __init__(self, unique=(), name=""):
+        self.name = name
+        self.docs = {}
+        self.unique = tuple(unique)
+        self.aggregate_results = []
+
+    def _record(self, command_name, **fields):
+        log = current_query_log()
+        if log is not None:
+            log.record(command_name, {command_name: self.name, **fields})
+
+    def _check_unique(self, doc, ignore_id=None):
+        for field in self.unique:
+            value = _get_path(doc, field)
+            if value is _MISSING:
+                continue
+            for other in self.docs.values():
+                if other["_id"] != ignore_id and _get_path(other, field) == value:
+                    raise DuplicateKeyError(f"duplicate {field}: {value!r}", 11000, {"keyPattern": {field: 1}})
+
+    def _insert(self, doc):
+        doc.setdefault("_id", ObjectId())
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError(f"duplicate _id: {doc['_id']!r}", 11000, {"keyPattern": {"_id": 1}})
+        self._check_unique(doc)
+        self.docs[doc["_id"]] = copy.deepcopy(doc)
+        return doc["_id"]
+
+    def _matching(self, query):
+        return [doc for doc in self.docs.values() if matches(doc, query)]
+
+    def _update(self, query, update, upsert=False, many=False, replace=False):
+        """Returns (matched, modified, before, after) for the first document"""
+        targets = self._matching(query)
+        if not many:
+            targets = targets[:1]
+        if not targets:
+            if not upsert:
+                return 0, 0, None, None
+            doc = _upsert_seed(query)
+            if replace:
+                doc.update(copy.deepcopy(update))
+            else:
+                apply_update(doc, update, inserting=True)
+            self._insert(doc)
+            return 0, 0, None, copy.deepcopy(self.docs[doc["_id"]])
+        modified, before, after = 0, None, None
+        for doc in targets:
+            old = copy.deepcopy(doc)
+            if replace:
+                new = {"_id": doc["_id"], **copy.deepcopy(update)}
+            else:
+                new = copy.deepcopy(doc)
+                apply_update(new, update)
+            self._check_unique(new, ignore_id=doc["_id"])
+            self.docs[doc["_id"]] = new
+            modified += new != old
+            if before is None:
+                before, after = old, copy.deepcopy(new)
+        return len(targets), modified, before, after
+
+    async def insert_one(self, doc):
+        await asyncio.sleep(0)
+        self._record("insert")
+        return SimpleNamespace(inserted_id=self._insert(doc))
+
+    async def insert_many(self, docs, ordered=True):
+        await asyncio.sleep(0)
+        self._record("insert")
+        return SimpleNamespace(inserted_ids=[self._insert(doc) for doc in docs])
+
+    async def find_one(self, query=None, projection=None, **kwargs):
+        await asyncio.sleep(0)
+        self._record("find", filter=query or {})
+        found = self._matching(query or {})
+        return _project(found[0], projection) if found else None
+
+    def find(self, query=None, projection=None, **kwargs):
+        self._record("find", filter=query or {})
+        return FakeCursor([_project(doc, projection) for doc in self._matching(query or {})])
+
+    def aggregate(self, pipeline, **kwargs):
+        self._record("aggregate", pipeline=pipeline)
+        return FakeCursor(copy.deepcopy(self.aggregate_results))
+
+    async def count_documents(self, query):
+        await asyncio.sleep(0)
+        self._record("aggregate", pipeline=[{"$match": query}])
+        return len(self._matching(query))
+
+    async def distinct(self, field, query=None):
+        await asyncio.sleep(0)
+        self._record("distinct", query=query or {})
+        values = []
+        for doc in self._matching(query or {}):
+            for value in _values(doc, field):
+                if not isinstance(value, list) and value not in values:
+                    values.append(value)
+        return values
+
+    async def update_one(self, query, update, upsert=False):
+        await asyncio.sleep(0)
+        self._record("update", updates=[{"q": query}])
+        matched, modified, _, _ = self._update(query, update, upsert)
+        return SimpleNamespace(matched_count=matched, modified_count=modified)
+
+    async def update_many(self, query, update, upsert=False):
+        await asyncio.sleep(0)
+        self._record("update", updates=[{"q": query}])
+        matched, modified, _, _ = self._update(query, update, upsert, many=True)
+        return SimpleNamespace(matched_count=matched, modified_count=modified)
+
+    async def replace_one(self, query, replacement, upsert=False):
+        await asyncio.sleep(0)
+        self._record("update", updates=[{"q": query}])
+        matched, modified, _, _ = self._update(query, replacement, upsert, replace=True)
+        return SimpleNamespace(matched_count=matched, modified_count=modified)
+
+    async def find_one_and_update(self, query, update, upsert=False, return_document=ReturnDocument.BEFORE,
+                                  projection=None, **kwargs):
+        await asyncio.sleep(0)
+        self._record("findAndModify", query=query)
+        _, _, before, after = self._update(query, update, upsert)
+        doc = after if return_document == ReturnDocument.AFTER else before
+        return _project(doc, projection) if doc is not None else None
+
+    async def delete_one(self, query):
+        await asyncio.sleep(0)
+        self._record("delete", deletes=[{"q": query}])
+        found = self._matching(query)[:1]
+        for doc in found:
+            del self.docs[doc["_id"]]
+        return SimpleNamespace(deleted_count=len(found))
+
+    async def delete_many(self, query):
+        await asyncio.sleep(0)
+        self._record("delete", deletes=[{"q": query}])
+        found = self._matching(query)
+        for doc in found:
+            del self.docs[doc["_id"]]
+        return SimpleNamespace(deleted_count=len(found))
+
+    async def bulk_write(self, operations, ordered=True):
+        await asyncio.sleep(0)
+        matched = modified = upserted = inserted = deleted = 0
+        # pymongo sends each run of same-kind operations as one command
+        previous = None
+        for operation in operations:
+            kind = (
+                "insert" if isinstance(operation, InsertOne)
+                else "delete" if isinstance(operation, (DeleteOne, DeleteMany)) else "update"
+            )
+            if kind != previous:
+                self._record(kind)
+                previous = kind
+            if isinstance(operation, InsertOne):
+                self._insert(operation._doc)
+                inserted += 1
+                continue
+            if isinstance(operation, (DeleteOne, DeleteMany)):
+                found = self._matching(operation._filter)
+                if isinstance(operation, DeleteOne):
+                    found = found[:1]
+                for doc in found:
+                    del self.docs[doc["_id"]]
+                deleted += len(found)
+                continue
+            many = isinstance(operation, UpdateMany)
+            replace = isinstance(operation, ReplaceOne)
+            if not isinstance(operation, (UpdateOne, UpdateMany, ReplaceOne)):
+                raise NotImplementedError(type(operation).__name__)
+            n, m, _, after = self._update(operation._filter, operation._doc, operation._upsert, many, replace)
+            matched += n
+            modified += m
+            upserted += n == 0 and after is not None
+        return SimpleNamespace(
+            matched_count=matched, modified_count=modified, upserted_count=upserted,
+            inserted_count=inserted, deleted_count=deleted
+        )
+
+class FakeSession:
+    """Sessions are accepted and ignored: every read sees every write"""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+class FakeClient:
+    async def start_session(self, **options):
+        return FakeSession()
+
+class FakeDatabase:
+    """Collections are created on first access, like MongoDB's"""
+
+    def __init__(self, unique=None):
+        self._unique = unique or {}
+        self._collections = {}
+        self.client = FakeClient()
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+    def __getitem__(self, name):
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self._unique.get(name, ()), name)
+        return self._collections[name]
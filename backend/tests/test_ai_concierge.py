@@ -0,0 +1,207 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+from httpx import AsyncClient
+
+from app.config.database import get_database
+from app.main import app
+from app.models import User
+from app.routes import ai_concierge
+from app.services.auth import get_current_active_user
+from app.services.llm import LLMError
+from app.services.similarity import SimilarityIndex
+from fake_mongo import FakeDatabase as FakeMongoDatabase
+
+DELAY = 0.05
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        await asyncio.sleep(DELAY)
+        return self.docs
+
+
+class FakeProducts:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, projection=None):
+        wanted = set(query["_id"]["$in"])
+        return FakeCursor([doc for doc in self.docs if doc["_id"] in wanted])
+
+
+class FakeSessions:
+    def __init__(self, session):
+        self.session = session
+
+    async def find_one(self, query, projection=None):
+        await asyncio.sleep(DELAY)
+        return self.session
+
+
+class FakeDatabase:
+    def __init__(self, products, session):
+        self.products = FakeProducts(products)
+        self.chat_sessions = FakeSessions(session)
+
+
+@pytest.mark.asyncio
+async def test_chat_context_is_grounded_and_loaded_concurrently(monkeypatch):
+    products = [
+        {"_id": ObjectId(), "name": "Trail running shoes", "description": "Running shoes",
+         "category": "Clothing", "price": 80.0, "stock_quantity": 3},
+        {"_id": ObjectId(), "name": "Espresso machine", "description": "Coffee maker",
+         "category": "Home & Garden", "price": 250.0, "stock_quantity": 0},
+    ]
+    index = SimilarityIndex(dimensions=1024)
+    for product in products:
+        index.upsert(product)
+    monkeypatch.setattr(ai_concierge, "similarity_index", index)
+
+    user_id = ObjectId()
+    session = {"_id": ObjectId(), "user_id": user_id, "messages": [], "summary": ""}
+    db = FakeDatabase(products, session)
+
+    start = time.perf_counter()
+    chat_session, found = await ai_concierge._load_chat_context(
+        db, user_id, str(session["_id"]), "running shoes"
+    )
+    elapsed = time.perf_counter() - start
+
+    assert chat_session is session
+    assert [p["name"] for p in found] == ["Trail running shoes"]
+    assert elapsed < 2 * DELAY
+
+    messages = ai_concierge._prompt_messages(
+        chat_session, [{"role": "user", "content": "running shoes"}], found
+    )
+    assert f"{products[0]['_id']} | Trail running shoes | $80.0 | 3" in messages[1]["content"]
+    assert messages[-1] == {"role": "user", "content": "running shoes"}
+
+
+@pytest.mark.asyncio
+async def test_recommendations_apply_the_price_range(monkeypatch):
+    db = FakeMongoDatabase()
+    index = SimilarityIndex(dimensions=1024)
+    for name, price in (("Budget running shoes", 40.0), ("Racing running shoes", 180.0)):
+        product = {"_id": ObjectId(), "name": name, "description": "Running shoes",
+                   "category": "Clothing", "price": price, "status": "active"}
+        db.products.docs[product["_id"]] = product
+        index.upsert(product)
+    monkeypatch.setattr(ai_concierge, "similarity_index", index)
+    monkeypatch.setattr(ai_concierge, "llm_client", SimpleNamespace(configured=False))
+
+    async def recommend(price_range):
+        cards = await ai_concierge.get_ai_recommendations(
+            query="running shoes", category=None, price_range=price_range, current_user=None, db=db
+        )
+        return [card["name"] for card in cards]
+
+    assert await recommend("under $100") == ["Budget running shoes"]
+    assert await recommend("150-200") == ["Racing running shoes"]
+    assert len(await recommend(None)) == 2
+
+
+class FakeStreamingClient:
+    configured = True
+
+    def __init__(self, deltas, error=None):
+        self.deltas = deltas
+        self.error = error
+
+    async def stream_chat(self, messages, max_tokens=500, temperature=0.7):
+        for delta in self.deltas:
+            await asyncio.sleep(0)
+            yield delta
+        if self.error:
+            raise self.error
+
+
+@pytest.fixture
+def concierge(monkeypatch):
+    db = FakeMongoDatabase()
+    user = User(email="shopper@example.com", first_name="Sam", last_name="Shopper")
+    monkeypatch.setattr(ai_concierge, "similarity_index", SimilarityIndex(dimensions=1024))
+    app.dependency_overrides[get_database] = lambda: db
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    yield db, user
+    app.dependency_overrides.clear()
+
+
+def parse_events(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_chat_stream_sends_events_and_saves_the_turn_once_done(concierge, monkeypatch):
+    db, user = concierge
+    deltas = ["Hello", " there", "!" * 2000]
+    monkeypatch.setattr(ai_concierge, "llm_client", FakeStreamingClient(deltas))
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post(
+            "/api/ai/chat/stream", params={"message": "hi"}, headers={"Accept-Encoding": "gzip"}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in response.headers
+    events = parse_events(response.text)
+    session_id = events[0][1]["session_id"]
+    assert events == (
+        [("session", {"session_id": session_id})]
+        + [("token", {"delta": delta}) for delta in deltas]
+        + [("done", {"session_id": session_id})]
+    )
+
+    stored = db.chat_sessions.docs[ObjectId(session_id)]
+    assert stored["user_id"] == user.id
+    assert [(m["role"], m["content"]) for m in stored["messages"]] == [
+        ("user", "hi"), ("assistant", "".join(deltas))
+    ]
+    assert stored["message_count"] == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_chat_stream_saves_no_partial_turn(concierge, monkeypatch):
+    db, _ = concierge
+    monkeypatch.setattr(
+        ai_concierge, "llm_client", FakeStreamingClient(["Hel"], error=LLMError("upstream closed"))
+    )
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/api/ai/chat/stream", params={"message": "hi"})
+
+    events = parse_events(response.text)
+    assert [event for event, _ in events] == ["session", "token", "error"]
+    assert events[-1][1] == {"detail": "AI service error: upstream closed"}
+    [stored] = db.chat_sessions.docs.values()
+    assert stored["messages"] == []
+    assert stored.get("message_count", 0) == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_chat_stream_saves_no_partial_turn(concierge, monkeypatch):
+    db, user = concierge
+    monkeypatch.setattr(ai_concierge, "llm_client", FakeStreamingClient(["Hel", "lo"]))
+
+    response = await ai_concierge.chat_with_ai_stream(message="hi", current_user=user, db=db)
+    body = response.body_iterator
+    assert (await body.__anext__()).startswith("event: session")
+    assert (await body.__anext__()).startswith("event: token")
+    # The client went away mid-reply
+    await body.aclose()
+
+    [stored] = db.chat_sessions.docs.values()
+    assert stored["messages"] == []
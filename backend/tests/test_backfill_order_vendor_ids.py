@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from fake_mongo import FakeDatabase
+from migrations.backfill_order_vendor_ids import backfill_order_vendor_ids
+
+
+@pytest.mark.asyncio
+async def test_backfill_fills_vendor_ids_and_is_idempotent():
+    db = FakeDatabase()
+    vendor_a, vendor_b = ObjectId(), ObjectId()
+    lamp = {"_id": ObjectId(), "vendor_id": vendor_a}
+    mug = {"_id": ObjectId(), "vendor_id": vendor_b}
+    for product in (lamp, mug):
+        db.products.docs[product["_id"]] = product
+    deleted_product = ObjectId()
+
+    legacy = [
+        {"_id": ObjectId(), "items": [{"product_id": lamp["_id"]}, {"product_id": mug["_id"]}]},
+        {"_id": ObjectId(), "created_at": datetime(2024, 1, 31),
+         "items": [{"product_id": deleted_product}]},
+    ]
+    current = {"_id": ObjectId(), "created_at": datetime(2024, 2, 1),
+               "items": [{"product_id": lamp["_id"], "vendor_id": vendor_a}]}
+    for order in (*legacy, current):
+        db.orders.docs[order["_id"]] = order
+
+    # A batch smaller than the backlog walks it in several passes
+    assert await backfill_order_vendor_ids(db, batch_size=1) == 2
+
+    first, second = (db.orders.docs[order["_id"]] for order in legacy)
+    assert [item["vendor_id"] for item in first["items"]] == [vendor_a, vendor_b]
+    assert first["created_at"] == legacy[0]["_id"].generation_time.replace(tzinfo=None)
+    # A deleted product leaves an explicit null, so the order is not read again
+    assert second["items"] == [{"product_id": deleted_product, "vendor_id": None}]
+    assert second["created_at"] == datetime(2024, 1, 31)
+    assert db.orders.docs[current["_id"]] == current
+
+    before = {order_id: dict(order) for order_id, order in db.orders.docs.items()}
+    assert await backfill_order_vendor_ids(db) == 0
+    assert db.orders.docs == before
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from app.services import cache as cache_module
+from app.services.cache import ResponseCache, normalize_query
+
+
+def test_normalize_query_ignores_case_punctuation_and_order():
+    assert normalize_query("Gifts under $50!") == normalize_query("  under $50 gifts ")
+    assert normalize_query("Running  shoes") == "running shoes"
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = ResponseCache("test_lru", max_entries=2, ttl_seconds=10)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a is now most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    now[0] += 11
+    assert cache.get("a") is None
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_and_hit_rate():
+    cache = ResponseCache("test_single_flight")
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    results = await asyncio.gather(*(cache.get_or_load("q", loader) for _ in range(5)))
+    assert results == ["answer"] * 5
+    assert await cache.get_or_load("q", loader) == "answer"
+    assert calls == 1
+
+    stats = cache.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_are_shared_and_not_cached():
+    cache = ResponseCache("test_failures")
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(
+        *(cache.get_or_load("q", failing) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert cache.get("q") is None
+
+
+@pytest.mark.asyncio
+async def test_a_waiter_takes_over_when_the_loading_caller_is_cancelled():
+    cache = ResponseCache("test_cancelled_leader")
+    calls = []
+
+    async def loader():
+        calls.append(len(calls))
+        await asyncio.sleep(0.02)
+        return f"answer {len(calls)}"
+
+    leader = asyncio.create_task(cache.get_or_load("q", loader))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(cache.get_or_load("q", loader)) for _ in range(3)]
+    await asyncio.sleep(0.005)
+    leader.cancel()
+
+    assert await asyncio.gather(*waiters) == ["answer 2"] * 3
+    assert leader.cancelled()
+    assert len(calls) == 2
+    assert cache.get("q") == "answer 2"
@@ -0,0 +1,68 @@
+import bson
+
+from app.config.settings import settings
+from app.routes import ai_concierge
+from app.services.chat_history import fold_into_summary, stored_window, turn_update
+
+
+def message(role, content):
+    return {"role": role, "content": content}
+
+
+def test_summary_is_bounded_and_keeps_newest_lines():
+    summary = ""
+    for i in range(100):
+        summary = fold_into_summary(summary, [message("user", f"question {i} " + "x" * 300)], 500)
+    assert len(summary) <= 500
+    assert summary.splitlines()[-1].startswith("User: question 99")
+    assert all(len(line) <= 166 for line in summary.splitlines())
+
+
+def test_turn_update_size_is_constant():
+    window = stored_window()
+    turn = [message("user", "hello " * 20), message("assistant", "hi " * 40)]
+    session = {"_id": bson.ObjectId(), "messages": [], "summary": ""}
+
+    sizes = []
+    for _ in range(200):
+        update = turn_update(session, turn)
+        assert update["$push"]["messages"]["$slice"] == -settings.CHAT_HISTORY_MAX_MESSAGES
+        sizes.append(len(bson.encode({"u": update})))
+        # What the next turn would load with session_projection()
+        session["messages"] = (session["messages"] + turn)[-window:]
+        session["summary"] = update["$set"].get("summary", session["summary"])
+
+    assert "User: hello" in session["summary"]
+    assert max(sizes) - min(sizes[window:]) <= settings.CHAT_SUMMARY_MAX_CHARS
+    assert max(sizes[100:]) == min(sizes[100:])
+
+
+def test_turn_update_maintains_session_list_fields():
+    session = {"_id": bson.ObjectId(), "messages": [], "summary": ""}
+    update = turn_update(session, [message("user", "hi"), message("assistant", "a" * 300)])
+    assert update["$inc"] == {"message_count": 2}
+    assert update["$set"]["last_message_preview"] == "a" * 100 + "..."
+
+
+def test_every_message_reaches_the_prompt_verbatim_or_summarized(monkeypatch):
+    monkeypatch.setattr(settings, "CHAT_SUMMARY_MAX_CHARS", 100_000)
+    monkeypatch.setattr(settings, "LLM_CHAT_PROMPT_TOKENS", 100_000)
+    session = {"_id": bson.ObjectId(), "messages": [], "summary": ""}
+    history = []
+
+    for i in range(3 * settings.CHAT_PROMPT_MESSAGES):
+        user = message("user", f"question {i}")
+        prompt = ai_concierge._prompt_messages(session, [user])
+        sent = "\n".join(part["content"] for part in prompt)
+        assert len([part for part in prompt if part["role"] != "system"]) == min(
+            len(history) + 1, settings.CHAT_PROMPT_MESSAGES
+        )
+        for earlier in history:
+            assert earlier["content"] in sent, earlier["content"]
+
+        turn = [user, message("assistant", f"answer {i}")]
+        update = turn_update(session, turn)
+        history.extend(turn)
+        # What the next turn would load with session_projection()
+        session["messages"] = (session["messages"] + turn)[-stored_window():]
+        session["summary"] = update["$set"].get("summary", session["summary"])
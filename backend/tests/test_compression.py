@@ -0,0 +1,80 @@
+import gzip
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from httpx import AsyncClient
+from app.config.settings import settings
+from app.middleware.compression import CompressionMiddleware
+from app.services import compression
+from app.services.compression import EncodedBody, encoded_response, negotiate
+
+LARGE = {"products": [{"name": f"Product {i}", "description": "x" * 40} for i in range(100)]}
+
+def test_negotiate_prefers_brotli_and_honours_q_values():
+    assert negotiate("gzip, deflate, br") == "br"
+    assert negotiate("gzip;q=1.0, br;q=0") == "gzip"
+    assert negotiate("br;q=0.5, gzip") == "gzip"
+    assert negotiate("*") == "br"
+    assert negotiate("identity") is None
+    assert negotiate(None) is None
+
+def test_negotiate_without_brotli(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", None)
+    assert negotiate("br, gzip") == "gzip"
+    assert negotiate("br") is None
+
+def build_app():
+    app = FastAPI()
+    cached = EncodedBody(JSONResponse(LARGE).body)
+
+    @app.get("/large")
+    async def large():
+        return LARGE
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            yield b"data: " + b"x" * 2000 + b"\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    @app.get("/cached")
+    async def cached_page(request: Request):
+        return encoded_response(cached, request.headers.get("accept-encoding"))
+
+    app.add_middleware(CompressionMiddleware)
+    return app
+
+@pytest.mark.asyncio
+async def test_middleware_compresses_large_responses_only():
+    async with AsyncClient(app=build_app(), base_url="http://test") as client:
+        response = await client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert int(response.headers["content-length"]) < len(JSONResponse(LARGE).body)
+        assert response.json() == LARGE
+
+        small = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in small.headers
+
+        plain = await client.get("/large", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in plain.headers
+        assert plain.json() == LARGE
+
+        stream = await client.get("/stream", headers={"Accept-Encoding": "gzip"})
+        assert "content-encoding" not in stream.headers
+
+@pytest.mark.asyncio
+async def test_cached_body_is_compressed_once_and_not_twice():
+    app = build_app()
+    async with AsyncClient(app=app, base_url="http://test") as client:
+        before = compression.COMPRESSION_OUTPUT_BYTES.value(encoding="gzip")
+        for _ in range(3):
+            response = await client.get("/cached", headers={"Accept-Encoding": "gzip"})
+            assert response.headers["content-encoding"] == "gzip"
+            assert response.json() == LARGE
+        compressed_once = compression.COMPRESSION_OUTPUT_BYTES.value(encoding="gzip") - before
+        assert compressed_once == len(gzip.compress(JSONResponse(LARGE).body, settings.GZIP_LEVEL, mtime=0))
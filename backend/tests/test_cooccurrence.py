@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+import pytest
+from bson import ObjectId
+
+from app.services.cooccurrence import CoOccurrenceModel
+from fake_mongo import FakeDatabase
+
+
+def test_counts_pairs_from_baskets():
+    model = CoOccurrenceModel()
+    model.add_basket(["phone", "case", "charger"])
+    model.add_basket(["phone", "case"])
+    model.add_basket(["phone", "phone"])  # one distinct product, no pairs
+
+    assert model.neighbors("phone") == [("case", 2), ("charger", 1)]
+    assert model.neighbors("charger", k=1) == [("phone", 1)]
+    assert model.recommend_for_basket(["case", "charger"]) == [("phone", 3)]
+    assert model.baskets == 2
+
+
+def test_memory_is_bounded():
+    model = CoOccurrenceModel(max_products=10, max_neighbors=3)
+    for i in range(100):
+        model.add_basket(["hub", f"item{i}"])
+        model.add_basket(["hub", "favourite"])
+
+    assert len(model) <= 10
+    assert len(model._neighbors["hub"]) < 2 * 3
+    assert model.neighbors("hub")[0] == ("favourite", 100)
+    # Least recently bought products were evicted
+    assert model.neighbors("item0") == []
+
+
+class Leader:
+    def __init__(self, is_leader):
+        self.is_leader = is_leader
+
+
+def seed_orders(db, baskets):
+    for basket in baskets:
+        order_id = ObjectId()
+        db.orders.docs[order_id] = {"_id": order_id, "status": "confirmed", "items": [{"product_id": p} for p in basket]}
+
+
+@pytest.mark.asyncio
+async def test_the_leader_builds_once_and_workers_load_the_build():
+    db = FakeDatabase()
+    seed_orders(db, [["phone", "case"], ["phone", "case", "charger"]])
+    leader, worker = CoOccurrenceModel(), CoOccurrenceModel()
+
+    # A worker alone never scans the orders
+    assert await worker.sync(db, 3600, 180, Leader(False)) == ""
+    assert await leader.sync(db, 3600, 180, Leader(True)) == "Published the bought-together model from 2 orders"
+    assert await worker.sync(db, 3600, 180, Leader(False)) == f"Loaded bought-together model {leader.build}"
+
+    assert worker.neighbors("phone") == [("case", 2), ("charger", 1)]
+    assert worker.baskets == 2
+    # Not due yet: nothing is rebuilt or reloaded
+    assert await leader.sync(db, 3600, 180, Leader(True)) == ""
+    assert await worker.sync(db, 3600, 180, Leader(False)) == ""
+
+
+@pytest.mark.asyncio
+async def test_a_rebuild_replaces_the_build_and_keeps_the_previous_one():
+    db = FakeDatabase()
+    seed_orders(db, [["phone", "case"]])
+    model = CoOccurrenceModel()
+    await model.sync(db, 3600, 180, Leader(True))
+    first = model.build
+
+    seed_orders(db, [["phone", "charger"]])
+    db.cooccurrence_meta.docs["model"]["built_at"] -= timedelta(hours=2)
+    await model.sync(db, 3600, 180, Leader(True))
+    second = model.build
+    await model.sync(db, 0, 180, Leader(True))  # 0: never rebuilt once stored
+
+    assert second != first and model.build == second
+    assert {doc["build"] for doc in db.cooccurrence.docs.values()} == {first, second}
+    assert db.cooccurrence_meta.docs["model"]["previous"] == first
+
+
+@pytest.mark.asyncio
+async def test_a_build_that_lost_the_race_is_discarded():
+    db = FakeDatabase()
+    seed_orders(db, [["phone", "case"]])
+    winner, loser = CoOccurrenceModel(), CoOccurrenceModel()
+    await winner.rebuild(db)
+    await loser.rebuild(db)
+
+    assert await winner.publish(db, None)
+    assert await loser.publish(db, None) is None
+    assert {doc["build"] for doc in db.cooccurrence.docs.values()} == {winner.build}
@@ -0,0 +1,46 @@
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo.read_preferences import SecondaryPreferred
+
+from app.config.database import client_options, read_database_for
+from app.config.settings import settings
+from app.services.mongo_monitoring import (
+    POOL_CHECKED_OUT, POOL_CHECKOUT_FAILURES, POOL_CHECKOUT_WAIT, PoolMetricsListener
+)
+
+ADDRESS = ("db1", 27017)
+
+
+def test_client_is_configured_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "MONGO_MAX_POOL_SIZE", 7)
+    monkeypatch.setattr(settings, "MONGO_MIN_POOL_SIZE", 2)
+    monkeypatch.setattr(settings, "MONGO_WAIT_QUEUE_TIMEOUT_MS", 150)
+    client = AsyncIOMotorClient("mongodb://localhost:1", connect=False, **client_options())
+    try:
+        assert client.options.pool_options.max_pool_size == 7
+        assert client.options.pool_options.wait_queue_timeout == 0.15
+
+        read_db = read_database_for(client)
+        assert isinstance(read_db.read_preference, SecondaryPreferred)
+        assert read_db.read_preference.max_staleness == settings.MONGO_MAX_STALENESS_SECONDS
+        assert client[settings.DATABASE_NAME].read_preference.mode == 0  # primary for writes
+    finally:
+        client.close()
+
+
+def test_pool_listener_records_checkout_wait():
+    listener = PoolMetricsListener()
+    waits = POOL_CHECKOUT_WAIT.snapshot()["count"]
+    timeouts = POOL_CHECKOUT_FAILURES.value(reason="timeout")
+
+    listener.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    listener.connection_checked_out(monitoring.ConnectionCheckedOutEvent(ADDRESS, 1))
+    assert POOL_CHECKED_OUT.value(address="db1:27017") == 1
+    listener.connection_checked_in(monitoring.ConnectionCheckedInEvent(ADDRESS, 1))
+    assert POOL_CHECKED_OUT.value(address="db1:27017") == 0
+
+    listener.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(ADDRESS))
+    listener.connection_check_out_failed(monitoring.ConnectionCheckOutFailedEvent(ADDRESS, "timeout"))
+
+    assert POOL_CHECKOUT_WAIT.snapshot()["count"] == waits + 2
+    assert POOL_CHECKOUT_FAILURES.value(reason="timeout") == timeouts + 1
@@ -0,0 +1,50 @@
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from app.services import exports
+from app.services.exports import SALES_EXPORT_FIELDS, gzip_stream, iter_csv, iter_ndjson
+
+
+async def rows(count):
+    for i in range(count):
+        yield {
+            "order_number": f"ORD-{i:013d}",
+            "order_id": f"{i:024x}",
+            "created_at": datetime(2024, 1, 1, 12, 0, i % 60),
+            "status": "confirmed",
+            "product_id": f"{i:024x}",
+            "product_name": f"Product, \"{i}\"",
+            "quantity": 2,
+            "unit_price": 9.5,
+            "total_price": 19.0,
+        }
+
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.asyncio
+async def test_csv_export_is_chunked_and_parseable(monkeypatch):
+    monkeypatch.setattr(exports, "CHUNK_SIZE", 1024)
+    chunks = await collect(iter_csv(rows(200)))
+    assert len(chunks) > 1
+
+    parsed = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert parsed[0] == SALES_EXPORT_FIELDS
+    assert len(parsed) == 201
+    assert parsed[1][5] == 'Product, "0"'
+    assert parsed[1][2] == "2024-01-01T12:00:00"
+
+
+@pytest.mark.asyncio
+async def test_gzip_ndjson_round_trip():
+    compressed = b"".join(await collect(gzip_stream(iter_ndjson(rows(50)))))
+    lines = gzip.decompress(compressed).decode().splitlines()
+    assert len(lines) == 50
+    assert json.loads(lines[-1])["order_number"] == f"ORD-{49:013d}"
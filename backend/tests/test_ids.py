@@ -0,0 +1,52 @@
+import threading
+
+from app.services.ids import (
+    SnowflakeGenerator,
+    decode_id,
+    encode_id,
+    id_timestamp_ms,
+    new_order_number,
+)
+
+
+def test_ids_are_strictly_increasing():
+    generator = SnowflakeGenerator(worker_id=7)
+    ids = [generator.next_id() for _ in range(20000)]
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+
+
+def test_workers_never_collide():
+    generators = [SnowflakeGenerator(worker_id=i) for i in range(4)]
+    results = [[] for _ in generators]
+
+    def run(i):
+        results[i].extend(generators[i].next_id() for _ in range(5000))
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(generators))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    all_ids = [value for ids in results for value in ids]
+    assert len(set(all_ids)) == len(all_ids)
+
+
+def test_encoding_preserves_order_and_round_trips():
+    generator = SnowflakeGenerator(worker_id=1)
+    ids = [generator.next_id() for _ in range(1000)]
+    encoded = [encode_id(value) for value in ids]
+    assert encoded == sorted(encoded)
+    assert [decode_id(text) for text in encoded] == ids
+    assert len({len(text) for text in encoded}) == 1
+
+
+def test_id_timestamp_and_order_number_format(monkeypatch):
+    generator = SnowflakeGenerator(worker_id=3)
+    monkeypatch.setattr(generator, "_now_ms", lambda: 123456)
+    assert id_timestamp_ms(generator.next_id()) == 123456 + generator.epoch_ms
+
+    order_number = new_order_number()
+    assert order_number.startswith("ORD-")
+    assert len(order_number) == len("ORD-") + 13
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.services import ids
+from app.services.leases import Leader, WorkerIdLease, acquire, release
+from fake_mongo import FakeDatabase
+
+
+@pytest.mark.asyncio
+async def test_a_lease_has_one_owner_until_it_expires():
+    db = FakeDatabase()
+    assert await acquire(db, "job", "a", ttl_seconds=30)
+    assert not await acquire(db, "job", "b", ttl_seconds=30)
+    assert await acquire(db, "job", "a", ttl_seconds=30)  # renewal
+
+    db.leases.docs["job"]["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+    assert await acquire(db, "job", "b", ttl_seconds=30)
+    assert not await acquire(db, "job", "a", ttl_seconds=30)
+
+    await release(db, "job", "a")  # not the owner any more
+    assert db.leases.docs["job"]["owner"] == "b"
+    await release(db, "job", "b")
+    assert db.leases.docs == {}
+
+
+@pytest.mark.asyncio
+async def test_processes_lease_distinct_worker_ids(monkeypatch):
+    monkeypatch.setattr(ids, "_worker_id", None)
+    db = FakeDatabase()
+    leases = [WorkerIdLease(owner=f"host-{i % 2}:{100 + i}") for i in range(4)]
+    # Same preferred id everywhere, as with a shared WORKER_ID setting
+    leased = [await lease.acquire(db, preferred=7) for lease in leases]
+    assert leased == [7, 8, 9, 10]
+    assert ids.get_id_generator().worker_id == 10
+
+    await leases[0].release(db)
+    assert await WorkerIdLease(owner="host-2:1").acquire(db, preferred=7) == 7
+
+
+@pytest.mark.asyncio
+async def test_renewal_moves_to_a_new_id_once_the_lease_was_taken(monkeypatch, capsys):
+    monkeypatch.setattr(ids, "_worker_id", None)
+    db = FakeDatabase()
+    lease = WorkerIdLease(owner="slow:1")
+    assert await lease.acquire(db, preferred=3) == 3
+    assert await lease.renew(db) == 3
+
+    # The lease lapsed (a long pause) and another process took the id
+    db.leases.docs["worker_id:3"]["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+    assert await WorkerIdLease(owner="fast:2").acquire(db, preferred=3) == 3
+
+    assert await lease.renew(db) != 3
+    assert ids.get_id_generator().worker_id == lease.worker_id
+    assert "Lost the lease on worker id 3" in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_one_leader_at_a_time_with_takeover_after_expiry():
+    db = FakeDatabase()
+    first, second = Leader("jobs", owner="a:1"), Leader("jobs", owner="b:2")
+    assert await first.try_acquire(db)
+    assert not await second.try_acquire(db)
+    assert first.is_leader and not second.is_leader
+
+    db.leases.docs["jobs"]["expires_at"] = datetime.utcnow() - timedelta(seconds=1)
+    assert await second.try_acquire(db)
+    assert not await first.try_acquire(db)
+    assert not first.is_leader
+
+    await second.release(db)
+    assert not second.is_leader
+    assert await first.try_acquire(db)
@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.llm import LLMClient, LLMError
+
+
+class FakeCompletions:
+    def __init__(self, delay=0.01, failures=0):
+        self.delay = delay
+        self.failures = failures
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+
+    async def create(self, **kwargs):
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.active -= 1
+        if self.failures:
+            self.failures -= 1
+            raise asyncio.TimeoutError()
+        message = SimpleNamespace(content=f"echo {kwargs['messages'][-1]['content']}")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def make_client(completions, **kwargs):
+    client = LLMClient(api_key="sk-test", backoff_seconds=0, **kwargs)
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return client
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped():
+    completions = FakeCompletions()
+    client = make_client(completions, max_concurrency=3)
+    replies = await asyncio.gather(
+        *(client.chat([{"role": "user", "content": str(i)}]) for i in range(10))
+    )
+    assert replies[4] == "echo 4"
+    assert completions.max_active == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_then_gives_up():
+    completions = FakeCompletions(failures=1)
+    client = make_client(completions, max_retries=2)
+    assert await client.chat([{"role": "user", "content": "hi"}]) == "echo hi"
+    assert completions.calls == 2
+
+    completions = FakeCompletions(failures=5)
+    client = make_client(completions, max_retries=2)
+    with pytest.raises(LLMError):
+        await client.chat([{"role": "user", "content": "hi"}])
+    assert completions.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_timeout_per_attempt():
+    completions = FakeCompletions(delay=1)
+    client = make_client(completions, timeout=0.05, max_retries=0)
+    with pytest.raises(LLMError):
+        await client.chat([{"role": "user", "content": "slow"}])
+
+
+class FakeStream:
+    def __init__(self, deltas):
+        self.deltas = deltas
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for delta in self.deltas:
+            await asyncio.sleep(0)
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=delta))])
+
+
+class FakeStreamingCompletions:
+    async def create(self, **kwargs):
+        assert kwargs["stream"] is True
+        return FakeStream(["Hel", "lo", None, "!"])
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_yields_deltas():
+    client = make_client(FakeStreamingCompletions())
+    deltas = [delta async for delta in client.stream_chat([{"role": "user", "content": "hi"}])]
+    assert deltas == ["Hel", "lo", "!"]
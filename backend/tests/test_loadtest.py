@@ -0,0 +1,53 @@
+import pytest
+from httpx import AsyncClient
+from fakes import stripe_server
+from loadtest.stats import Results, compare, db_ops_per_request, percentile
+
+def metrics_text(sum_, count):
+    return (
+        f'http_request_db_commands_count{{endpoint="list_products"}} {count}\n'
+        f'http_request_db_commands_sum{{endpoint="list_products"}} {sum_}\n'
+    )
+
+def test_percentile_is_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.05
+    assert percentile(values, 99) == 0.099
+    assert percentile([], 95) == 0.0
+
+def test_db_ops_only_count_the_measured_window():
+    assert db_ops_per_request(metrics_text(30, 10), metrics_text(90, 30)) == {"list_products": 3.0}
+
+def summary_with(latency_ms, db_ops):
+    results = Results()
+    for _ in range(100):
+        results.record("browse", "list_products", latency_ms / 1000, True)
+    results.record("register", "register", 0.5, True)
+    return results.summary(10.0, {"list_products": db_ops}, users=5)
+
+def test_summary_excludes_sign_up_from_throughput():
+    summary = summary_with(20, 2)
+    assert summary["requests"] == 100
+    assert summary["throughput_rps"] == 10.0
+    assert summary["steps"]["browse"]["p95_ms"] == 20.0
+
+def test_compare_flags_slower_steps_and_extra_queries():
+    baseline = summary_with(20, 2)
+    assert compare(summary_with(22, 2), baseline) == []
+    problems = compare(summary_with(40, 3), baseline)
+    assert any("browse p95_ms" in problem for problem in problems)
+    assert any("browse db ops" in problem for problem in problems)
+
+@pytest.mark.asyncio
+async def test_fake_stripe_payment_intent_round_trip(monkeypatch):
+    monkeypatch.setattr(stripe_server, "LATENCY_MS", 0)
+    monkeypatch.setattr(stripe_server, "JITTER_MS", 0)
+    async with AsyncClient(app=stripe_server.app, base_url="http://stripe") as client:
+        created = (await client.post("/v1/payment_intents", data={
+            "amount": "2599", "currency": "usd", "metadata[order_number]": "AM-1",
+        })).json()
+        assert created["client_secret"].startswith(created["id"] + "_secret_")
+        assert created["metadata"] == {"order_number": "AM-1"}
+        retrieved = (await client.get(f"/v1/payment_intents/{created['id']}")).json()
+        assert retrieved["status"] == "succeeded"
+        assert (await client.get("/v1/payment_intents/pi_missing")).status_code == 404
@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+import pytest
+from httpx import AsyncClient
+from pymongo import monitoring
+
+from app.main import app
+from app.middleware.metrics import IN_FLIGHT, REQUESTS
+from app.services.metrics import Histogram, external_call, registry
+from app.services.mongo_monitoring import COMMAND_LATENCY, CommandMetricsListener
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_route_templates():
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        await ac.get("/health")
+        response = await ac.get("/api/products/not-an-id")
+        assert response.status_code == 400
+        await ac.get("/no/such/path")
+        metrics = await ac.get("/metrics")
+
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    body = metrics.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/health"}' in body
+    assert REQUESTS.value(method="GET", route="/api/products/{product_id}", status=400) >= 1
+    assert REQUESTS.value(method="GET", route="unmatched", status=404) >= 1
+    assert IN_FLIGHT.value(method="GET", route="/health") == 0
+
+
+def test_histogram_render():
+    histogram = Histogram("demo_seconds", "Demo", ["op"], buckets=(0.1, 1.0))
+    histogram.observe(0.05, op="a")
+    histogram.observe(0.5, op="a")
+    histogram.observe(5, op="a")
+    lines = histogram.render()
+    assert 'demo_seconds_bucket{op="a",le="0.1"} 1' in lines
+    assert 'demo_seconds_bucket{op="a",le="1.0"} 2' in lines
+    assert 'demo_seconds_bucket{op="a",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{op="a"} 3' in lines
+
+
+def test_command_listener_uses_server_duration():
+    listener = CommandMetricsListener()
+    before = COMMAND_LATENCY.snapshot(command="find", collection="products")["count"]
+    address = ("localhost", 27017)
+
+    listener.started(monitoring.CommandStartedEvent(
+        {"find": "products", "filter": {}}, "aislemarts", 11, address, None
+    ))
+    listener.succeeded(monitoring.CommandSucceededEvent(timedelta(microseconds=1500), {"ok": 1}, "find", 11, address, None))
+    # Handshakes are not application queries
+    listener.started(monitoring.CommandStartedEvent({"ping": 1}, "admin", 12, address, None))
+    listener.succeeded(monitoring.CommandSucceededEvent(timedelta(microseconds=100), {"ok": 1}, "ping", 12, address, None))
+
+    snapshot = COMMAND_LATENCY.snapshot(command="find", collection="products")
+    assert snapshot["count"] == before + 1
+    assert "ping" not in registry.render()
+
+
+def test_external_call_records_outcome():
+    with pytest.raises(RuntimeError):
+        with external_call("stripe", "test.fail"):
+            raise RuntimeError("boom")
+    assert "external_call_seconds_count{" in registry.render()
+    assert 'operation="test.fail",outcome="error"' in registry.render()
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+
+from app.models import OrderStatus
+from app.services.order_state import allowed_sources, can_transition, transition_guard, transition_order
+from fake_mongo import FakeDatabase
+
+
+def test_cancellation_only_before_processing():
+    assert can_transition(OrderStatus.PENDING, OrderStatus.CANCELLED)
+    assert can_transition("confirmed", "cancelled")
+    assert not can_transition(OrderStatus.SHIPPED, OrderStatus.CANCELLED)
+    assert not can_transition(OrderStatus.CANCELLED, OrderStatus.CANCELLED)
+
+
+def test_guard_lists_every_source_status():
+    assert set(allowed_sources(OrderStatus.CANCELLED)) == {OrderStatus.PENDING, OrderStatus.CONFIRMED}
+    assert transition_guard(OrderStatus.CONFIRMED) == {"status": {"$in": [OrderStatus.PENDING]}}
+    assert allowed_sources(OrderStatus.PENDING) == []
+
+
+@pytest.mark.asyncio
+async def test_transition_order_moves_vendor_stats_only_when_it_wins():
+    db = FakeDatabase()
+    vendor_id = ObjectId()
+    order = {
+        "_id": ObjectId(), "status": OrderStatus.PENDING, "created_at": datetime(2024, 1, 31),
+        "items": [{"vendor_id": vendor_id, "quantity": 1, "total_price": 20.0}],
+    }
+    db.orders.docs[order["_id"]] = dict(order)
+    query = {"_id": order["_id"]}
+
+    assert await transition_order(db, query, OrderStatus.SHIPPED) is None
+    before = await transition_order(db, query, OrderStatus.CONFIRMED, {"payment_status": "succeeded"})
+    assert before["status"] == OrderStatus.PENDING
+    assert await transition_order(db, query, OrderStatus.CONFIRMED) is None
+
+    stored = db.orders.docs[order["_id"]]
+    assert (stored["status"], stored["payment_status"]) == (OrderStatus.CONFIRMED, "succeeded")
+    assert db.vendor_stats.docs[vendor_id]["orders"]["by_status"] == {"pending": -1, "confirmed": 1}
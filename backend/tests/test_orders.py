@@ -0,0 +1,163 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from bson import ObjectId
+from httpx import AsyncClient
+
+from app.config.database import get_database
+from app.config.settings import settings
+from app.main import app
+from app.models import OrderStatus, User, UserRole
+from app.routes import orders as orders_routes
+from app.services.auth import get_current_active_user
+from app.services.query_guard import QueryBudgetExceeded
+from fake_mongo import FakeDatabase
+
+SHIPPING = {"street": "1 Main St", "city": "Springfield", "state": "IL", "postal_code": "62701", "country": "US"}
+
+
+@pytest.fixture
+def shop(monkeypatch):
+    monkeypatch.setattr(settings, "STRIPE_SECRET_KEY", None)
+    db = FakeDatabase(unique={"orders": ("order_number",)})
+    user = User(email="shopper@example.com", first_name="Sam", last_name="Shopper")
+    app.dependency_overrides[get_database] = lambda: db
+    app.dependency_overrides[get_current_active_user] = lambda: user
+    yield db, user
+    app.dependency_overrides.clear()
+
+
+def add_product(db, stock=10, price=25.0):
+    product = {
+        "_id": ObjectId(), "vendor_id": ObjectId(), "name": "Desk lamp",
+        "price": price, "stock_quantity": stock, "status": "active",
+    }
+    db.products.docs[product["_id"]] = product
+    return product
+
+
+@pytest.mark.asyncio
+async def test_create_order_retries_an_order_number_clash(shop, monkeypatch):
+    db, user = shop
+    product = add_product(db)
+    db.carts.docs["cart"] = {"_id": "cart", "user_id": user.id, "items": [{"product_id": product["_id"], "quantity": 2}]}
+    db.orders.docs["taken"] = {"_id": "taken", "order_number": "ORD-TAKEN", "created_at": datetime.utcnow()}
+    numbers = iter(["ORD-TAKEN", "ORD-FRESH"])
+    monkeypatch.setattr(orders_routes, "new_order_number", lambda: next(numbers))
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post("/api/orders/create", json=SHIPPING)
+
+    assert response.status_code == 200
+    assert response.json()["order_number"] == "ORD-FRESH"
+    stored = [order for order in db.orders.docs.values() if order["_id"] != "taken"]
+    assert [order["order_number"] for order in stored] == ["ORD-FRESH"]
+    assert stored[0]["status"] == OrderStatus.PENDING
+    assert db.products.docs[product["_id"]]["stock_quantity"] == 8
+
+
+def add_order(db, user, product, quantity=2, status=OrderStatus.PENDING):
+    order = {
+        "_id": ObjectId(), "user_id": user.id, "status": status, "created_at": datetime(2024, 1, 31),
+        "items": [{
+            "product_id": product["_id"], "vendor_id": product["vendor_id"],
+            "quantity": quantity, "total_price": quantity * product["price"],
+        }],
+    }
+    db.orders.docs[order["_id"]] = order
+    return order
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cancels_have_one_winner_and_restock_once(shop):
+    db, user = shop
+    product = add_product(db, stock=5)
+    order = add_order(db, user, product, quantity=2)
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        responses = await asyncio.gather(*[ac.put(f"/api/orders/{order['_id']}/cancel") for _ in range(2)])
+
+    assert sorted(response.status_code for response in responses) == [200, 400]
+    assert db.orders.docs[order["_id"]]["status"] == OrderStatus.CANCELLED
+    assert db.products.docs[product["_id"]]["stock_quantity"] == 7
+    by_status = db.vendor_stats.docs[product["vendor_id"]]["orders"]["by_status"]
+    assert by_status == {"pending": -1, "cancelled": 1}
+
+
+@pytest.mark.asyncio
+async def test_cancel_reports_an_invalid_transition_apart_from_a_missing_order(shop):
+    db, user = shop
+    product = add_product(db, stock=5)
+    shipped = add_order(db, user, product, status=OrderStatus.SHIPPED)
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        invalid = await ac.put(f"/api/orders/{shipped['_id']}/cancel")
+        missing = await ac.put(f"/api/orders/{ObjectId()}/cancel")
+
+    assert invalid.status_code == 400
+    assert invalid.json()["detail"] == "Order cannot be cancelled"
+    assert missing.status_code == 404
+    assert db.orders.docs[shipped["_id"]]["status"] == OrderStatus.SHIPPED
+    assert db.products.docs[product["_id"]]["stock_quantity"] == 5
+    assert db.vendor_stats.docs == {}
+
+
+@pytest.mark.asyncio
+async def test_checkout_reads_a_large_cart_without_a_query_per_item(shop, monkeypatch):
+    db, user = shop
+    products = [add_product(db) for _ in range(2 * settings.DB_REPEATED_QUERY_THRESHOLD)]
+    db.carts.docs["cart"] = {
+        "_id": "cart", "user_id": user.id,
+        "items": [{"product_id": product["_id"], "quantity": 1} for product in products],
+    }
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        assert (await ac.post("/api/orders/create", json=SHIPPING)).status_code == 200
+
+    # The per-item lookup this route used to do trips the query guard
+    async def product_per_item(db, product_ids, *args, **kwargs):
+        return {product_id: await db.products.find_one({"_id": product_id}) for product_id in product_ids}
+
+    monkeypatch.setattr(orders_routes, "load_products_by_id", product_per_item)
+    db.carts.docs["cart"]["items"] = [{"product_id": product["_id"], "quantity": 1} for product in products]
+    with pytest.raises(QueryBudgetExceeded, match="find products"):
+        async with AsyncClient(app=app, base_url="http://test") as ac:
+            await ac.post("/api/orders/create", json=SHIPPING)
+
+
+@pytest.mark.asyncio
+async def test_vendors_see_the_orders_holding_their_products(shop):
+    db, user = shop
+    lamp, mug = add_product(db), add_product(db)
+    db.carts.docs["cart"] = {"_id": "cart", "user_id": user.id, "items": [
+        {"product_id": lamp["_id"], "quantity": 1}, {"product_id": mug["_id"], "quantity": 2},
+    ]}
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        assert (await ac.post("/api/orders/create", json=SHIPPING)).status_code == 200
+
+    [placed] = db.orders.docs.values()
+    assert [item["vendor_id"] for item in placed["items"]] == [lamp["vendor_id"], mug["vendor_id"]]
+    assert isinstance(placed["created_at"], datetime)
+
+    vendor_user = User(email="vendor@example.com", first_name="Val", last_name="Vendor", role=UserRole.VENDOR)
+    db.vendors.docs[lamp["vendor_id"]] = {
+        "_id": lamp["vendor_id"], "user_id": vendor_user.id, "status": "approved",
+    }
+    other = add_order(db, user, add_product(db))
+    app.dependency_overrides[get_current_active_user] = lambda: vendor_user
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        orders = (await ac.get("/api/orders/vendor/orders")).json()
+        pending = (await ac.get("/api/orders/vendor/orders", params={"status": "pending"})).json()
+        cancelled = (await ac.get("/api/orders/vendor/orders", params={"status": "cancelled"})).json()
+        stats = (await ac.get("/api/vendors/dashboard/stats")).json()
+
+    assert [order["_id"] for order in orders] == [str(placed["_id"])]
+    assert [order["_id"] for order in pending] == [str(placed["_id"])]
+    assert cancelled == []
+    assert str(other["_id"]) not in {order["_id"] for order in orders}
+    assert stats["recent_orders"] == 1
+    assert stats["orders_by_status"] == {"pending": 1}
+    assert stats["total_revenue"] == lamp["price"]
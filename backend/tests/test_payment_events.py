@@ -0,0 +1,207 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.services import payment_events as payment_events_module
+from app.services.payment_events import PaymentEventProcessor
+from fake_mongo import FakeDatabase
+
+VENDOR = ObjectId()
+
+
+def record(event_id, event_type, intent_id, received_at=None):
+    return {
+        "_id": event_id,
+        "type": event_type,
+        "payment_intent_id": intent_id,
+        "created": 1700000000,
+        "processed": False,
+        "received_at": received_at or datetime.utcnow(),
+    }
+
+
+async def seed(db, intent_id, status="pending"):
+    await db.orders.insert_one({
+        "payment_intent_id": intent_id,
+        "status": status,
+        "payment_status": "pending",
+        "created_at": datetime(2024, 1, 31),
+        "items": [{"vendor_id": VENDOR, "total_price": 20.0}],
+    })
+
+
+async def stored(db, records):
+    await db.stripe_events.insert_many([dict(r) for r in records])
+    return records
+
+
+def order(db, intent_id):
+    return next(o for o in db.orders.docs.values() if o["payment_intent_id"] == intent_id)
+
+
+@pytest.mark.asyncio
+async def test_batch_applies_events_in_order_in_one_write(monkeypatch):
+    db = FakeDatabase()
+    for intent_id in ("pi_1", "pi_2", "pi_3", "pi_4"):
+        await seed(db, intent_id)
+    writes = []
+
+    def counting(collection):
+        bulk_write = collection.bulk_write
+
+        async def counting_bulk_write(operations, ordered=True):
+            writes.append((collection, len(operations)))
+            return await bulk_write(operations, ordered=ordered)
+
+        monkeypatch.setattr(collection, "bulk_write", counting_bulk_write)
+
+    counting(db.orders)
+    counting(db.vendor_stats)
+    batch = await stored(db, [
+        record("evt_1", "payment_intent.processing", "pi_1"),
+        record("evt_2", "payment_intent.payment_failed", "pi_2"),
+        record("evt_3", "payment_intent.processing", "pi_3"),
+        record("evt_4", "payment_intent.succeeded", "pi_3"),
+        record("evt_5", "payment_intent.succeeded", "pi_4"),
+    ])
+
+    assert await PaymentEventProcessor().apply_batch(db, batch) == 5
+
+    # Transitions included: one ordered write for the orders, one for the stats
+    assert writes == [(db.orders, 5), (db.vendor_stats, 2)]
+    assert order(db, "pi_1")["payment_status"] == "processing"
+    assert order(db, "pi_2")["payment_status"] == "failed"
+    assert (order(db, "pi_3")["status"], order(db, "pi_3")["payment_status"]) == ("confirmed", "succeeded")
+    assert db.vendor_stats.docs[VENDOR]["orders"]["by_status"] == {"pending": -2, "confirmed": 2}
+    assert all(event["processed"] for event in db.stripe_events.docs.values())
+
+
+@pytest.mark.asyncio
+async def test_events_leave_orders_past_pending_alone():
+    db = FakeDatabase()
+    await seed(db, "pi_1", status="cancelled")
+    batch = await stored(db, [
+        record("evt_1", "payment_intent.processing", "pi_1"),
+        record("evt_2", "payment_intent.succeeded", "pi_1"),
+    ])
+
+    assert await PaymentEventProcessor().apply_batch(db, batch) == 0
+    assert order(db, "pi_1")["status"] == "cancelled"
+    assert order(db, "pi_1")["payment_status"] == "pending"
+    assert db.vendor_stats.docs == {}
+
+
+@pytest.mark.asyncio
+async def test_a_redelivered_success_moves_vendor_stats_once():
+    db = FakeDatabase()
+    await seed(db, "pi_1")
+    processor = PaymentEventProcessor()
+    succeeded = record("evt_1", "payment_intent.succeeded", "pi_1")
+
+    # The same event applied by two batches at once (a retry racing recovery)
+    # and again within one batch
+    results = await asyncio.gather(
+        processor.apply_batch(db, [succeeded]),
+        processor.apply_batch(db, [succeeded, dict(succeeded)]),
+    )
+
+    assert sum(results) == 1
+    assert db.vendor_stats.docs[VENDOR]["orders"]["by_status"] == {"pending": -1, "confirmed": 1}
+
+
+@pytest.mark.asyncio
+async def test_a_failed_batch_is_retried_in_the_run_loop(monkeypatch, capsys):
+    db = FakeDatabase()
+    await seed(db, "pi_1")
+    await stored(db, [record("evt_1", "payment_intent.succeeded", "pi_1")])
+    monkeypatch.setattr(payment_events_module, "RETRY_DELAYS_SECONDS", (0, 0))
+    processor = PaymentEventProcessor(batch_window_ms=1)
+    apply_batch = processor.apply_batch
+    calls = []
+
+    async def flaky_apply_batch(db, batch):
+        calls.append(batch)
+        if len(calls) == 1:
+            raise ConnectionError("primary stepped down")
+        return await apply_batch(db, batch)
+
+    monkeypatch.setattr(processor, "apply_batch", flaky_apply_batch)
+    processor.enqueue(dict(db.stripe_events.docs["evt_1"]))
+
+    async def get_db():
+        return db
+
+    loop = asyncio.create_task(processor.run(get_db))
+    for _ in range(50):
+        await asyncio.sleep(0.01)
+        if db.stripe_events.docs["evt_1"]["processed"]:
+            break
+    loop.cancel()
+
+    assert len(calls) == 2
+    assert order(db, "pi_1")["status"] == "confirmed"
+    assert "attempt 1" in capsys.readouterr().out
+
+
+@pytest.mark.asyncio
+async def test_recovery_requeues_only_stale_events_on_the_leader():
+    db = FakeDatabase()
+    old = datetime.utcnow() - timedelta(minutes=5)
+    await stored(db, [
+        record("evt_stale", "payment_intent.succeeded", "pi_1", received_at=old),
+        record("evt_fresh", "payment_intent.succeeded", "pi_2"),
+    ])
+    processor = PaymentEventProcessor()
+
+    async def get_db():
+        return db
+
+    follower = asyncio.create_task(processor.run_recovery_loop(get_db, 60, SimpleNamespace(is_leader=False)))
+    await asyncio.sleep(0.01)
+    follower.cancel()
+    assert processor.queue is None
+
+    leader = asyncio.create_task(processor.run_recovery_loop(get_db, 60, SimpleNamespace(is_leader=True)))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+    assert processor.queue.qsize() == 1
+    assert processor.queue.get_nowait()["_id"] == "evt_stale"
+
+
+@pytest.mark.asyncio
+async def test_recovery_skips_events_queued_or_being_retried(monkeypatch):
+    db = FakeDatabase()
+    old = datetime.utcnow() - timedelta(minutes=5)
+    await stored(db, [record("evt_1", "payment_intent.succeeded", "pi_1", received_at=old)])
+    processor = PaymentEventProcessor(batch_window_ms=1)
+
+    assert await processor.recover(db) == 1
+    # Still queued: a second pass adds no copy
+    assert await processor.recover(db) == 0
+    assert processor.queue.qsize() == 1
+
+    monkeypatch.setattr(payment_events_module, "RETRY_DELAYS_SECONDS", (0.05,))
+    outage = asyncio.Event()
+
+    async def failing_apply_batch(db, batch):
+        outage.set()
+        raise ConnectionError("no primary")
+
+    monkeypatch.setattr(processor, "apply_batch", failing_apply_batch)
+
+    async def get_db():
+        return db
+
+    loop = asyncio.create_task(processor.run(get_db))
+    await outage.wait()
+    # In a batch waiting on its retry backoff
+    assert await processor.recover(db) == 0
+    assert processor.queue.qsize() == 0
+
+    await asyncio.sleep(0.1)
+    # Retries exhausted: the event is left for the next recovery pass
+    assert await processor.recover(db) == 1
+    loop.cancel()
@@ -0,0 +1,56 @@
+import pytest
+from bson import ObjectId
+
+from app.services.product_loader import load_product_cards, load_products
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return self.docs[:length]
+
+
+class FakeProducts:
+    def __init__(self, docs):
+        self.docs = docs
+        self.queries = []
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        wanted = set(query["_id"]["$in"])
+        # Server order, not request order
+        return FakeCursor([doc for doc in self.docs if doc["_id"] in wanted])
+
+
+class FakeDatabase:
+    def __init__(self, docs):
+        self.products = FakeProducts(docs)
+
+
+def product(name):
+    return {"_id": ObjectId(), "name": name, "description": "", "price": 1.0,
+            "category": "Books", "images": ["a.jpg"], "stock_quantity": 4}
+
+
+@pytest.mark.asyncio
+async def test_one_query_in_requested_order():
+    docs = [product("a"), product("b"), product("c")]
+    db = FakeDatabase(docs)
+    ids = [str(docs[2]["_id"]), "not-an-id", docs[0]["_id"], str(ObjectId()), str(docs[2]["_id"])]
+
+    loaded = await load_products(db, ids)
+
+    assert [p["name"] for p in loaded] == ["c", "a"]
+    assert len(db.products.queries) == 1
+    assert await load_products(db, []) == []
+    assert len(db.products.queries) == 1
+
+
+@pytest.mark.asyncio
+async def test_cards_are_compact():
+    docs = [product("a")]
+    cards = await load_product_cards(FakeDatabase(docs), [docs[0]["_id"]])
+    assert cards == [{"id": str(docs[0]["_id"]), "name": "a", "description": "", "price": 1.0,
+                      "category": "Books", "images": ["a.jpg"]}]
@@ -0,0 +1,36 @@
+import pytest
+from bson import ObjectId
+
+from app.config import database
+from app.routes import products as products_routes
+from app.services.catalog import CATALOG_META_ID
+from fake_mongo import FakeDatabase
+
+
+def catalog(version, name):
+    db = FakeDatabase()
+    db.catalog_meta.docs[CATALOG_META_ID] = {"_id": CATALOG_META_ID, "version": version}
+    product_id = ObjectId()
+    db.products.docs[product_id] = {"_id": product_id, "name": name}
+    return db
+
+
+async def render(db, session):
+    return [product["name"] for product in await db.products.find({}, session=session).to_list(length=None)]
+
+
+@pytest.mark.asyncio
+async def test_cache_misses_render_from_a_secondary_that_has_the_version(monkeypatch):
+    primary, secondary = catalog(5, "from the primary"), catalog(5, "from the secondary")
+    monkeypatch.setattr(database.db, "database", primary)
+
+    assert await products_routes.render_at_version(secondary, 5, render) == ["from the secondary"]
+    assert await products_routes.render_at_version(secondary, 4, render) == ["from the secondary"]
+
+
+@pytest.mark.asyncio
+async def test_a_lagging_secondary_is_passed_over_for_the_primary(monkeypatch):
+    primary, secondary = catalog(5, "new name"), catalog(4, "old name")
+    monkeypatch.setattr(database.db, "database", primary)
+
+    assert await products_routes.render_at_version(secondary, 5, render) == ["new name"]
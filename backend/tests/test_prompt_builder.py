@@ -0,0 +1,61 @@
+from app.services.prompt_builder import PromptBuilder, _clip, estimate_tokens
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("red running shoes, size 9") == 8
+    assert estimate_tokens("internationalization") == 5
+
+
+def test_history_is_dropped_oldest_first_and_order_is_kept():
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "word " * 40}
+               for i in range(20)]
+    builder = PromptBuilder("test", budget=400)
+    builder.add_text("system", "system", "You are a shopping assistant.", priority=0, required=True)
+    builder.add_messages("history", history, priority=1)
+    builder.add_text("query", "user", "Any red shoes?", priority=0, required=True)
+    messages = builder.build()
+
+    assert builder.tokens <= 400
+    assert messages[0]["role"] == "system"
+    assert messages[-1]["content"] == "Any red shoes?"
+    kept = messages[1:-1]
+    assert 0 < len(kept) < len(history)
+    assert kept[-1]["content"].startswith("turn 19")
+
+
+def test_lower_priority_sections_are_dropped_first():
+    builder = PromptBuilder("test", budget=120)
+    builder.add_list("products", "user", "Products:", [f"product {i} " + "x " * 10 for i in range(20)], priority=1)
+    builder.add_text("summary", "system", "older context " * 50, priority=2, keep_end=True)
+    builder.add_text("query", "user", "gift ideas", priority=0, required=True)
+    messages = builder.build()
+
+    assert builder.tokens <= 120
+    assert builder.section_tokens["summary"] == 0
+    products = messages[0]["content"].splitlines()
+    assert products[0] == "Products:" and products[1].startswith("product 0")
+
+
+def test_oversized_query_is_clipped_to_budget():
+    builder = PromptBuilder("test", budget=100)
+    builder.add_text("system", "system", "Be brief.", priority=0, required=True)
+    builder.add_text("query", "user", "please " * 500, priority=0, required=True)
+    messages = builder.build()
+
+    assert builder.tokens <= 100
+    assert messages[0]["content"] == "Be brief."
+    assert messages[1]["content"].startswith("please")
+
+
+def test_required_text_without_spaces_is_clipped_mid_word():
+    url = "https://example.com/search?q=" + "&tag=lamp" * 600
+    builder = PromptBuilder("test", budget=100)
+    builder.add_text("system", "system", "Be brief.", priority=0, required=True)
+    builder.add_text("query", "user", url, priority=0, required=True)
+    messages = builder.build()
+
+    assert builder.tokens <= 100
+    assert messages[1]["content"] and url.startswith(messages[1]["content"])
+    assert _clip("x" * 5000, 100) == "x" * 400
+    assert _clip("x" * 5000 + "yz", 100, keep_end=True).endswith("yz")
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient
+from pymongo import monitoring
+
+from app.config.settings import settings
+from app.middleware.query_guard import QueryGuardMiddleware
+from app.services.mongo_monitoring import CommandMetricsListener
+from app.services.query_guard import QueryBudgetExceeded, query_shape, track_queries
+
+listener = CommandMetricsListener()
+ADDRESS = ("localhost", 27017)
+
+
+def issue(command, request_id):
+    # What pymongo does on Motor's executor thread
+    name = next(iter(command))
+    listener.started(monitoring.CommandStartedEvent(command, "aislemarts", request_id, ADDRESS, None))
+    return name
+
+
+def test_query_shape_strips_values():
+    assert query_shape("find", {"find": "products", "filter": {"_id": 1, "price": {"$lte": 5}}}) == \
+        'find products {"_id": "?", "price": {"$lte": "?"}}'
+    assert query_shape("update", {"update": "products", "updates": [{"q": {"_id": 1}, "u": {}}]}) == \
+        'update products {"_id": "?"}'
+    assert query_shape("aggregate", {"aggregate": "orders", "pipeline": [{"$match": {"$or": [{"a": 1}, {"b": 2}]}}]}) == \
+        'aggregate orders {"$or": [{"a": "?"}, {"b": "?"}]}'
+
+
+@pytest.mark.asyncio
+async def test_commands_are_attributed_across_executor_threads():
+    with track_queries() as log:
+        await asyncio.gather(*[
+            asyncio.to_thread(issue, {"find": "products", "filter": {"_id": i}}, 1000 + i)
+            for i in range(3)
+        ])
+        await asyncio.to_thread(issue, {"getMore": 1, "collection": "products"}, 1100)
+    assert log.commands == 4
+    assert log.get_mores == 1
+    assert log.repeated(3) == [('find products {"_id": "?"}', 3)]
+
+
+def build_app(queries: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/items")
+    async def items():
+        for i in range(queries):
+            await asyncio.to_thread(issue, {"find": "products", "filter": {"_id": i}}, 2000 + i)
+        return {"ok": True}
+
+    app.add_middleware(QueryGuardMiddleware)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_query_in_a_loop_fails_in_test_mode(monkeypatch):
+    monkeypatch.setattr(settings, "ENVIRONMENT", "test")
+    monkeypatch.setattr(settings, "DB_REPEATED_QUERY_THRESHOLD", 5)
+
+    async with AsyncClient(app=build_app(2), base_url="http://test") as ac:
+        assert (await ac.get("/items")).status_code == 200
+
+    with pytest.raises(QueryBudgetExceeded, match='5x find products'):
+        async with AsyncClient(app=build_app(5), base_url="http://test") as ac:
+            await ac.get("/items")
+
+
+@pytest.mark.asyncio
+async def test_over_budget_is_logged_outside_test_mode(monkeypatch, capsys):
+    monkeypatch.setattr(settings, "ENVIRONMENT", "development")
+    monkeypatch.setattr(settings, "DB_QUERY_GUARD_STRICT", False)
+    async with AsyncClient(app=build_app(6), base_url="http://test") as ac:
+        assert (await ac.get("/items")).status_code == 200
+    assert "GET /items exceeded the query budget" in capsys.readouterr().out
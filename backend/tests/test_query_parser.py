@@ -0,0 +1,63 @@
+from app.services.query_parser import merge_model_interpretation, parse_query
+
+CATEGORIES = ["Books", "Clothing", "Electronics", "Home & Garden", "Sports & Outdoors"]
+
+
+def test_extracts_filters_list_products_can_run():
+    parsed = parse_query("Red running shoes under $80, size 9", CATEGORIES)
+    assert parsed["filters"] == {"max_price": 80.0, "search": "red running shoe 9"}
+    assert parsed["colors"] == ["red"]
+    assert parsed["sizes"] == ["9"]
+    assert parsed["suggested_category"] == "Clothing"
+    assert not parsed["ambiguous"]
+
+
+def test_price_ranges_and_named_categories():
+    assert parse_query("electronics between 50 and 150 dollars", CATEGORIES)["filters"] == {
+        "category": "Electronics", "min_price": 50.0, "max_price": 150.0
+    }
+    assert parse_query("$20-$40 yoga mat", CATEGORIES)["filters"]["min_price"] == 20.0
+    assert parse_query("laptop around 1k", CATEGORIES)["filters"]["max_price"] == 1200.0
+    assert parse_query("cheap books", CATEGORIES)["price_range"] == "low"
+
+
+def test_model_numbers_are_not_prices():
+    for query in ("nike air max 90", "iphone 15 pro max 256", "min 3 pieces set"):
+        parsed = parse_query(query, CATEGORIES)
+        assert "min_price" not in parsed["filters"] and "max_price" not in parsed["filters"], query
+    assert parse_query("nike air max 90", CATEGORIES)["filters"] == {"search": "nike air max 90"}
+
+    parsed = parse_query("air max 270 shoes under $150", CATEGORIES)
+    assert parsed["filters"] == {"max_price": 150.0, "search": "air max 270 shoe"}
+    assert parse_query("shoes max $90", CATEGORIES)["filters"]["max_price"] == 90.0
+    assert parse_query("max price 90 shoes", CATEGORIES)["filters"]["max_price"] == 90.0
+    assert parse_query("price from 50", CATEGORIES)["filters"] == {"min_price": 50.0}
+
+
+def test_bare_ranges_are_not_prices():
+    parsed = parse_query("red running shoes size 9-10", CATEGORIES)
+    assert parsed["filters"] == {"search": "red running shoe 9-10"}
+    assert parsed["sizes"] == ["9-10"]
+    for query in ("kids shoes for ages 3-5", "iphone 12 to 13 case", "macbook pro 2020-2021"):
+        filters = parse_query(query, CATEGORIES)["filters"]
+        assert "min_price" not in filters and "max_price" not in filters, query
+    assert parse_query("price 20-40 yoga mat", CATEGORIES)["filters"]["max_price"] == 40.0
+
+
+def test_only_vague_queries_are_ambiguous():
+    assert parse_query("gift ideas for my mom", CATEGORIES)["ambiguous"]
+    assert parse_query("something nice", CATEGORIES)["ambiguous"]
+    assert not parse_query("best laptop under 1000", CATEGORIES)["ambiguous"]
+
+
+def test_model_answer_fills_gaps_only():
+    parsed = parse_query("gift ideas for my mom under 50", CATEGORIES)
+    merged = merge_model_interpretation(
+        parsed,
+        'Sure! {"search_query": "scarf", "suggested_category": "clothing", '
+        '"max_price": 500, "keywords": ["scarf", "jewelry"]}',
+        CATEGORIES,
+    )
+    assert merged["filters"] == {"max_price": 50.0, "search": "scarf"}
+    assert merged["suggested_category"] == "Clothing"
+    assert merge_model_interpretation(parsed, "not json", CATEGORIES) == parsed
@@ -0,0 +1,26 @@
+from types import SimpleNamespace
+from app.server import WorkerSlots, on_worker_start
+from app.services import worker_stats
+
+def test_replacement_workers_reuse_the_freed_slot():
+    slots = WorkerSlots()
+    workers = [SimpleNamespace() for _ in range(3)]
+    for worker in workers:
+        slots.acquire(worker)
+    assert [worker.slot for worker in workers] == [0, 1, 2]
+
+    slots.release(workers[1])
+    replacement = SimpleNamespace()
+    slots.acquire(replacement)
+    assert replacement.slot == 1
+
+def test_worker_start_configures_stats(monkeypatch):
+    monkeypatch.setattr(worker_stats, "_slot", 0)
+    monkeypatch.setattr(worker_stats, "_max_requests", None)
+    on_worker_start(SimpleNamespace(slot=2, max_requests=1000))
+
+    stats = worker_stats.worker_stats()
+    assert stats["slot"] == 2
+    assert stats["max_requests"] == 1000
+    assert stats["requests_until_recycle"] == 1000 - stats["requests"]
+    assert stats["resident_memory_bytes"] > 0
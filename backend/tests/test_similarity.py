@@ -0,0 +1,151 @@
+import numpy as np
+import pytest
+from bson import ObjectId
+
+from app.services import catalog, similarity
+from app.services.catalog import bump_catalog_version
+from app.services.similarity import SimilarityIndex, tokenize
+from fake_mongo import FakeDatabase
+
+
+def product(name, description, category, price=20.0, status="active"):
+    return {
+        "_id": ObjectId(),
+        "name": name,
+        "description": description,
+        "category": category,
+        "price": price,
+        "status": status,
+    }
+
+
+def build_index(products):
+    index = SimilarityIndex(dimensions=4096, initial_capacity=2)
+    for item in products:
+        index.upsert(item)
+    return index
+
+
+def test_tokenize_folds_plurals_and_drops_stopwords():
+    assert tokenize("The Running Shoes for kids") == ["running", "shoe", "kid"]
+
+
+def test_search_ranks_relevant_products_first():
+    shoes = product("Trail running shoes", "Lightweight shoes for running", "Sports & Outdoors", 80)
+    headphones = product("Wireless headphones", "Noise cancelling over-ear", "Electronics", 120)
+    mug = product("Coffee mug", "Ceramic mug for coffee", "Home & Garden", 12)
+    index = build_index([shoes, headphones, mug])
+
+    results = index.search("running shoe")
+    assert results[0][0] == str(shoes["_id"])
+    assert str(mug["_id"]) not in [product_id for product_id, _ in results]
+
+    ids = [product_id for product_id, _ in index.search("headphones", max_price=100)]
+    assert str(headphones["_id"]) not in ids
+    ids = [product_id for product_id, _ in index.search("mug", category="Electronics")]
+    assert str(mug["_id"]) not in ids
+
+
+def test_updates_and_removals_are_incremental():
+    items = [product(f"Desk lamp {i}", "LED desk lamp", "Home & Garden") for i in range(5)]
+    index = build_index(items)
+    assert len(index) == 5
+
+    index.remove(items[0]["_id"])
+    index.upsert({**items[1], "status": "inactive"})
+    ids = [product_id for product_id, _ in index.search("desk lamp", k=10)]
+    assert str(items[0]["_id"]) not in ids
+    assert str(items[1]["_id"]) not in ids
+    assert len(ids) == 3
+
+    similar = index.similar(items[2]["_id"], k=2)
+    assert len(similar) == 2
+    assert str(items[2]["_id"]) not in [product_id for product_id, _ in similar]
+
+
+def test_writes_reweight_one_row_until_the_idf_is_stale():
+    items = [product(f"Desk lamp {i}", "LED desk lamp", "Home & Garden") for i in range(30)]
+    index = build_index(items)
+    weighted, idf = index._weighted_matrix()
+    before = weighted.copy()
+
+    chair = product("Office chair", "Ergonomic mesh chair", "Home & Garden")
+    index.upsert(chair)
+    index.remove(items[3]["_id"])
+    weighted, same_idf = index._weighted_matrix()
+
+    assert same_idf is idf
+    # Only the new product's row and the row moved into the hole changed
+    changed = [row for row in range(len(index)) if not np.array_equal(weighted[row], before[row])]
+    assert changed == [3]
+    assert index.search("office chair")[0][0] == str(chair["_id"])
+    assert np.isclose(np.linalg.norm(weighted[index._rows[str(chair["_id"])]]), 1.0)
+
+    for i in range(4):
+        index.upsert(product(f"Bookshelf {i}", "Oak bookshelf", "Home & Garden"))
+    _, fresh_idf = index._weighted_matrix()
+    assert fresh_idf is not idf
+    assert index._writes_since_idf == 0
+
+
+def store(db, items):
+    for item in items:
+        db.products.docs[item["_id"]] = dict(item)
+
+
+@pytest.mark.asyncio
+async def test_catch_up_applies_only_the_changed_products(monkeypatch):
+    monkeypatch.setattr(catalog.settings, "CATALOG_VERSION_REFRESH_SECONDS", 0)
+    db = FakeDatabase()
+    lamps = [product(f"Desk lamp {i}", "LED desk lamp", "Home & Garden") for i in range(3)]
+    store(db, lamps)
+    await bump_catalog_version(db)
+    index = SimilarityIndex(dimensions=4096)
+    assert await index.rebuild(db) == 3
+
+    # Another worker adds a chair and deletes a lamp
+    chair = product("Office chair", "Ergonomic mesh chair", "Home & Garden")
+    store(db, [chair])
+    await bump_catalog_version(db, chair["_id"])
+    del db.products.docs[lamps[0]["_id"]]
+    await bump_catalog_version(db, lamps[0]["_id"])
+
+    async def no_rebuild(db):
+        raise AssertionError("caught up by rebuilding")
+
+    monkeypatch.setattr(index, "rebuild", no_rebuild)
+    assert await index.catch_up(db) == 2
+    assert index.catalog_version == 3
+    assert str(chair["_id"]) in index and str(lamps[0]["_id"]) not in index
+    assert await index.catch_up(db) == 0
+
+
+@pytest.mark.asyncio
+async def test_catch_up_rebuilds_for_bulk_loads_and_lost_records(monkeypatch):
+    monkeypatch.setattr(catalog.settings, "CATALOG_VERSION_REFRESH_SECONDS", 0)
+    db = FakeDatabase()
+    index = SimilarityIndex(dimensions=4096)
+    await index.rebuild(db)
+    rebuilds = []
+    rebuild = index.rebuild
+
+    async def counting_rebuild(db):
+        rebuilds.append(index.catalog_version)
+        return await rebuild(db)
+
+    monkeypatch.setattr(index, "rebuild", counting_rebuild)
+    store(db, [product("Desk lamp", "LED desk lamp", "Home & Garden")])
+    await bump_catalog_version(db)  # bulk load: no product named
+    await index.catch_up(db)
+    assert rebuilds == [0] and len(index) == 1
+
+    # A version whose change record never arrives
+    await bump_catalog_version(db, ObjectId())
+    del db.catalog_changes.docs[2]
+    now = [1000.0]
+    monkeypatch.setattr(similarity.time, "monotonic", lambda: now[0])
+    assert await index.catch_up(db) == 0
+    now[0] += similarity.CHANGE_GAP_SECONDS + 1
+    await index.catch_up(db)
+    assert rebuilds == [0, 1]
+    assert index.catalog_version == 2
@@ -0,0 +1,82 @@
+import subprocess
+import sys
+from pathlib import Path
+import pytest
+from fastapi import FastAPI
+from app.services import integrations, startup, warmup
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+class FakeDb:
+    def __init__(self, reachable=True):
+        self.reachable = reachable
+        self.pings = 0
+
+    async def command(self, name):
+        if not self.reachable:
+            raise ConnectionError("connection refused")
+        self.pings += 1
+        return {"ok": 1}
+
+def small_app(hits):
+    app = FastAPI()
+
+    @app.get("/health")
+    async def health():
+        hits.append("/health")
+        return {"status": "healthy"}
+
+    @app.get("/items")
+    async def items():
+        hits.append("/items")
+        return [{"id": 1}]
+
+    return app
+
+def test_app_import_leaves_heavy_integrations_unloaded():
+    # A fresh interpreter: other tests may already have imported them here
+    code = "import sys, app.main; print(sorted(m for m in ('stripe', 'openai', 'passlib.context') if m in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
+
+@pytest.mark.asyncio
+async def test_warm_up_opens_the_pool_and_serves_each_path_once(monkeypatch):
+    hits = []
+    app = small_app(hits)
+    db = FakeDb()
+    primed = []
+
+    async def prime_caches(db):
+        primed.append(db)
+
+    monkeypatch.setattr(integrations, "preload", lambda: [])
+    monkeypatch.setattr(warmup, "prime_caches", prime_caches)
+    monkeypatch.setattr(warmup, "WARM_UP_PATHS", ("/health", "/items"))
+    monkeypatch.setattr(warmup.settings, "MONGO_MIN_POOL_SIZE", 4)
+    startup.worker_started()
+
+    await warmup.warm_up(app, db)
+    profile = startup.ready()
+
+    assert db.pings == 4
+    assert primed == [db]
+    assert hits == ["/health", "/items"]
+    assert app.openapi_schema is not None
+    assert set(profile["phases"]) == {
+        "warmup.integrations", "warmup.mongo_pool", "warmup.caches", "warmup.routes", "warmup.openapi"
+    }
+    assert profile["ready_seconds"] >= 0
+
+@pytest.mark.asyncio
+async def test_warm_up_skips_database_steps_when_mongo_is_down(monkeypatch, capsys):
+    hits = []
+    monkeypatch.setattr(integrations, "preload", lambda: [])
+    startup.worker_started()
+
+    await warmup.warm_up(small_app(hits), FakeDb(reachable=False))
+
+    assert hits == []
+    assert set(startup.startup_profile()["phases"]) == {
+        "warmup.integrations", "warmup.mongo_pool", "warmup.openapi"
+    }
+    assert "Warm-up step mongo_pool failed" in capsys.readouterr().out
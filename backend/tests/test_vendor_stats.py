@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from bson import ObjectId
+
+from app.services import vendor_stats
+from fake_mongo import FakeDatabase
+
+VENDOR_A, VENDOR_B = ObjectId(), ObjectId()
+
+
+def order(status="pending", created_at=datetime(2024, 1, 31, 12)):
+    return {
+        "_id": ObjectId(),
+        "status": status,
+        "created_at": created_at,
+        "items": [
+            {"vendor_id": VENDOR_A, "total_price": 10.0},
+            {"vendor_id": VENDOR_A, "total_price": 5.0},
+            {"vendor_id": VENDOR_B, "total_price": 7.5},
+        ],
+    }
+
+
+def product_row(vendor_id, status, count):
+    return {"_id": {"vendor_id": vendor_id, "status": status}, "count": count}
+
+
+def order_row(vendor_id, status, orders, revenue, day="2024-01-31"):
+    return {"_id": {"vendor_id": vendor_id, "status": status, "day": day}, "orders": orders, "revenue": revenue}
+
+
+@pytest.mark.asyncio
+async def test_increments_follow_products_and_orders():
+    db = FakeDatabase()
+    await vendor_stats.record_product_created(db, VENDOR_A, "active")
+    await vendor_stats.record_product_created(db, VENDOR_A, "active")
+    await vendor_stats.record_product_status_changed(db, VENDOR_A, "active", "inactive")
+    await vendor_stats.record_product_status_changed(db, VENDOR_A, "inactive", "inactive")  # no-op
+    await vendor_stats.record_product_deleted(db, VENDOR_A, "inactive")
+
+    placed = order()
+    await vendor_stats.record_order_created(db, placed)
+    await vendor_stats.record_order_status_changed(db, placed, "pending", "cancelled")
+
+    a = db.vendor_stats.docs[VENDOR_A]
+    assert a["products"] == {"total": 1, "active": 1, "inactive": 0}
+    assert a["orders"] == {"total": 1, "by_status": {"pending": 0, "cancelled": 1}}
+    assert a["revenue"]["total"] == 0
+    assert a["revenue_by_day"] == {"2024-01-31": 0}
+    assert a["version"] == 6
+
+    b = db.vendor_stats.docs[VENDOR_B]
+    assert b["orders"]["total"] == 1
+    assert b["version"] == 2
+
+    await vendor_stats.record_order_status_changed(db, placed, "cancelled", "pending")
+    assert db.vendor_stats.docs[VENDOR_A]["revenue"]["total"] == 15.0
+    assert db.vendor_stats.docs[VENDOR_B]["revenue_by_day"] == {"2024-01-31": 7.5}
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_corrects_drift_and_zeroes_idle_vendors():
+    db = FakeDatabase()
+    await db.vendors.insert_many([{"_id": VENDOR_A}, {"_id": VENDOR_B}])
+    await vendor_stats.record_order_created(db, order())
+    db.vendor_stats.docs[VENDOR_A]["orders"]["total"] = 40  # drifted
+    db.products.aggregate_results = [product_row(VENDOR_A, "active", 3)]
+    db.orders.aggregate_results = [
+        order_row(VENDOR_A, "pending", 1, 15.0),
+        order_row(VENDOR_A, "cancelled", 2, 9.0),
+    ]
+
+    assert await vendor_stats.reconcile_vendor_stats(db) == 2
+
+    a = db.vendor_stats.docs[VENDOR_A]
+    assert a["products"] == {"total": 3, "active": 3}
+    assert a["orders"] == {"total": 3, "by_status": {"pending": 1, "cancelled": 2}}
+    assert a["revenue"] == {"total": 15.0}
+    assert a["version"] == 2
+    assert db.vendor_stats.docs[VENDOR_B]["orders"] == {"total": 0, "by_status": {}}
+
+    # Deltas keep applying on top of a corrected document
+    await vendor_stats.record_product_created(db, VENDOR_A, "active")
+    assert db.vendor_stats.docs[VENDOR_A]["products"]["total"] == 4
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_keeps_a_delta_that_lands_while_it_runs(monkeypatch):
+    db = FakeDatabase()
+    await db.vendors.insert_one({"_id": VENDOR_A})
+    await vendor_stats.record_product_created(db, VENDOR_A, "active")
+    compute = vendor_stats.compute_vendor_stats
+
+    async def compute_during_a_write(db, vendor_id=None):
+        stats = await compute(db, vendor_id)
+        # A product created after the aggregation read the products
+        await vendor_stats.record_product_created(db, VENDOR_A, "active")
+        return stats
+
+    monkeypatch.setattr(vendor_stats, "compute_vendor_stats", compute_during_a_write)
+    db.products.aggregate_results = [product_row(VENDOR_A, "active", 1)]
+
+    assert await vendor_stats.reconcile_vendor_stats(db) == 0
+    assert db.vendor_stats.docs[VENDOR_A]["products"] == {"total": 2, "active": 2}
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_builds_a_missing_document():
+    db = FakeDatabase()
+    db.products.aggregate_results = [product_row(VENDOR_B, "active", 2)]
+
+    doc = await vendor_stats.get_vendor_stats(db, VENDOR_B)
+
+    assert doc["products"] == {"total": 2, "active": 2}
+    assert doc["version"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reconciliation_loop_runs_on_the_leader_only(monkeypatch):
+    runs = []
+
+    async def reconcile(db, vendor_id=None, settle_seconds=0):
+        runs.append(db)
+        return 0
+
+    monkeypatch.setattr(vendor_stats, "reconcile_vendor_stats", reconcile)
+    leader = SimpleNamespace(is_leader=False)
+    loop = asyncio.create_task(vendor_stats.run_reconciliation_loop(lambda: asyncio.sleep(0, "db"), 0.01, leader))
+    await asyncio.sleep(0.05)
+    assert runs == []
+    leader.is_leader = True
+    await asyncio.sleep(0.05)
+    loop.cancel()
+    assert runs and set(runs) == {"db"}
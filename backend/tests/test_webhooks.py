@@ -0,0 +1,89 @@
+import hashlib
+import hmac
+import json
+import time
+
+import pytest
+from httpx import AsyncClient
+from pymongo.errors import DuplicateKeyError
+
+from app.config.database import get_database
+from app.config.settings import settings
+from app.main import app
+from app.services.payment_events import payment_events
+
+SECRET = "whsec_test"
+
+
+class FakeEvents:
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate")
+        self.docs[doc["_id"]] = doc
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.stripe_events = FakeEvents()
+
+
+def sign(payload: bytes, secret: str = SECRET) -> str:
+    timestamp = int(time.time())
+    signed = f"{timestamp}.{payload.decode()}".encode()
+    signature = hmac.new(secret.encode(), signed, hashlib.sha256).hexdigest()
+    return f"t={timestamp},v1={signature}"
+
+
+def event_payload(event_id="evt_1", event_type="payment_intent.succeeded"):
+    return json.dumps({
+        "id": event_id,
+        "object": "event",
+        "type": event_type,
+        "created": 1700000000,
+        "data": {"object": {"id": "pi_123", "object": "payment_intent"}},
+    }).encode()
+
+
+@pytest.fixture
+def webhook_db(monkeypatch):
+    monkeypatch.setattr(settings, "STRIPE_WEBHOOK_SECRET", SECRET)
+    monkeypatch.setattr(payment_events, "queue", None)
+    database = FakeDatabase()
+    app.dependency_overrides[get_database] = lambda: database
+    yield database
+    app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_rejects_invalid_signature(webhook_db):
+    payload = event_payload()
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.post(
+            "/api/webhooks/stripe",
+            content=payload,
+            headers={"Stripe-Signature": sign(payload, "whsec_wrong")},
+        )
+    assert response.status_code == 400
+    assert webhook_db.stripe_events.docs == {}
+
+
+@pytest.mark.asyncio
+async def test_records_and_dedups_events(webhook_db):
+    payload = event_payload()
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        first = await ac.post(
+            "/api/webhooks/stripe", content=payload, headers={"Stripe-Signature": sign(payload)}
+        )
+        second = await ac.post(
+            "/api/webhooks/stripe", content=payload, headers={"Stripe-Signature": sign(payload)}
+        )
+
+    assert first.json() == {"received": True}
+    assert second.json() == {"received": True, "duplicate": True}
+    record = webhook_db.stripe_events.docs["evt_1"]
+    assert record["payment_intent_id"] == "pi_123"
+    assert record["processed"] is False
+    assert payment_events.queue.qsize() == 1
@@ -82,6 +82,8 @@ class ApiService {
     status?: string;
     vendor_id?: string;
     search?: string;
+    min_price?: number;
+    max_price?: number;
     skip?: number;
     limit?: number;
   }): Promise<Product[]> {
@@ -274,12 +276,22 @@ class ApiService {
   }
 
   async aiSearchAssistant(naturalQuery: string): Promise<{
-    ai_interpretation?: string;
     original_query: string;
-    search_query?: string;
-    suggested_category?: string;
-    price_range?: string;
-    keywords?: string[];
+    search_query: string;
+    suggested_category: string | null;
+    price_range: string | null;
+    keywords: string[];
+    colors: string[];
+    sizes: string[];
+    filters: {
+      category?: string;
+      min_price?: number;
+      max_price?: number;
+      search?: string;
+    };
+    ambiguous: boolean;
+    source: 'local' | 'llm';
+    error?: string;
   }> {
     const response = await this.api.post('/ai/search-assistant', null, {
       params: { natural_query: naturalQuery }